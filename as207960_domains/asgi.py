@@ -7,10 +7,83 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+import threading
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'as207960_domains.settings')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django 3.1 iterates streaming responses on the event loop, blocking it until the
+    generator is exhausted. This produces each part in a worker thread instead and
+    sends it as soon as it is ready.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self.response_headers(response),
+        })
+        async for part in self.iter_in_thread(response):
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    @staticmethod
+    def response_headers(response):
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            headers.append((b'Set-Cookie', c.output(header='').encode('ascii').strip()))
+        return headers
+
+    @staticmethod
+    async def iter_in_thread(response):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            error = None
+            try:
+                for part in response:
+                    loop.call_soon_threadsafe(queue.put_nowait, (part, None))
+            except Exception as e:
+                error = e
+            finally:
+                connection.close()
+                loop.call_soon_threadsafe(queue.put_nowait, (done, error))
+
+        threading.Thread(target=produce, daemon=True).start()
+        while True:
+            part, error = await queue.get()
+            if part is done:
+                if error:
+                    raise error
+                return
+            yield part
+
+
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
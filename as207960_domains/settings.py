@@ -11,9 +11,11 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import json
 import sentry_sdk
 from sentry_sdk.integrations.django import DjangoIntegration
 import logging
+from django.core.exceptions import ImproperlyConfigured
 
 
 # logging.basicConfig(level=logging.DEBUG)
@@ -121,6 +123,22 @@ DATABASES = {
     }
 }
 
+if os.getenv("MEMCACHED_LOCATION"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.getenv("MEMCACHED_LOCATION"),
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    raise ImproperlyConfigured("MEMCACHED_LOCATION must be set; caches are shared between processes")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -185,6 +203,22 @@ REGISTRATION_ENABLED = True
 REGISTRY_LOCK_ENABLED = False
 EPP_PROXY_ADDR = os.getenv("EPP_PROXY_ADDR")
 EPP_PROXY_CA = os.getenv("EPP_PROXY_CA")
+DOMAIN_INFO_CACHE_TTL = int(os.getenv("DOMAIN_INFO_CACHE_TTL", 30))
+DOMAIN_CHECK_AVAILABLE_CACHE_TTL = int(os.getenv("DOMAIN_CHECK_AVAILABLE_CACHE_TTL", 30))
+DOMAIN_CHECK_UNAVAILABLE_CACHE_TTL = int(os.getenv("DOMAIN_CHECK_UNAVAILABLE_CACHE_TTL", 300))
+BULK_CHECK_RATE_LIMIT = int(os.getenv("BULK_CHECK_RATE_LIMIT", 2000))
+BULK_CHECK_RATE_WINDOW = int(os.getenv("BULK_CHECK_RATE_WINDOW", 3600))
+REGISTRY_SNAPSHOT_MAX_AGE = int(os.getenv("REGISTRY_SNAPSHOT_MAX_AGE", 900))
+CONTACT_REGISTRY_REVALIDATE_INTERVAL = int(os.getenv("CONTACT_REGISTRY_REVALIDATE_INTERVAL", 86400))
+PERMISSION_CACHE_TTL = int(os.getenv("PERMISSION_CACHE_TTL", 30))
+PERMISSION_CACHE_MAX_OBJECTS = int(os.getenv("PERMISSION_CACHE_MAX_OBJECTS", 10000))
+RESOURCE_OWNER_TTL = int(os.getenv("RESOURCE_OWNER_TTL", 3600))
+REGISTRY_SYNC_RATES = json.loads(os.getenv("REGISTRY_SYNC_RATES", "{}"))
+REGISTRY_SYNC_DEFAULT_RATE = float(os.getenv("REGISTRY_SYNC_DEFAULT_RATE", 1))
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "false").lower() in ("1", "true", "yes")
+RDAP_SEARCH_LIMIT = int(os.getenv("RDAP_SEARCH_LIMIT", 100))
+RDAP_REGEX_SEARCH_LIMIT = int(os.getenv("RDAP_REGEX_SEARCH_LIMIT", 25))
+RDAP_SEARCH_CONCURRENCY = int(os.getenv("RDAP_SEARCH_CONCURRENCY", 8))
 
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", 25))
@@ -204,6 +238,16 @@ with open(PRIV_KEY_LOCATION, "rb") as f:
 
 VERISIGN_NS_API_KEY = os.getenv("VERISIGN_NS_API_KEY")
 
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 30))
+HTTP_HOST_TIMEOUTS = json.loads(os.getenv("HTTP_HOST_TIMEOUTS", "{}"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.5))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+VERISIGN_SUPPORTED_TLDS_CACHE_TTL = int(os.getenv("VERISIGN_SUPPORTED_TLDS_CACHE_TTL", 3600))
+VERISIGN_SUGGESTIONS_CACHE_TTL = int(os.getenv("VERISIGN_SUGGESTIONS_CACHE_TTL", 600))
+
+CURRENCY_RATE_CACHE_TTL = int(os.getenv("CURRENCY_RATE_CACHE_TTL", 300))
+PRICE_FEE_CACHE_TTL = int(os.getenv("PRICE_FEE_CACHE_TTL", 3600))
 BILLING_URL = os.getenv("BILLING_URL")
 HEXDNS_URL = os.getenv("HEXDNS_URL")
 FEEDBACK_URL = os.getenv("FEEDBACK_URL")
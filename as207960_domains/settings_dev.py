@@ -107,6 +107,12 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -177,12 +183,38 @@ OIDC_CLIENT_SECRET = keycloak_conf["client_secret"]
 OIDC_SCOPES = keycloak_conf["scopes"]
 
 VERISIGN_NS_API_KEY = verisign_ns_conf["key"]
+VERISIGN_SUPPORTED_TLDS_CACHE_TTL = 3600
+VERISIGN_SUGGESTIONS_CACHE_TTL = 600
+
+HTTP_TIMEOUT = 30
+HTTP_HOST_TIMEOUTS = {}
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BACKOFF = 0.5
+HTTP_POOL_SIZE = 10
 
 REGISTRATION_ENABLED = True
 REGISTRY_LOCK_ENABLED = True
 EPP_PROXY_ADDR = "q-station.cdf1.as207960.net:50052"
 EPP_PROXY_CA = "../epp-proxy/priv/secrets/grpc.pem"
-
+DOMAIN_INFO_CACHE_TTL = 30
+DOMAIN_CHECK_AVAILABLE_CACHE_TTL = 30
+DOMAIN_CHECK_UNAVAILABLE_CACHE_TTL = 300
+BULK_CHECK_RATE_LIMIT = 2000
+BULK_CHECK_RATE_WINDOW = 3600
+REGISTRY_SNAPSHOT_MAX_AGE = 900
+CONTACT_REGISTRY_REVALIDATE_INTERVAL = 86400
+PERMISSION_CACHE_TTL = 30
+PERMISSION_CACHE_MAX_OBJECTS = 10000
+RESOURCE_OWNER_TTL = 3600
+REGISTRY_SYNC_RATES = {}
+REGISTRY_SYNC_DEFAULT_RATE = 1
+ASYNC_VIEWS = False
+RDAP_SEARCH_LIMIT = 100
+RDAP_REGEX_SEARCH_LIMIT = 25
+RDAP_SEARCH_CONCURRENCY = 8
+
+CURRENCY_RATE_CACHE_TTL = 300
+PRICE_FEE_CACHE_TTL = 3600
 BILLING_URL = "http://localhost:8001"
 HEXDNS_URL = "http://localhost:8002"
 FEEDBACK_URL = "none"
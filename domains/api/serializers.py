@@ -10,7 +10,7 @@ from django.core.exceptions import PermissionDenied
 from rest_framework import exceptions, serializers
 from rest_framework.settings import api_settings
 
-from .. import apps, models, zone_info, tasks
+from .. import apps, models, zone_info, tasks, availability
 
 
 class PermissionPrimaryKeyRelatedFieldValidator:
@@ -395,12 +395,9 @@ class NameServerSerializer(serializers.Serializer):
             raise ObjectExists()
 
         apps.epp_client.create_host(host, self.map_addrs(validated_data['addresses']), domain_data.registry_name)
-        host_obj = models.NameServer(
-            name_server=host,
-            registry_id=domain_data.registry_name,
-            user=self.context['request'].user
+        host_obj = models.NameServer.replace_name_server(
+            host, domain_data.registry_name, self.context['request'].user
         )
-        host_obj.save()
 
         return self.get_host(host_obj)
 
@@ -679,6 +676,7 @@ class DomainSerializer(serializers.Serializer):
             domain_db_obj=d
         )
 
+    @models.ContactRegistry.revalidate_on_error()
     def update(self, instance: Domain, validated_data):
         domain_info = zone_info.get_domain_info(instance.domain)[0]  # type: zone_info.DomainInfo
         update_req = apps.epp_api.domain_pb2.DomainUpdateRequest(
@@ -910,7 +908,7 @@ class DomainSerializer(serializers.Serializer):
 
         if update_req.add or update_req.remove or update_req.HasField('new_registrant') \
                 or update_req.HasField('new_auth_info') or update_req.HasField("sec_dns"):
-            apps.epp_client.stub.DomainUpdate(update_req)
+            apps.epp_client.update_domain(update_req)
 
         instance.domain_db_obj.save()
         return instance
@@ -924,6 +922,12 @@ class DomainCheckSerializer(serializers.Serializer):
     price = serializers.DecimalField(max_digits=9, decimal_places=2, read_only=True, allow_null=True)
 
 
+class DomainBulkCheckSerializer(serializers.Serializer):
+    domains = serializers.ListField(
+        child=serializers.CharField(max_length=255), allow_empty=False, max_length=availability.BULK_CHECK_MAX_DOMAINS
+    )
+
+
 class DomainCheckRenewSerializer(serializers.Serializer):
     domain = serializers.CharField(max_length=255, read_only=True)
     period = DomainPeriodSerializer(write_only=True)
@@ -10,9 +10,13 @@ from concurrent.futures import ThreadPoolExecutor
 import django_keycloak_auth.clients
 import jwt
 import datetime
+import json
+import grpc
 from as207960_utils.api import permissions, auth
 from . import serializers
-from .. import models, apps, zone_info, tasks
+from .. import models, apps, zone_info, tasks, availability
+from .. import permissions as domain_permissions
+from ..views import ndjson_response
 
 
 class EPPBalanceViewSet(viewsets.ViewSet):
@@ -65,13 +69,17 @@ class UserDomainsViewSet(viewsets.ViewSet):
             serializer.is_valid(raise_exception=True)
 
             out = []
+            domain_names = [domain["domain"] for domain in serializer.validated_data["domains"]]
+            domain_objs = {
+                d.domain: d for d in models.DomainRegistration.objects.filter(domain__in=domain_names, former_domain=False)
+            }
+            editable_ids = domain_permissions.get_object_ids(token, 'domain', 'edit') if domain_objs else frozenset()
             for domain in serializer.validated_data["domains"]:
-                domain_obj = models.DomainRegistration.objects\
-                    .filter(domain=domain["domain"], former_domain=False).first()
+                domain_obj = domain_objs.get(domain["domain"])
                 if not domain_obj:
                     access = None
                 else:
-                    access = domain_obj.has_scope(token, 'edit')
+                    access = str(domain_obj.resource_id) in editable_ids
                 if not access:
                     out.append({
                         "domain": domain["domain"],
@@ -267,6 +275,8 @@ class Domain(viewsets.ViewSet):
             return serializers.DomainRestoreOrderSerializer(*args, **kwargs)
         elif self.action == "check":
             return serializers.DomainCheckSerializer(*args, **kwargs)
+        elif self.action == "check_bulk":
+            return serializers.DomainBulkCheckSerializer(*args, **kwargs)
         elif self.action == "check_transfer":
             return serializers.DomainCheckSerializer(*args, **kwargs)
         elif self.action == "check_renew":
@@ -288,11 +298,12 @@ class Domain(viewsets.ViewSet):
 
         domains = models.DomainRegistration.get_object_list(request.auth.token).filter(former_domain=False)
 
-        with ThreadPoolExecutor() as executor:
-            domains_data = list(executor.map(
-                lambda d: serializers.DomainSerializer.get_domain(d, apps.epp_client.get_domain(d.domain), request.user),
-                domains
-            ))
+        domains = list(domains)
+        domains_data = []
+        for d, domain_data in zip(domains, apps.epp_client.get_domains(d.domain for d in domains)):
+            if isinstance(domain_data, grpc.RpcError):
+                raise domain_data
+            domains_data.append(serializers.DomainSerializer.get_domain(d, domain_data, request.user))
 
         serializer = serializers.DomainSerializer(domains_data, many=True, context={'request': request})
         return Response(serializer.data)
@@ -480,6 +491,23 @@ class Domain(viewsets.ViewSet):
         serializer = serializers.DomainCheckSerializer(data, context={'request': request})
         return Response(serializer.data)
 
+    @decorators.action(detail=False, methods=['post'])
+    def check_bulk(self, request):
+        if not isinstance(request.auth, auth.OAuthToken):
+            raise PermissionDenied
+
+        serializer = serializers.DomainBulkCheckSerializer(data=request.data, context={
+            'request': request
+        })
+        serializer.is_valid(raise_exception=True)
+
+        domains = serializer.validated_data['domains']
+        if not availability.consume_bulk_check_quota(request.user.username, len(domains)):
+            raise exceptions.Throttled(wait=settings.BULK_CHECK_RATE_WINDOW)
+
+        results = availability.check_domains(domains)
+        return ndjson_response((json.dumps(result) + "\n" for result in results))
+
     @decorators.action(detail=False, methods=['post'])
     def check_transfer(self, request):
         if not isinstance(request.auth, auth.OAuthToken):
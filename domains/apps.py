@@ -1,5 +1,6 @@
 from django.apps import AppConfig
 from django.conf import settings
+from django.core.cache import cache
 import grpc
 import ipaddress
 import as207960_utils.rpc
@@ -25,8 +26,24 @@ def get_ip(request):
     return addr
 
 
+def invalidate_domain_snapshot(domain):
+    from . import models
+    models.RegistrySnapshot.invalidate(models.RegistrySnapshot.TYPE_DOMAIN, domain)
+
+
+def invalidate_host_snapshot(host_name, registry_name):
+    from . import models
+    models.RegistrySnapshot.invalidate(models.RegistrySnapshot.TYPE_HOST, host_name, registry_name)
+
+
 epp_creds = grpc.metadata_call_credentials(get_call_creds)
-epp_client = epp_api.EPPClient(settings.EPP_PROXY_ADDR, settings.EPP_PROXY_CA, epp_creds)
+epp_client = epp_api.EPPClient(
+    settings.EPP_PROXY_ADDR, settings.EPP_PROXY_CA, epp_creds,
+    cache=cache, domain_cache_ttl=settings.DOMAIN_INFO_CACHE_TTL, domain_invalidate_hook=invalidate_domain_snapshot,
+    host_invalidate_hook=invalidate_host_snapshot, check_available_ttl=settings.DOMAIN_CHECK_AVAILABLE_CACHE_TTL,
+    check_unavailable_ttl=settings.DOMAIN_CHECK_UNAVAILABLE_CACHE_TTL
+)
+async_epp_client = epp_api.AsyncEPPClient(epp_client)
 rpc_client = as207960_utils.rpc.RpcClient()
 
 
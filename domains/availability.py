@@ -0,0 +1,70 @@
+import itertools
+import typing
+import grpc
+from django.conf import settings
+from django.core.cache import cache
+from . import models, apps, zone_info
+
+BULK_CHECK_MAX_DOMAINS = 500
+
+
+def consume_bulk_check_quota(username: str, count: int) -> bool:
+    key = f"bulk_check_quota:{username}"
+    cache.add(key, 0, timeout=settings.BULK_CHECK_RATE_WINDOW)
+    try:
+        used = cache.incr(key, count)
+    except ValueError:
+        return True
+    return used <= settings.BULK_CHECK_RATE_LIMIT
+
+
+def check_domains(domains: typing.Iterable[str]) -> typing.Iterator[dict]:
+    results, to_check = _local_checks(domains)
+    return itertools.chain(results, _registry_checks(to_check))
+
+
+def _local_checks(domains: typing.Iterable[str]) -> typing.Tuple[typing.List[dict], dict]:
+    results = []
+    to_check = {}
+    for domain in domains:
+        domain = domain.strip().lower().rstrip(".")
+        if not domain:
+            continue
+        try:
+            domain_idna = domain.encode('idna').decode()
+        except UnicodeError as e:
+            results.append({"domain": domain, "available": False, "reason": f"Invalid Unicode: {e}"})
+            continue
+
+        zone, _ = zone_info.get_domain_info(domain_idna)
+        if not zone:
+            results.append({"domain": domain, "available": False, "reason": "Unsupported or invalid domain"})
+            continue
+        to_check[domain_idna] = (domain, zone)
+
+    registered = set(map(lambda d: d.lower(), models.DomainRegistration.objects.filter(
+        domain__in=list(to_check.keys()) + [d for d, _ in to_check.values()], former_domain=False
+    ).values_list("domain", flat=True)))
+    for domain_idna, (domain, _) in list(to_check.items()):
+        if domain_idna in registered or domain in registered:
+            del to_check[domain_idna]
+            results.append({"domain": domain, "available": False, "reason": "Domain unavailable"})
+
+    return results, to_check
+
+
+def _registry_checks(to_check: dict) -> typing.Iterator[dict]:
+    for domain_idna, result in apps.epp_client.check_domains(
+            to_check.keys(), key=lambda d: to_check[d][1].registry
+    ):
+        domain = to_check[domain_idna][0]
+        if isinstance(result, grpc.RpcError):
+            yield {"domain": domain, "available": False, "reason": result.details(), "error": True}
+            continue
+
+        available, reason, _ = result
+        yield {
+            "domain": domain,
+            "available": available,
+            "reason": None if available else (f"Domain unavailable: {reason}" if reason else "Domain unavailable"),
+        }
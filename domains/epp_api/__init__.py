@@ -1,13 +1,19 @@
 import typing
+import queue
+import asyncio
 import datetime
+import collections
+import threading
 
 import google.protobuf.wrappers_pb2
 import grpc
+import grpc.aio
 import decimal
 import dataclasses
 import ipaddress
 from google.protobuf.wrappers_pb2 import StringValue
 from google.protobuf.timestamp_pb2 import Timestamp
+from asgiref.sync import sync_to_async
 from .epp_grpc import common_pb2, contact_pb2, domain_pb2, host_pb2, rgp_pb2, fee_pb2, epp_pb2, epp_pb2_grpc, \
     isnic_pb2, domain_common_pb2, nominet_pb2, nominet_ext_pb2
 
@@ -355,6 +361,7 @@ class SecDNSData:
 
 class Domain:
     _app = None  # type: EPPClient
+    _pb = None  # type: domain_pb2.DomainInfoReply
     name: str
     registry_id: str
     statuses: typing.List[DomainStatus]
@@ -378,6 +385,7 @@ class Domain:
     def from_pb(cls, resp: domain_pb2.DomainInfoReply, app):
         self = cls()
         self._app = app
+        self._pb = resp
         self.name = resp.name
         self.registry_id = resp.registry_id
         self.statuses = list(map(lambda s: DomainStatus(status=s), resp.statuses))
@@ -437,7 +445,7 @@ class Domain:
                and int(domain_common_pb2.ServerDeleteProhibited) not in self.statuses
 
     def set_auth_info(self, auth_info: str) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             new_auth_info=StringValue(value=auth_info)
         )).pending
@@ -467,14 +475,14 @@ class Domain:
                 )
             ))
 
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             remove=rem,
             add=add
         )).pending
 
     def set_registrant(self, contact_id: str) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             new_registrant=StringValue(value=contact_id)
         )).pending
@@ -489,7 +497,7 @@ class Domain:
         return self.set_contact("tech", contact_id)
 
     def add_host_objs(self, hosts: typing.List[str], replace: bool = False) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             remove=[],
             add=list(map(lambda h: domain_pb2.DomainUpdateRequest.Param(
@@ -500,7 +508,7 @@ class Domain:
         )).pending
 
     def add_host_addrs(self, hosts: typing.List[typing.Tuple[str, typing.List[IPAddress]]]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             remove=[],
             add=list(map(lambda h: domain_pb2.DomainUpdateRequest.Param(
@@ -512,7 +520,7 @@ class Domain:
         )).pending
 
     def add_ds_data(self, data: typing.List[SecDNSDSData]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             sec_dns=domain_pb2.UpdateSecDNSData(
                 add_ds_data=domain_pb2.SecDNSDSData(data=list(map(lambda d: d.to_pb(), data)))
@@ -520,7 +528,7 @@ class Domain:
         )).pending
 
     def add_dnskey_data(self, data: typing.List[SecDNSKeyData]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             sec_dns=domain_pb2.UpdateSecDNSData(
                 add_key_data=domain_pb2.SecDNSKeyData(data=list(map(lambda d: d.to_pb(), data)))
@@ -528,7 +536,7 @@ class Domain:
         )).pending
 
     def del_host_objs(self, hosts: typing.List[str]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             add=[],
             remove=list(map(lambda h: domain_pb2.DomainUpdateRequest.Param(
@@ -539,7 +547,7 @@ class Domain:
         )).pending
 
     def del_secdns_all(self) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             sec_dns=domain_pb2.UpdateSecDNSData(
                 all=True
@@ -547,7 +555,7 @@ class Domain:
         )).pending
 
     def del_ds_data(self, data: typing.List[SecDNSDSData]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             sec_dns=domain_pb2.UpdateSecDNSData(
                 rem_ds_data=domain_pb2.SecDNSDSData(data=list(map(lambda d: d.to_pb(), data)))
@@ -555,7 +563,7 @@ class Domain:
         )).pending
 
     def del_dnskey_data(self, data: typing.List[SecDNSKeyData]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             sec_dns=domain_pb2.UpdateSecDNSData(
                 rem_key_data=domain_pb2.SecDNSKeyData(data=list(map(lambda d: d.to_pb(), data)))
@@ -563,7 +571,7 @@ class Domain:
         )).pending
 
     def add_states(self, data: typing.List[DomainStatus]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             add=list(map(lambda s: domain_pb2.DomainUpdateRequest.Param(
                 state=s.status
@@ -571,7 +579,7 @@ class Domain:
         )).pending
 
     def del_states(self, data: typing.List[DomainStatus]) -> bool:
-        return self._app.stub.DomainUpdate(domain_pb2.DomainUpdateRequest(
+        return self._app.update_domain(domain_pb2.DomainUpdateRequest(
             name=self.name,
             remove=list(map(lambda s: domain_pb2.DomainUpdateRequest.Param(
                 state=s.status
@@ -698,6 +706,7 @@ class HostStatus:
 
 class Host:
     _app = None  # type: EPPClient
+    _pb = None  # type: host_pb2.HostInfoReply
     name: str
     registry_id: str
     statuses: typing.List[HostStatus]
@@ -714,6 +723,7 @@ class Host:
     def from_pb(cls, resp: host_pb2.HostInfoReply, app, registry_name):
         self = cls()
         self._app = app
+        self._pb = resp
         self.name = resp.name
         self.registry_id = resp.registry_id
         self.statuses = list(map(lambda s: HostStatus(status=s), resp.statuses))
@@ -752,6 +762,7 @@ class Host:
             new_name=None,
             registry_name=self.registry_name
         ))
+        self._app.invalidate_host(self.name, self.registry_name)
         return resp.pending
 
     def add_addresses(self, addresses: typing.List[IPAddress]) -> bool:
@@ -764,6 +775,7 @@ class Host:
             new_name=None,
             registry_name=self.registry_name
         ))
+        self._app.invalidate_host(self.name, self.registry_name)
         return resp.pending
 
     def remove_addresses(self, addresses: typing.List[IPAddress]) -> bool:
@@ -776,6 +788,7 @@ class Host:
             new_name=None,
             registry_name=self.registry_name
         ))
+        self._app.invalidate_host(self.name, self.registry_name)
         return resp.pending
 
     def set_isnic_zone_contact(self, contact_id: str) -> bool:
@@ -789,6 +802,7 @@ class Host:
             ),
             registry_name=self.registry_name
         ))
+        self._app.invalidate_host(self.name, self.registry_name)
         return resp.pending
 
 
@@ -1371,7 +1385,13 @@ class ChangeData:
 
 
 class EPPClient:
-    def __init__(self, server, ca, creds=None):
+    DOMAIN_CACHE_PREFIX = "epp_domain_info"
+    CHECK_CACHE_PREFIX = "epp_domain_check"
+
+    def __init__(
+            self, server, ca, creds=None, cache=None, domain_cache_ttl: int = 0, domain_invalidate_hook=None,
+            host_invalidate_hook=None, check_available_ttl: int = 0, check_unavailable_ttl: int = 0
+    ):
         with open(ca, 'rb') as f:
             cert = f.read()
         ssl_creds = grpc.ssl_channel_credentials(root_certificates=cert)
@@ -1380,20 +1400,201 @@ class EPPClient:
         else:
             channel_creds = grpc.composite_channel_credentials(ssl_creds)
         channel = grpc.secure_channel(server, channel_creds)
-            
+
+        self.server = server
+        self.channel_creds = channel_creds
         self.stub = epp_pb2_grpc.EPPProxyStub(channel)
+        self.cache = cache
+        self.domain_cache_ttl = domain_cache_ttl
+        self.check_available_ttl = check_available_ttl
+        self.check_unavailable_ttl = check_unavailable_ttl
+        self.domain_invalidate_hook = domain_invalidate_hook
+        self.host_invalidate_hook = host_invalidate_hook
+        self.cache_counters = collections.Counter()
+        self.cache_stats_lock = threading.Lock()
+
+    @property
+    def domain_cache_enabled(self) -> bool:
+        return self.cache is not None and self.domain_cache_ttl > 0
+
+    def _domain_cache_key(self, domain: str) -> str:
+        return f"{self.DOMAIN_CACHE_PREFIX}:{domain.lower()}"
+
+    def _count_cache(self, prefix: str, stat: str):
+        with self.cache_stats_lock:
+            self.cache_counters[(prefix, stat)] += 1
+
+    def _cache_stats(self, prefix: str, stats: typing.Iterable[str]) -> typing.Dict[str, int]:
+        with self.cache_stats_lock:
+            return {s: self.cache_counters[(prefix, s)] for s in stats}
+
+    def _count_domain_cache(self, stat: str):
+        self._count_cache(self.DOMAIN_CACHE_PREFIX, stat)
+
+    def domain_cache_stats(self) -> typing.Dict[str, int]:
+        if not self.domain_cache_enabled:
+            return {}
+        return self._cache_stats(self.DOMAIN_CACHE_PREFIX, ("hits", "misses", "invalidations"))
+
+    @property
+    def check_cache_enabled(self) -> bool:
+        return self.cache is not None and (self.check_available_ttl > 0 or self.check_unavailable_ttl > 0)
+
+    def _check_cache_key(self, domain: str) -> str:
+        domain = domain.strip().lower().rstrip(".")
+        try:
+            domain = domain.encode('idna').decode()
+        except UnicodeError:
+            pass
+        return f"{self.CHECK_CACHE_PREFIX}:{domain}"
+
+    def _get_cached_check(self, domain: str):
+        if not self.check_cache_enabled:
+            return None
+        cached = self.cache.get(self._check_cache_key(domain))
+        self._count_cache(self.CHECK_CACHE_PREFIX, "hits" if cached is not None else "misses")
+        return cached
+
+    def _cache_check(self, domain: str, result: typing.Tuple[bool, typing.Optional[str], str]):
+        if not self.check_cache_enabled:
+            return
+        ttl = self.check_available_ttl if result[0] else self.check_unavailable_ttl
+        if ttl > 0:
+            self.cache.set(self._check_cache_key(domain), result, timeout=ttl)
+
+    def check_cache_stats(self) -> typing.Dict[str, typing.Union[int, float]]:
+        if not self.check_cache_enabled:
+            return {}
+        stats = self._cache_stats(self.CHECK_CACHE_PREFIX, ("hits", "misses"))
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0
+        return stats
+
+    def invalidate_domain(self, domain: str):
+        if self.domain_invalidate_hook:
+            self.domain_invalidate_hook(domain)
+        if self.check_cache_enabled:
+            self.cache.delete(self._check_cache_key(domain))
+        if not self.domain_cache_enabled:
+            return
+        self.cache.delete(self._domain_cache_key(domain))
+        self._count_domain_cache("invalidations")
+
+    def check_domain(self, domain: str, use_cache: bool = True) -> typing.Tuple[bool, typing.Optional[str], str]:
+        if use_cache:
+            cached = self._get_cached_check(domain)
+            if cached is not None:
+                return cached
 
-    def check_domain(self, domain: str) -> typing.Tuple[bool, typing.Optional[str], str]:
         resp = self.stub.DomainCheck(domain_pb2.DomainCheckRequest(
             name=domain
         ))
         reason = resp.reason.value if resp.HasField("reason") else None
-        return resp.available, reason, resp.registry_name
+        result = resp.available, reason, resp.registry_name
+        self._cache_check(domain, result)
+        return result
+
+    def check_domains(self, domains: typing.Iterable[str], key=None, max_in_flight: int = 8) -> typing.Iterator[
+        typing.Tuple[str, typing.Union[typing.Tuple[bool, typing.Optional[str], str], grpc.RpcError]]
+    ]:
+        groups = collections.OrderedDict()
+        for domain in domains:
+            cached = self._get_cached_check(domain)
+            if cached is not None:
+                yield domain, cached
+                continue
+            groups.setdefault(key(domain) if key else None, collections.deque()).append(domain)
+
+        done = queue.Queue()
+
+        def start_next(group) -> int:
+            if not groups[group]:
+                return 0
+            domain = groups[group].popleft()
+            future = self.stub.DomainCheck.future(domain_pb2.DomainCheckRequest(name=domain))
+            future.add_done_callback(lambda f: done.put((domain, group, f)))
+            return 1
+
+        in_flight = sum(start_next(group) for group in list(groups.keys()) for _ in range(max_in_flight))
+        while in_flight:
+            domain, group, future = done.get()
+            in_flight -= 1
+            in_flight += start_next(group)
+            try:
+                resp = future.result()
+            except grpc.RpcError as e:
+                yield domain, e
+                continue
+            reason = resp.reason.value if resp.HasField("reason") else None
+            result = resp.available, reason, resp.registry_name
+            self._cache_check(domain, result)
+            yield domain, result
+
+    def _get_cached_domain(self, domain: str) -> typing.Optional[bytes]:
+        cached = self.cache.get(self._domain_cache_key(domain))
+        self._count_domain_cache("hits" if cached is not None else "misses")
+        return cached
+
+    def _cache_domain(self, domain: str, resp: domain_pb2.DomainInfoReply):
+        if self.domain_cache_enabled:
+            self.cache.set(self._domain_cache_key(domain), resp.SerializeToString(), timeout=self.domain_cache_ttl)
+
+    def get_domain(self, domain: str, auth_info: typing.Optional[str] = None, use_cache: bool = True) -> Domain:
+        if self.domain_cache_enabled and use_cache:
+            cached = self._get_cached_domain(domain)
+            if cached is not None:
+                return Domain.from_pb(domain_pb2.DomainInfoReply.FromString(cached), self)
 
-    def get_domain(self, domain: str, auth_info: typing.Optional[str] = None) -> Domain:
         resp = self.stub.DomainInfo(domain_pb2.DomainInfoRequest(name=domain))
+        self._cache_domain(domain, resp)
         return Domain.from_pb(resp, self)
 
+    def get_domains(self, domains: typing.Iterable[str], max_in_flight: int = 16, use_cache: bool = True) -> \
+            typing.List[typing.Union[Domain, grpc.RpcError]]:
+        domains = list(domains)
+        results = [None] * len(domains)
+        to_fetch = []
+
+        if self.domain_cache_enabled and use_cache:
+            cached = self.cache.get_many(list(set(self._domain_cache_key(d) for d in domains)))
+            for i, domain in enumerate(domains):
+                cached_domain = cached.get(self._domain_cache_key(domain))
+                if cached_domain is not None:
+                    self._count_domain_cache("hits")
+                    results[i] = Domain.from_pb(domain_pb2.DomainInfoReply.FromString(cached_domain), self)
+                else:
+                    self._count_domain_cache("misses")
+                    to_fetch.append(i)
+        else:
+            to_fetch = list(range(len(domains)))
+
+        in_flight = collections.deque()
+
+        def collect():
+            i, future = in_flight.popleft()
+            try:
+                resp = future.result()
+            except grpc.RpcError as e:
+                results[i] = e
+                return
+            self._cache_domain(domains[i], resp)
+            results[i] = Domain.from_pb(resp, self)
+
+        for i in to_fetch:
+            if len(in_flight) >= max_in_flight:
+                collect()
+            in_flight.append((i, self.stub.DomainInfo.future(domain_pb2.DomainInfoRequest(name=domains[i]))))
+        while in_flight:
+            collect()
+
+        return results
+
+    def update_domain(self, req: domain_pb2.DomainUpdateRequest) -> domain_pb2.DomainUpdateReply:
+        try:
+            return self.stub.DomainUpdate(req)
+        finally:
+            self.invalidate_domain(req.name)
+
     def create_domain(
         self,
         domain: str,
@@ -1411,15 +1612,18 @@ class EPPClient:
             nameservers=list(map(lambda n: n.to_pb(), name_servers)),
             auth_info=auth_info
         ))
+        self.invalidate_domain(domain)
         return resp.pending, resp.creation_date.ToDatetime(), resp.expiry_date.ToDatetime(), resp.registry_name
 
     def delete_domain(self, domain: str) -> typing.Tuple[bool, str, str, typing.Optional[FeeData]]:
         resp = self.stub.DomainDelete(domain_pb2.DomainDeleteRequest(name=domain))
+        self.invalidate_domain(domain)
         return resp.pending, resp.registry_name, resp.cmd_resp.server,\
                FeeData.from_pb(resp.fee_data) if resp.HasField("fee_data") else None
 
     def restore_domain(self, domain: str) -> typing.Tuple[bool, str]:
         resp = self.stub.DomainRestoreRequest(rgp_pb2.RequestRequest(name=domain))
+        self.invalidate_domain(domain)
         return resp.pending, resp.registry_name
 
     def renew_domain(self, domain: str, period: Period, cur_expiry: datetime.datetime) -> \
@@ -1431,6 +1635,7 @@ class EPPClient:
             period=period.to_pb(),
             current_expiry_date=exp
         ))
+        self.invalidate_domain(domain)
         return resp.pending, resp.expiry_date.ToDatetime(), resp.registry_name
 
     def transfer_query_domain(self, domain: str, auth_info: typing.Optional[str] = None) -> \
@@ -1448,6 +1653,7 @@ class EPPClient:
             period=period.to_pb() if period else None,
             auth_info=auth_info
         ))
+        self.invalidate_domain(domain)
         return DomainTransfer.from_pb(resp)
 
     def transfer_accept_domain(self, domain: str, auth_info: str) -> \
@@ -1456,6 +1662,7 @@ class EPPClient:
             name=domain,
             auth_info=auth_info
         ))
+        self.invalidate_domain(domain)
         return DomainTransfer.from_pb(resp)
 
     def transfer_reject_domain(self, domain: str, auth_info: str) -> \
@@ -1464,6 +1671,7 @@ class EPPClient:
             name=domain,
             auth_info=auth_info
         ))
+        self.invalidate_domain(domain)
         return DomainTransfer.from_pb(resp)
 
     def check_host(self, host_name: str, registry_name: str) -> typing.Tuple[bool, typing.Optional[str]]:
@@ -1478,6 +1686,10 @@ class EPPClient:
         resp = self.stub.HostInfo(host_pb2.HostInfoRequest(name=host_name, registry_name=registry_name))
         return Host.from_pb(resp, self, registry_name)
 
+    def invalidate_host(self, host_name: str, registry_name: str):
+        if self.host_invalidate_hook:
+            self.host_invalidate_hook(host_name, registry_name)
+
     def create_host(
             self, host_name: str, addresses: typing.List[IPAddress], registry_name: str,
             isnic_zone_contact: typing.Optional[str]
@@ -1490,10 +1702,12 @@ class EPPClient:
                 zone_contact=google.protobuf.wrappers_pb2.StringValue(value=isnic_zone_contact)
             ) if isnic_zone_contact else None,
         ))
+        self.invalidate_host(host_name, registry_name)
         return resp.pending, resp.creation_date.ToDatetime()
 
     def delete_host(self, host_name: str, registry_name: str) -> bool:
         resp = self.stub.HostDelete(host_pb2.HostDeleteRequest(name=host_name, registry_name=registry_name))
+        self.invalidate_host(host_name, registry_name)
         return resp.pending
 
     def check_contact(self, contact_id: str, registry_name: str) -> typing.Tuple[bool, typing.Optional[str]]:
@@ -1549,3 +1763,250 @@ class EPPClient:
     def delete_contact(self, contact_id: str, registry: str) -> bool:
         resp = self.stub.ContactDelete(contact_pb2.ContactDeleteRequest(id=contact_id, registry_name=registry))
         return resp.pending
+
+
+class AsyncEPPClient:
+    def __init__(self, client: EPPClient):
+        self.client = client
+        self._channel = None
+        self._stub = None
+        self._loop = None
+
+    @property
+    def stub(self) -> epp_pb2_grpc.EPPProxyStub:
+        loop = asyncio.get_running_loop()
+        if self._stub is None or self._loop is not loop:
+            if self._channel is not None:
+                self._close_channel(self._channel, self._loop)
+            self._channel = grpc.aio.secure_channel(self.client.server, self.client.channel_creds)
+            self._stub = epp_pb2_grpc.EPPProxyStub(self._channel)
+            self._loop = loop
+        return self._stub
+
+    @staticmethod
+    def _close_channel(channel: grpc.aio.Channel, loop: asyncio.AbstractEventLoop):
+        if loop is None or loop.is_closed():
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(channel.close(), loop)
+            return
+        close = channel.close()
+        try:
+            loop.run_until_complete(close)
+        except RuntimeError:
+            close.close()
+
+    async def _invalidate_domain(self, domain: str):
+        await sync_to_async(self.client.invalidate_domain, thread_sensitive=True)(domain)
+
+    async def _domain_fetched(self, domain: str, resp: domain_pb2.DomainInfoReply) -> Domain:
+        await sync_to_async(self.client._cache_domain, thread_sensitive=False)(domain, resp)
+        return Domain.from_pb(resp, self.client)
+
+    async def check_domain(self, domain: str, use_cache: bool = True) -> \
+            typing.Tuple[bool, typing.Optional[str], str]:
+        if use_cache:
+            cached = await sync_to_async(self.client._get_cached_check, thread_sensitive=False)(domain)
+            if cached is not None:
+                return cached
+
+        resp = await self.stub.DomainCheck(domain_pb2.DomainCheckRequest(
+            name=domain
+        ))
+        reason = resp.reason.value if resp.HasField("reason") else None
+        result = resp.available, reason, resp.registry_name
+        await sync_to_async(self.client._cache_check, thread_sensitive=False)(domain, result)
+        return result
+
+    async def get_domain(self, domain: str, auth_info: typing.Optional[str] = None, use_cache: bool = True) -> Domain:
+        if self.client.domain_cache_enabled and use_cache:
+            cached = await sync_to_async(self.client._get_cached_domain, thread_sensitive=False)(domain)
+            if cached is not None:
+                return Domain.from_pb(domain_pb2.DomainInfoReply.FromString(cached), self.client)
+
+        resp = await self.stub.DomainInfo(domain_pb2.DomainInfoRequest(name=domain))
+        return await self._domain_fetched(domain, resp)
+
+    async def get_domains(self, domains: typing.Iterable[str], max_in_flight: int = 16, use_cache: bool = True) -> \
+            typing.List[typing.Union[Domain, grpc.RpcError]]:
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def get_domain(domain):
+            async with semaphore:
+                try:
+                    return await self.get_domain(domain, use_cache=use_cache)
+                except grpc.RpcError as e:
+                    return e
+
+        return list(await asyncio.gather(*(get_domain(d) for d in domains)))
+
+    async def update_domain(self, req: domain_pb2.DomainUpdateRequest) -> domain_pb2.DomainUpdateReply:
+        try:
+            return await self.stub.DomainUpdate(req)
+        finally:
+            await self._invalidate_domain(req.name)
+
+    async def create_domain(
+        self,
+        domain: str,
+        period: Period,
+        registrant: str,
+        contacts: typing.List[DomainContact],
+        name_servers: typing.List[DomainNameServer],
+        auth_info: str
+    ) -> typing.Tuple[bool, datetime.datetime, datetime.datetime, str]:
+        resp = await self.stub.DomainCreate(domain_pb2.DomainCreateRequest(
+            name=domain,
+            period=period.to_pb(),
+            registrant=registrant,
+            contacts=list(map(lambda c: c.to_pb(), contacts)),
+            nameservers=list(map(lambda n: n.to_pb(), name_servers)),
+            auth_info=auth_info
+        ))
+        await self._invalidate_domain(domain)
+        return resp.pending, resp.creation_date.ToDatetime(), resp.expiry_date.ToDatetime(), resp.registry_name
+
+    async def delete_domain(self, domain: str) -> typing.Tuple[bool, str, str, typing.Optional[FeeData]]:
+        resp = await self.stub.DomainDelete(domain_pb2.DomainDeleteRequest(name=domain))
+        await self._invalidate_domain(domain)
+        return resp.pending, resp.registry_name, resp.cmd_resp.server,\
+               FeeData.from_pb(resp.fee_data) if resp.HasField("fee_data") else None
+
+    async def restore_domain(self, domain: str) -> typing.Tuple[bool, str]:
+        resp = await self.stub.DomainRestoreRequest(rgp_pb2.RequestRequest(name=domain))
+        await self._invalidate_domain(domain)
+        return resp.pending, resp.registry_name
+
+    async def renew_domain(self, domain: str, period: Period, cur_expiry: datetime.datetime) -> \
+            typing.Tuple[bool, datetime.datetime, str]:
+        exp = Timestamp()
+        exp.FromDatetime(cur_expiry)
+        resp = await self.stub.DomainRenew(domain_pb2.DomainRenewRequest(
+            name=domain,
+            period=period.to_pb(),
+            current_expiry_date=exp
+        ))
+        await self._invalidate_domain(domain)
+        return resp.pending, resp.expiry_date.ToDatetime(), resp.registry_name
+
+    async def transfer_query_domain(self, domain: str, auth_info: typing.Optional[str] = None) -> \
+            DomainTransfer:
+        resp = await self.stub.DomainTransferQuery(domain_pb2.DomainTransferQueryRequest(
+            name=domain,
+            auth_info=StringValue(value=auth_info) if auth_info else None
+        ))
+        return DomainTransfer.from_pb(resp)
+
+    async def transfer_request_domain(self, domain: str, auth_info: str, period: typing.Optional[Period] = None) -> \
+            DomainTransfer:
+        resp = await self.stub.DomainTransferRequest(domain_pb2.DomainTransferRequestRequest(
+            name=domain,
+            period=period.to_pb() if period else None,
+            auth_info=auth_info
+        ))
+        await self._invalidate_domain(domain)
+        return DomainTransfer.from_pb(resp)
+
+    async def transfer_accept_domain(self, domain: str, auth_info: str) -> \
+            DomainTransfer:
+        resp = await self.stub.DomainTransferAccept(domain_pb2.DomainTransferAcceptRejectRequest(
+            name=domain,
+            auth_info=auth_info
+        ))
+        await self._invalidate_domain(domain)
+        return DomainTransfer.from_pb(resp)
+
+    async def transfer_reject_domain(self, domain: str, auth_info: str) -> \
+            DomainTransfer:
+        resp = await self.stub.DomainTransferReject(domain_pb2.DomainTransferAcceptRejectRequest(
+            name=domain,
+            auth_info=auth_info
+        ))
+        await self._invalidate_domain(domain)
+        return DomainTransfer.from_pb(resp)
+
+    async def check_host(self, host_name: str, registry_name: str) -> typing.Tuple[bool, typing.Optional[str]]:
+        resp = await self.stub.HostCheck(host_pb2.HostCheckRequest(
+            name=host_name,
+            registry_name=registry_name
+        ))
+        reason = resp.reason.value if resp.HasField("reason") else None
+        return resp.available, reason
+
+    async def get_host(self, host_name: str, registry_name: str) -> Host:
+        resp = await self.stub.HostInfo(host_pb2.HostInfoRequest(name=host_name, registry_name=registry_name))
+        return Host.from_pb(resp, self.client, registry_name)
+
+    async def create_host(
+            self, host_name: str, addresses: typing.List[IPAddress], registry_name: str,
+            isnic_zone_contact: typing.Optional[str]
+    ) -> typing.Tuple[bool, datetime.datetime]:
+        resp = await self.stub.HostCreate(host_pb2.HostCreateRequest(
+            name=host_name,
+            addresses=list(map(lambda a: a.to_pb(), addresses)),
+            registry_name=registry_name,
+            isnic_info=isnic_pb2.HostInfo(
+                zone_contact=google.protobuf.wrappers_pb2.StringValue(value=isnic_zone_contact)
+            ) if isnic_zone_contact else None,
+        ))
+        await sync_to_async(self.client.invalidate_host, thread_sensitive=True)(host_name, registry_name)
+        return resp.pending, resp.creation_date.ToDatetime()
+
+    async def delete_host(self, host_name: str, registry_name: str) -> bool:
+        resp = await self.stub.HostDelete(host_pb2.HostDeleteRequest(name=host_name, registry_name=registry_name))
+        await sync_to_async(self.client.invalidate_host, thread_sensitive=True)(host_name, registry_name)
+        return resp.pending
+
+    async def check_contact(self, contact_id: str, registry_name: str) -> typing.Tuple[bool, typing.Optional[str]]:
+        resp = await self.stub.ContactCheck(contact_pb2.ContactCheckRequest(
+            id=contact_id,
+            registry_name=registry_name
+        ))
+        reason = resp.reason.value if resp.HasField("reason") else None
+        return resp.available, reason
+
+    async def get_contact(
+        self,
+        contact_id: str,
+        registry_name: str,
+    ) -> Contact:
+        resp = await self.stub.ContactInfo(contact_pb2.ContactInfoRequest(
+            id=contact_id,
+            registry_name=registry_name
+        ))
+        return Contact.from_pb(resp, self.client, registry_name)
+
+    async def create_contact(
+        self,
+        contact_id: str,
+        local_address: typing.Optional[Address],
+        int_address: typing.Optional[Address],
+        phone: typing.Optional[Phone],
+        fax: typing.Optional[Phone],
+        email: str,
+        entity_type: int,
+        trading_name: typing.Optional[str],
+        company_number: typing.Optional[str],
+        auth_info: str,
+        disclosure: typing.Optional[Disclosure],
+        registry_name: str,
+    ) -> typing.Tuple[str, bool, datetime.datetime]:
+        resp = await self.stub.ContactCreate(contact_pb2.ContactCreateRequest(
+            id=contact_id,
+            local_address=local_address.to_pb() if local_address else None,
+            internationalised_address=int_address.to_pb() if int_address else None,
+            phone=phone.to_pb() if phone else None,
+            fax=fax.to_pb() if fax else None,
+            email=email,
+            entity_type=entity_type,
+            trading_name=StringValue(value=trading_name) if trading_name else None,
+            company_number=StringValue(value=company_number) if company_number else None,
+            auth_info=auth_info,
+            disclosure=disclosure.to_pb() if disclosure else None,
+            registry_name=registry_name
+        ))
+        return resp.id, resp.pending, resp.creation_date.ToDatetime()
+
+    async def delete_contact(self, contact_id: str, registry: str) -> bool:
+        resp = await self.stub.ContactDelete(contact_pb2.ContactDeleteRequest(id=contact_id, registry_name=registry))
+        return resp.pending
@@ -8,7 +8,7 @@ from django import forms
 from django.urls import reverse
 from django_countries.widgets import CountrySelectWidget
 
-from . import models, apps, zone_info
+from . import models, apps, zone_info, availability
 
 
 class ContactForm(forms.ModelForm):
@@ -355,6 +355,33 @@ class DomainSearchForm(forms.Form):
         self.helper.add_input(crispy_forms.layout.Submit('submit', 'Search'))
 
 
+class DomainBulkSearchForm(forms.Form):
+    domains = forms.CharField(label="Domain names", required=True, widget=forms.Textarea(
+        attrs={'placeholder': 'myawesome.website\nmyawesome.uk'}
+    ), help_text="One domain per line")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.helper = crispy_forms.helper.FormHelper()
+        self.helper.form_action = 'domain_bulk_search'
+        self.helper.use_custom_control = False
+        self.helper.form_class = 'form-horizontal'
+        self.helper.label_class = 'col-lg-3'
+        self.helper.field_class = 'col-lg-9 my-1'
+        self.helper.layout = crispy_forms.layout.Layout(
+            'domains',
+        )
+
+        self.helper.add_input(crispy_forms.layout.Submit('submit', 'Search'))
+
+    def clean_domains(self):
+        domains = list(filter(None, map(lambda d: d.strip(), self.cleaned_data['domains'].splitlines())))
+        if len(domains) > availability.BULK_CHECK_MAX_DOMAINS:
+            raise forms.ValidationError(f"At most {availability.BULK_CHECK_MAX_DOMAINS} domains can be searched at once")
+        return domains
+
+
 def map_period(period: apps.epp_api.Period):
     str_value = str(period.value)
     if period.unit == 0:
@@ -0,0 +1,145 @@
+import bisect
+import collections
+import os
+import threading
+import time
+import typing
+import urllib.parse
+
+import requests
+import requests.adapters
+from django.conf import settings
+from urllib3.util.retry import Retry
+
+CONNECT_TIMEOUT = 5
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+HOST_TIMEOUTS = {
+    "sugapi.verisign-grs.com": 10,
+    "ote-sugapi.verisign-grs.com": 10,
+}
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: typing.Sequence[float]):
+        self.lock = threading.Lock()
+        self.buckets = tuple(buckets)
+        self.counts = {}
+        self.total_time = collections.Counter()
+        self.errors = collections.Counter()
+
+    def record(self, endpoint: str, elapsed: float, error: bool = False):
+        with self.lock:
+            counts = self.counts.setdefault(endpoint, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+            self.total_time[endpoint] += elapsed
+            if error:
+                self.errors[endpoint] += 1
+
+    def _quantile(self, counts: typing.List[int], q: float) -> typing.Optional[float]:
+        target = sum(counts) * q
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            out = []
+            for endpoint, counts in sorted(self.counts.items()):
+                total = sum(counts)
+                cumulative = 0
+                buckets = []
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    buckets.append({"le": bound, "count": cumulative})
+                p50 = self._quantile(counts, 0.5)
+                p95 = self._quantile(counts, 0.95)
+                out.append({
+                    "endpoint": endpoint,
+                    "count": total,
+                    "errors": self.errors[endpoint],
+                    "mean_ms": self.total_time[endpoint] / total * 1000,
+                    "p50_ms": p50 * 1000 if p50 is not None else None,
+                    "p95_ms": p95 * 1000 if p95 is not None else None,
+                    "buckets": buckets,
+                })
+            return out
+
+
+class HTTPClient:
+    def __init__(
+            self,
+            default_timeout: float,
+            host_timeouts: typing.Dict[str, float],
+            max_retries: int,
+            backoff_factor: float,
+            pool_maxsize: int
+    ):
+        self.default_timeout = default_timeout
+        self.host_timeouts = host_timeouts
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.latency = LatencyHistogram(LATENCY_BUCKETS)
+        self.session = self._make_session()
+
+    def _make_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=10, pool_maxsize=self.pool_maxsize, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def reset(self):
+        self.session = self._make_session()
+
+    def timeout(self, host: typing.Optional[str]):
+        return CONNECT_TIMEOUT, self.host_timeouts.get(host, self.default_timeout)
+
+    def request(self, method: str, url: str, endpoint: typing.Optional[str] = None, **kwargs) -> requests.Response:
+        host = urllib.parse.urlsplit(url).hostname
+        kwargs.setdefault("timeout", self.timeout(host))
+        if endpoint is None:
+            endpoint = f"{method.upper()} {host}"
+
+        started = time.monotonic()
+        try:
+            r = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self.latency.record(endpoint, time.monotonic() - started, error=True)
+            raise
+        self.latency.record(endpoint, time.monotonic() - started, error=r.status_code >= 500)
+        return r
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def latency_stats(self):
+        return self.latency.snapshot()
+
+
+client = HTTPClient(
+    default_timeout=settings.HTTP_TIMEOUT,
+    host_timeouts={**HOST_TIMEOUTS, **settings.HTTP_HOST_TIMEOUTS},
+    max_retries=settings.HTTP_MAX_RETRIES,
+    backoff_factor=settings.HTTP_RETRY_BACKOFF,
+    pool_maxsize=settings.HTTP_POOL_SIZE,
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=client.reset)
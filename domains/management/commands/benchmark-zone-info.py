@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+import timeit
+from domains import models, zone_info
+
+
+def get_domain_info_linear(domain: str):
+    parts = domain.rstrip(".").split(".", maxsplit=1)
+    if len(parts) != 2:
+        return None, domain
+    sld, tld = parts
+    for zone in zone_info.ZONES:
+        if zone[0] == tld:
+            return zone[1], sld
+
+    return None, sld
+
+
+class Command(BaseCommand):
+    help = 'Compares zone lookup by linear scan against the zone index over registered domain names'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=100)
+
+    def handle(self, *args, **options):
+        names = list(models.DomainRegistration.objects.values_list("domain", flat=True))
+        if not names:
+            names = [f"example.{zone[0]}" for zone in zone_info.ZONES]
+        repeat = options["repeat"]
+
+        for name in names:
+            if get_domain_info_linear(name) != zone_info.get_domain_info(name):
+                print(f"Mismatch for {name}")
+
+        linear_time = timeit.timeit(lambda: [get_domain_info_linear(n) for n in names], number=repeat)
+        index_time = timeit.timeit(lambda: [zone_info.get_domain_info(n) for n in names], number=repeat)
+        lookups = len(names) * repeat
+
+        print(f"{len(names)} names, {lookups} lookups")
+        print(f"Linear scan: {linear_time:.4f}s ({linear_time / lookups * 1e6:.3f}us/lookup)")
+        print(f"Zone index: {index_time:.4f}s ({index_time / lookups * 1e6:.3f}us/lookup)")
+        print(f"Speedup: {linear_time / index_time:.1f}x")
@@ -2,19 +2,27 @@ from django.core.management.base import BaseCommand
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
-import dns.query
+import dns.asyncbackend
+import dns.asyncquery
+import dns.asyncresolver
+import dns.inet
 import dns.resolver
 import dns.rdataclass
 import dns.rdatatype
 import dns.exception
 import dns.rdtypes
+import asyncio
 import base64
 import grpc
+import json
+import os
 import socket
+import time
+from asgiref.sync import sync_to_async
 from domains import models, zone_info, apps
 
 
-resolver = dns.resolver.Resolver(configure=False)
+resolver = dns.asyncresolver.Resolver(configure=False)
 resolver.nameservers = [socket.getaddrinfo(settings.RESOLVER_ADDR, None)[0][4][0]]
 resolver.port = settings.RESOLVER_PORT
 
@@ -61,13 +69,212 @@ def mail_disabled(user, domain):
     email.send()
 
 
+def validate_message(domain_name, msg, dnskey_set, ds_set, covers=dns.rdatatype.DNSKEY, exact=True):
+    data_set = msg.get_rrset(
+        dns.message.ANSWER, domain_name, dns.rdataclass.IN, covers
+    )
+    rrsig = msg.get_rrset(
+        dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.RRSIG, covers
+    )
+    if not data_set:
+        raise dns.dnssec.ValidationFailure("no suitable records")
+    if not rrsig:
+        raise dns.dnssec.ValidationFailure("no suitable RRSIGs")
+
+    found_dnskeys = dns.rdataset.Rdataset(dns.rdataclass.IN, dns.rdatatype.DNSKEY)
+    for cds in ds_set:
+        possible_dnskeys = filter(lambda rr: dns.dnssec.key_id(rr) == cds.key_tag, dnskey_set)
+        for key in possible_dnskeys:
+            ds = dns.dnssec.make_ds(domain_name, key, cds.digest_type)
+            if ds.digest == cds.digest:
+                found_dnskeys.add(key)
+
+    if not found_dnskeys or not data_set:
+        raise dns.dnssec.ValidationFailure("no suitable DNSKEYs")
+
+    dns.dnssec.validate(data_set, rrsig, {
+        domain_name: dnskey_set if not exact else found_dnskeys
+    })
+
+
+class ScanRetry(Exception):
+    pass
+
+
+class NameServerLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self.next_query = {}
+
+    async def wait(self, ns_ip):
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self.next_query.get(ns_ip, now))
+        self.next_query[ns_ip] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class NameServerAddresses:
+    def __init__(self):
+        self.lookups = {}
+        self.requested = 0
+
+    async def resolve(self, ns):
+        self.requested += 1
+        if ns not in self.lookups:
+            self.lookups[ns] = asyncio.ensure_future(
+                asyncio.get_running_loop().getaddrinfo(ns, None, family=socket.AF_INET6)
+            )
+        return await asyncio.shield(self.lookups[ns])
+
+
+class NameServerConnections:
+    def __init__(self, limiter: NameServerLimiter, timeout: float, max_in_flight: int):
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.backend = dns.asyncbackend.get_default_backend()
+        self.idle = {}
+        self.in_flight = {}
+        self.no_pipelining = set()
+        self.opened = 0
+        self.queries = 0
+
+    async def connect(self, ns_ip):
+        af = dns.inet.af_for_address(ns_ip)
+        sock = await self.backend.make_socket(
+            af, socket.SOCK_STREAM, 0, None, dns.inet.low_level_address_tuple((ns_ip, 53), af), self.timeout
+        )
+        self.opened += 1
+        return sock
+
+    @staticmethod
+    async def close(sock):
+        try:
+            await sock.close()
+        except OSError:
+            pass
+
+    async def close_all(self):
+        for socks in self.idle.values():
+            while socks:
+                await self.close(socks.pop())
+
+    async def exchange(self, sock, ns_ip, msgs):
+        expiration = time.time() + self.timeout
+        for msg in msgs:
+            await self.limiter.wait(ns_ip)
+            await dns.asyncquery.send_tcp(sock, msg, expiration)
+            self.queries += 1
+
+        responses = {}
+        while len(responses) < len(msgs):
+            resp, _ = await dns.asyncquery.receive_tcp(sock, expiration)
+            responses[resp.id] = resp
+        return [responses[msg.id] for msg in msgs]
+
+    async def query_once(self, ns_ip, msgs):
+        idle = self.idle.setdefault(ns_ip, [])
+        if idle:
+            sock = idle.pop()
+            try:
+                responses = await self.exchange(sock, ns_ip, msgs)
+            except (EOFError, ConnectionError):
+                await self.close(sock)
+            except BaseException:
+                await self.close(sock)
+                raise
+            else:
+                idle.append(sock)
+                return responses
+
+        sock = await self.connect(ns_ip)
+        try:
+            responses = await self.exchange(sock, ns_ip, msgs)
+        except BaseException:
+            await self.close(sock)
+            raise
+        idle.append(sock)
+        return responses
+
+    async def query(self, ns_ip, msgs):
+        in_flight = self.in_flight.setdefault(ns_ip, asyncio.Semaphore(self.max_in_flight))
+        async with in_flight:
+            if ns_ip not in self.no_pipelining:
+                try:
+                    return await self.query_once(ns_ip, msgs)
+                except EOFError:
+                    if len(msgs) == 1:
+                        raise
+                    self.no_pipelining.add(ns_ip)
+
+            responses = []
+            for msg in msgs:
+                responses.extend(await self.query_once(ns_ip, [msg]))
+            return responses
+
+
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.unsaved = 0
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.done = set(json.load(f)["done"])
+
+    def mark_done(self, domain_id):
+        self.done.add(str(domain_id))
+        self.unsaved += 1
+        if self.unsaved >= 100:
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.path)
+        self.unsaved = 0
+
+    def finish(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
 class Command(BaseCommand):
     help = 'Runs updates to DS/DNSKEY based on CDS/CDNSKEY'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=32,
+            help="Number of domains to scan at once"
+        )
+        parser.add_argument(
+            "--ns-rate", type=float, default=10,
+            help="Maximum queries per second sent to a single nameserver IP"
+        )
+        parser.add_argument(
+            "--ns-in-flight", type=int, default=4,
+            help="Maximum concurrent exchanges (and TCP connections) with a single nameserver IP"
+        )
+        parser.add_argument(
+            "--checkpoint", type=str, default=None,
+            help="File to record progress in, an interrupted run resumes from it"
+        )
+
     def handle(self, *args, **options):
-        domains = models.DomainRegistration.objects.filter(deleted=False, former_domain=False)
+        checkpoint = Checkpoint(options["checkpoint"])
+        if checkpoint.done:
+            print(f"Resuming, {len(checkpoint.done)} domains already done")
+
+        domains = []
+        for domain in models.DomainRegistration.objects.filter(deleted=False, former_domain=False)\
+                .select_related('owner'):
+            if str(domain.id) in checkpoint.done:
+                continue
 
-        for domain in domains:
             domain_info, sld = zone_info.get_domain_info(domain.domain)
 
             if not domain_info:
@@ -78,236 +285,247 @@ class Command(BaseCommand):
                 print(f"Ignoring CDS on {domain.domain}: handled by registry")
                 continue
 
-            try:
-                domain_data = apps.epp_client.get_domain(domain.domain)
-            except grpc.RpcError as rpc_error:
-                print(f"Can't get data for {domain.domain}: {rpc_error.details()}")
-                continue
-
-            name_servers = list(map(lambda ns: ns.host_obj if ns.host_obj else ns.host_name, domain_data.name_servers))
-            domain_name = dns.name.from_text(domain.domain)
-
-            if not name_servers:
-                continue
-
-            user = domain.get_user()
+            domains.append((domain, domain_info))
+
+        try:
+            asyncio.run(self.scan_domains(
+                domains, checkpoint, options["concurrency"], options["ns_rate"], options["ns_in_flight"]
+            ))
+        finally:
+            checkpoint.save()
+        checkpoint.finish()
+
+    async def scan_domains(self, domains, checkpoint: Checkpoint, concurrency: int, ns_rate: float,
+                           ns_in_flight: int):
+        self.domain_limit = asyncio.Semaphore(concurrency)
+        self.ns_limiter = NameServerLimiter(ns_rate)
+        self.ns_addresses = NameServerAddresses()
+        self.ns_connections = NameServerConnections(self.ns_limiter, timeout=15, max_in_flight=ns_in_flight)
+
+        async def scan(domain, domain_info):
+            async with self.domain_limit:
+                try:
+                    await self.scan_domain(domain, domain_info)
+                except ScanRetry as e:
+                    print(e)
+                    return
+                except Exception as e:
+                    print(f"Scanning {domain.domain} failed: {e!r}")
+                    return
+            checkpoint.mark_done(domain.id)
+
+        try:
+            await asyncio.gather(*(scan(domain, domain_info) for domain, domain_info in domains))
+        finally:
+            await self.ns_connections.close_all()
+
+            lookups_saved = self.ns_addresses.requested - len(self.ns_addresses.lookups)
+            connections_saved = self.ns_connections.queries - self.ns_connections.opened
+            print(
+                f"NS address lookups: {self.ns_addresses.requested} requested, "
+                f"{len(self.ns_addresses.lookups)} performed, {lookups_saved} saved"
+            )
+            print(
+                f"NS connections: {self.ns_connections.queries} queries, "
+                f"{self.ns_connections.opened} connections opened, {connections_saved} saved"
+            )
+            if self.ns_connections.no_pipelining:
+                print(f"NS IPs without pipelining support: {len(self.ns_connections.no_pipelining)}")
 
+    async def scan_domain(self, domain: models.DomainRegistration, domain_info: zone_info.DomainInfo):
+        try:
+            domain_data = await sync_to_async(apps.epp_client.get_domain, thread_sensitive=False)(
+                domain.domain, use_cache=False
+            )
+        except grpc.RpcError as rpc_error:
+            raise ScanRetry(f"Can't get data for {domain.domain}: {rpc_error.details()}")
+
+        name_servers = list(map(lambda ns: ns.host_obj if ns.host_obj else ns.host_name, domain_data.name_servers))
+        domain_name = dns.name.from_text(domain.domain)
+
+        if not name_servers:
+            return
+
+        try:
+            original_ds_msg = (await resolver.resolve(
+                domain_name, dns.rdatatype.DS, raise_on_no_answer=False
+            )).response
+        except dns.resolver.NXDOMAIN:
+            print(f"Getting DS of {domain.domain} returned NXDOMAIN")
+            return
+        except dns.resolver.NoNameservers:
+            raise ScanRetry(f"Getting DS of {domain.domain} no nameservers")
+        except dns.exception.Timeout:
+            raise ScanRetry(f"Getting DS of {domain.domain} timed out")
+
+        if original_ds_msg.rcode() != 0:
+            raise ScanRetry(f"Getting DS of {domain.domain} returned error")
+
+        original_ds = original_ds_msg.get_rrset(
+            dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DS
+        )
+        cds_type = dns.rdatatype.CDS if domain_info.ds_data_supported else dns.rdatatype.CDNSKEY
+
+        results = await self.get_cds(domain, domain_name, name_servers, cds_type, original_ds)
+        if results is None:
+            return
+        cds_results, dnskey_results = results
+
+        if not cds_results:
+            return
+
+        await sync_to_async(self.apply_cds)(domain, domain_info, domain_data, domain_name, cds_results, dnskey_results)
+
+    async def query_ns(self, ns_ip, domain_name, rdtypes):
+        msgs = []
+        for rdtype in rdtypes:
+            msg = dns.message.make_query(domain_name, rdtype)
+            msg.use_edns(ednsflags=dns.flags.DO)
+            msgs.append(msg)
+        return await self.ns_connections.query(ns_ip, msgs)
+
+    async def get_cds(self, domain, domain_name, name_servers, cds_type, original_ds):
+        cds, dnskey = {}, {}
+
+        for ns in name_servers:
             try:
-                original_ds_msg = resolver.resolve(
-                    domain_name, dns.rdatatype.DS, raise_on_no_answer=False
-                ).response
-            except dns.resolver.NXDOMAIN:
-                print(f"Getting DS of {domain.domain} returned NXDOMAIN")
-                continue
-            except dns.resolver.NoNameservers:
-                print(f"Getting DS of {domain.domain} no nameservers")
-                continue
-            except dns.exception.Timeout:
-                print(f"Getting DS of {domain.domain} timed out")
-                continue
-
-            if original_ds_msg.rcode() != 0:
-                print(f"Getting DS of {domain.domain} returned error")
-                continue
+                ns_ips = await self.ns_addresses.resolve(ns)
+            except socket.gaierror as e:
+                raise ScanRetry(f"Getting IP of {ns} for domain {domain.domain}: {e.args[1]}")
 
-            original_ds = original_ds_msg.get_rrset(
-                dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DS
-            )
-            cds_type = dns.rdatatype.CDS if domain_info.ds_data_supported else dns.rdatatype.CDNSKEY
+            for ns_ip in ns_ips:
+                ns_ip = ns_ip[4][0]
+                if ns_ip in cds:
+                    continue
 
-            def validate_message(msg, dnskey_set, ds_set, covers=dns.rdatatype.DNSKEY, exact=True):
-                data_set = msg.get_rrset(
-                    dns.message.ANSWER, domain_name, dns.rdataclass.IN, covers
+                try:
+                    dns_cds, dns_dnskey = await self.query_ns(ns_ip, domain_name, (cds_type, dns.rdatatype.DNSKEY))
+                except dns.exception.Timeout:
+                    raise ScanRetry(f"NS {ns} (IP {ns_ip}) for domain {domain.domain} timed out")
+                except (OSError, EOFError) as e:
+                    raise ScanRetry(f"Can't access NS {ns} (IP {ns_ip}) for domain {domain.domain}: {e}")
+
+                if dns_cds.rcode() == dns.rcode.NXDOMAIN:
+                    print(f"NS {ns} (IP {ns_ip}) for domain {domain.domain} returned NXDOMAIN")
+                    return
+
+                cds_rrs = dns_cds.get_rrset(
+                    dns.message.ANSWER, domain_name, dns.rdataclass.IN, cds_type
                 )
-                rrsig = msg.get_rrset(
-                    dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.RRSIG, covers
+                dnskey_rrs = dns_dnskey.get_rrset(
+                    dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DNSKEY
                 )
-                if not data_set:
-                    raise dns.dnssec.ValidationFailure("no suitable records")
-                if not rrsig:
-                    raise dns.dnssec.ValidationFailure("no suitable RRSIGs")
-
-                found_dnskeys = dns.rdataset.Rdataset(dns.rdataclass.IN, dns.rdatatype.DNSKEY)
-                for cds in ds_set:
-                    possible_dnskeys = filter(lambda rr: dns.dnssec.key_id(rr) == cds.key_tag, dnskey_set)
-                    for key in possible_dnskeys:
-                        ds = dns.dnssec.make_ds(domain_name, key, cds.digest_type)
-                        if ds.digest == cds.digest:
-                            found_dnskeys.add(key)
-
-                if not found_dnskeys or not data_set:
-                    raise dns.dnssec.ValidationFailure("no suitable DNSKEYs")
-
-                dns.dnssec.validate(data_set, rrsig, {
-                    domain_name: dnskey_set if not exact else found_dnskeys
-                })
-
-            def get_cds():
-                cds, dnskey = {}, {}
-
-                for ns in name_servers:
-                    try:
-                        ns_ips = socket.getaddrinfo(ns, None, socket.AF_INET6)
-                    except socket.gaierror as e:
-                        print(f"Getting IP of {ns} for domain {domain.domain}: {e.args[1]}")
-                        return
-
-                    for ns_ip in ns_ips:
-                        ns_ip = ns_ip[4][0]
-                        if ns_ip in cds:
-                            continue
-
-                        try:
-                            msg = dns.message.make_query(domain_name, cds_type)
-                            msg.use_edns(ednsflags=dns.flags.DO)
-                            dns_cds = dns.query.tcp(msg, ns_ip, timeout=15)
-                        except dns.exception.Timeout:
-                            print(f"NS {ns} (IP {ns_ip}) for domain {domain.domain} timed out")
-                            return
-                        except OSError as e:
-                            print(f"Can't access NS {ns} (IP {ns_ip}) for domain {domain.domain}: {e}")
-                            return
-
-                        if dns_cds.rcode() == dns.rcode.NXDOMAIN:
-                            print(f"NS {ns} (IP {ns_ip}) for domain {domain.domain} returned NXDOMAIN")
-                            return
-
-                        try:
-                            msg = dns.message.make_query(domain_name, dns.rdatatype.DNSKEY)
-                            msg.use_edns(ednsflags=dns.flags.DO)
-                            dns_dnskey = dns.query.tcp(msg, ns_ip, timeout=15)
-                        except dns.exception.Timeout:
-                            print(f"NS {ns} (IP {ns_ip}) for domain {domain.domain} timed out")
-                            return
-                        except OSError as e:
-                            print(f"Can't access NS {ns} (IP {ns_ip}) for domain {domain.domain}: {e}")
-                            return
-
-                        cds_rrs = dns_cds.get_rrset(
-                            dns.message.ANSWER, domain_name, dns.rdataclass.IN, cds_type
-                        )
-                        dnskey_rrs = dns_dnskey.get_rrset(
-                            dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DNSKEY
-                        )
 
-                        try:
-                            if original_ds:
-                                validate_message(dns_dnskey, dnskey_rrs, original_ds)
-                                validate_message(dns_cds, dnskey_rrs, original_ds, cds_type, False)
-                        except dns.dnssec.ValidationFailure:
-                            print(f"{domain.domain} failed validation with current DS set")
-                            return
+                try:
+                    if original_ds:
+                        validate_message(domain_name, dns_dnskey, dnskey_rrs, original_ds)
+                        validate_message(domain_name, dns_cds, dnskey_rrs, original_ds, cds_type, False)
+                except dns.dnssec.ValidationFailure:
+                    print(f"{domain.domain} failed validation with current DS set")
+                    return
 
-                        if cds_rrs:
-                            cds[ns_ip] = cds_rrs
-                        if dnskey_rrs:
-                            dnskey[ns_ip] = dns_dnskey
+                if cds_rrs:
+                    cds[ns_ip] = cds_rrs
+                if dnskey_rrs:
+                    dnskey[ns_ip] = dns_dnskey
 
-                return cds, dnskey
+        return cds, dnskey
 
-            results = get_cds()
-            if results is None:
-                continue
-            cds_results, dnskey_results = results
+    def apply_cds(self, domain, domain_info, domain_data, domain_name, cds_results, dnskey_results):
+        cds_values = list(cds_results.values())
+        if cds_values.count(cds_values[0]) != len(cds_values):
+            print(f"{domain.domain} has differing CDS records")
+            return
 
-            if not cds_results:
-                continue
+        user = domain.get_user()
+        cds_data_set = cds_values[0]
 
-            cds_values = list(cds_results.values())
-            if cds_values.count(cds_values[0]) != len(cds_values):
-                print(f"{domain.domain} has differing CDS records")
-                continue
+        if len(cds_data_set) == 1 and cds_data_set[0].algorithm == 0:
+            if domain_data.sec_dns:
+                try:
+                    apps.epp_client.update_domain(apps.epp_api.domain_pb2.DomainUpdateRequest(
+                        name=domain.domain,
+                        sec_dns=apps.epp_api.domain_pb2.UpdateSecDNSData(
+                            remove_all=True
+                        )
+                    ))
+                except grpc.RpcError as rpc_error:
+                    raise ScanRetry(f"Can't remove DNSSEC for {domain.domain}: {rpc_error.details()}")
+
+                mail_disabled(user, domain)
+        else:
+            current_cds_set = []
+            if domain_data.sec_dns:
+                if domain_info.ds_data_supported:
+                    current_cds_set = list(map(lambda r: apps.epp_api.SecDNSDSData(
+                        key_tag=r.key_tag,
+                        algorithm=r.algorithm,
+                        digest_type=r.digest_type,
+                        digest=r.digest.upper(),
+                        key_data=None
+                    ), domain_data.sec_dns.ds_data))
+                else:
+                    current_cds_set = domain_data.sec_dns.key_data
 
-            cds_data_set = cds_values[0]
-
-            if len(cds_data_set) == 1 and cds_data_set[0].algorithm == 0:
-                if domain_data.sec_dns:
-                    try:
-                        apps.epp_client.stub.DomainUpdate(apps.epp_api.domain_pb2.DomainUpdateRequest(
-                            name=domain.domain,
-                            sec_dns=apps.epp_api.domain_pb2.UpdateSecDNSData(
-                                remove_all=True
-                            )
-                        ))
-                    except grpc.RpcError as rpc_error:
-                        print(f"Can't remove DNSSEC for {domain.domain}: {rpc_error.details()}")
-                        continue
-
-                    mail_disabled(user, domain)
+            if not domain_info.ds_data_supported:
+                cds_set = list(map(lambda d: dns.dnssec.make_ds(domain_name, d, "SHA256"), cds_data_set))
             else:
-                current_cds_set = []
-                if domain_data.sec_dns:
-                    if domain_info.ds_data_supported:
-                        current_cds_set = list(map(lambda r: apps.epp_api.SecDNSDSData(
-                            key_tag=r.key_tag,
-                            algorithm=r.algorithm,
-                            digest_type=r.digest_type,
-                            digest=r.digest.upper(),
-                            key_data=None
-                        ), domain_data.sec_dns.ds_data))
-                    else:
-                        current_cds_set = domain_data.sec_dns.key_data
-
-                if not domain_info.ds_data_supported:
-                    cds_set = list(map(lambda d: dns.dnssec.make_ds(domain_name, d, "SHA256"), cds_data_set))
-                else:
-                    cds_set = cds_data_set
+                cds_set = cds_data_set
 
-                try:
-                    for res in dnskey_results.values():
-                        dnskey = res.get_rrset(dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DNSKEY)
-                        validate_message(res, dnskey, cds_set)
-                except dns.dnssec.ValidationFailure:
-                    print(f"{domain.domain} failed validation with presented CDS set")
+            try:
+                for res in dnskey_results.values():
+                    dnskey = res.get_rrset(dns.message.ANSWER, domain_name, dns.rdataclass.IN, dns.rdatatype.DNSKEY)
+                    validate_message(domain_name, res, dnskey, cds_set)
+            except dns.dnssec.ValidationFailure:
+                print(f"{domain.domain} failed validation with presented CDS set")
+                return
+
+            for cds in cds_set:
+                if not (
+                        cds.algorithm in domain_info.supported_dnssec_algorithms or cds.algorithm == 0
+                ) or not (
+                        cds.digest_type in domain_info.supported_dnssec_digests or cds.digest_type == 0
+                ):
+                    print(f"{domain.domain} CDS uses invalid algorithm/digest")
                     continue
 
-                for cds in cds_set:
-                    if not (
-                            cds.algorithm in domain_info.supported_dnssec_algorithms or cds.algorithm == 0
-                    ) or not (
-                            cds.digest_type in domain_info.supported_dnssec_digests or cds.digest_type == 0
-                    ):
-                        print(f"{domain.domain} CDS uses invalid algorithm/digest")
-                        continue
-
+            if domain_info.ds_data_supported:
+                cds_data_set = list(map(lambda r: apps.epp_api.SecDNSDSData(
+                    key_tag=int(r.key_tag),
+                    algorithm=int(r.algorithm),
+                    digest_type=int(r.digest_type),
+                    digest=r.digest.hex().upper(),
+                    key_data=None
+                ), cds_data_set))
+            else:
+                cds_data_set = list(map(lambda r: apps.epp_api.SecDNSKeyData(
+                    flags=int(r.flags),
+                    protocol=r.protocol,
+                    algorithm=int(r.algorithm),
+                    public_key=base64.b64encode(r.key).decode(),
+                ), cds_data_set))
+
+            rem_cds_set = list(filter(lambda d: d not in cds_data_set, current_cds_set))
+            add_cds_set = list(filter(lambda d: d not in current_cds_set, cds_data_set))
+
+            if rem_cds_set or add_cds_set:
+                req = apps.epp_api.domain_pb2.DomainUpdateRequest(
+                    name=domain.domain,
+                )
                 if domain_info.ds_data_supported:
-                    cds_data_set = list(map(lambda r: apps.epp_api.SecDNSDSData(
-                        key_tag=int(r.key_tag),
-                        algorithm=int(r.algorithm),
-                        digest_type=int(r.digest_type),
-                        digest=r.digest.hex().upper(),
-                        key_data=None
-                    ), cds_data_set))
+                    if rem_cds_set:
+                        req.sec_dns.rem_ds_data.data.extend(map(lambda d: d.to_pb(), rem_cds_set))
+                    if add_cds_set:
+                        req.sec_dns.add_ds_data.data.extend(map(lambda d: d.to_pb(), add_cds_set))
                 else:
-                    cds_data_set = list(map(lambda r: apps.epp_api.SecDNSKeyData(
-                        flags=int(r.flags),
-                        protocol=r.protocol,
-                        algorithm=int(r.algorithm),
-                        public_key=base64.b64encode(r.key).decode(),
-                    ), cds_data_set))
-
-                rem_cds_set = list(filter(lambda d: d not in cds_data_set, current_cds_set))
-                add_cds_set = list(filter(lambda d: d not in current_cds_set, cds_data_set))
-
-                if rem_cds_set or add_cds_set:
-                    req = apps.epp_api.domain_pb2.DomainUpdateRequest(
-                        name=domain.domain,
-                    )
-                    if domain_info.ds_data_supported:
-                        if rem_cds_set:
-                            req.sec_dns.rem_ds_data.data.extend(map(lambda d: d.to_pb(), rem_cds_set))
-                        if add_cds_set:
-                            req.sec_dns.add_ds_data.data.extend(map(lambda d: d.to_pb(), add_cds_set))
-                    else:
-                        if rem_cds_set:
-                            req.sec_dns.rem_key_data.data.extend(map(lambda d: d.to_pb(), rem_cds_set))
-                        if add_cds_set:
-                            req.sec_dns.add_key_data.data.extend(map(lambda d: d.to_pb(), add_cds_set))
-
-                    try:
-                        apps.epp_client.stub.DomainUpdate(req)
-                    except grpc.RpcError as rpc_error:
-                        print(f"Can't update DNSSEC for {domain.domain}: {rpc_error.details()}")
-                        continue
-
-                    mail_update(user, domain, add_cds_set, rem_cds_set, domain_info.ds_data_supported)
+                    if rem_cds_set:
+                        req.sec_dns.rem_key_data.data.extend(map(lambda d: d.to_pb(), rem_cds_set))
+                    if add_cds_set:
+                        req.sec_dns.add_key_data.data.extend(map(lambda d: d.to_pb(), add_cds_set))
+
+                try:
+                    apps.epp_client.update_domain(req)
+                except grpc.RpcError as rpc_error:
+                    raise ScanRetry(f"Can't update DNSSEC for {domain.domain}: {rpc_error.details()}")
+
+                mail_update(user, domain, add_cds_set, rem_cds_set, domain_info.ds_data_supported)
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from domains import apps, models
+from domains import apps, models, tasks
 from django.conf import settings
 from django.shortcuts import reverse
 from django.core.mail import EmailMultiAlternatives
@@ -139,6 +139,14 @@ class Command(BaseCommand):
                 c.exit()
 
     def callback(self, client: PollClient, m: domains.epp_api.epp_grpc.epp_pb2.PollReply):
+        data_type = m.WhichOneof("data")
+        if data_type in ("domain_info", "domain_transfer", "domain_create", "domain_renew", "domain_pan"):
+            apps.epp_client.invalidate_domain(getattr(m, data_type).name)
+        if data_type == "domain_info":
+            models.DomainRegistration.mirror_registry_data(apps.epp_api.Domain.from_pb(m.domain_info, apps.epp_client))
+        elif data_type in ("domain_transfer", "domain_create", "domain_renew", "domain_pan"):
+            tasks.sync_domain_registry_data.delay(getattr(m, data_type).name)
+
         if m.HasField("change_data") and m.WhichOneof("data") == "domain_info":
             self.handle_domain_update(m)
 
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+import datetime
+from domains import models
+
+OWNED_MODELS = (
+    models.DomainRegistration,
+    models.DomainRegistrationOrder,
+    models.DomainTransferOrder,
+    models.DomainRenewOrder,
+    models.DomainRestoreOrder,
+)
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the cached resource owners from Keycloak'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true', help="Only fill in objects with no cached owner")
+        parser.add_argument('--stale-only', action='store_true', help="Only refresh owners older than the TTL")
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - datetime.timedelta(seconds=settings.RESOURCE_OWNER_TTL)
+        for model in OWNED_MODELS:
+            objs = model.objects.exclude(resource_id=None)
+            if options["missing_only"]:
+                objs = objs.filter(owner=None)
+            elif options["stale_only"]:
+                objs = objs.filter(Q(owner=None) | Q(owner_synced_at=None) | Q(owner_synced_at__lt=stale_before))
+
+            changed = 0
+            for obj in objs.iterator():
+                old_owner_id = obj.owner_id
+                obj.refresh_owner()
+                if obj.owner_id != old_owner_id:
+                    changed += 1
+
+            print(f"{model.__name__}: {changed} owners updated")
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django_countries import countries
+import time
+import typing
+from domains import models, zone_info
+from domains.views import billing
+
+
+def table_slds(pricing) -> typing.Optional[typing.Dict[typing.Optional[int], str]]:
+    if isinstance(pricing, zone_info.MarkupPrice):
+        return None
+    elif isinstance(pricing, zone_info.LengthPrice):
+        slds = {None: "a" * (max(pricing.lengths.keys(), default=0) + 1)}
+        for length in pricing.lengths.keys():
+            slds[length] = "a" * length
+        return slds
+    else:
+        return {None: "a"}
+
+
+def amounts(price: typing.Optional[billing.Price]):
+    if price is None:
+        return None, None
+    return price.amount, price.amount_inc_vat
+
+
+class Command(BaseCommand):
+    help = 'Materialises the public price table for all zones and VAT classes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3, help="Number of old tables to keep")
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        zones = [(zone_name, zone, table_slds(zone.pricing)) for zone_name, zone in zone_info.ZONE_INDEX.items()]
+        currencies = sorted(set(zone.pricing.currency for _, zone, slds in zones if slds is not None))
+
+        vat_classes = {}
+        country_classes = {}
+        for country in countries:
+            rates = []
+            for currency in currencies:
+                rate = billing.get_currency_rate(currency, None, None, country.code, refresh=True)
+                rates.append((currency, rate.rate, rate.vat_rate, rate.taxable))
+            rates = tuple(rates)
+            country_classes[country.code] = vat_classes.setdefault(rates, (len(vat_classes), country.code))[0]
+        print(f"Resolved {len(country_classes)} countries into {len(vat_classes)} VAT classes")
+
+        entries = []
+        for zone_name, zone, slds in zones:
+            pricing = zone.pricing
+            entries.append(models.PriceTableEntry(
+                zone=zone_name,
+                currency=pricing.currency,
+                registration=pricing.representative_registration(),
+                renewal=pricing.representative_renewal(),
+                restore=pricing.representative_restore(),
+                transfer=pricing.representative_transfer(),
+            ))
+            if slds is None:
+                continue
+
+            for vat_class, country in vat_classes.values():
+                for sld_length, sld in slds.items():
+                    registration, registration_inc_vat = amounts(pricing.registration(country, None, sld))
+                    renewal, renewal_inc_vat = amounts(pricing.renewal(country, None, sld))
+                    restore, restore_inc_vat = amounts(pricing.restore(country, None, sld))
+                    transfer, transfer_inc_vat = amounts(pricing.transfer(country, None, sld))
+                    entries.append(models.PriceTableEntry(
+                        zone=zone_name,
+                        vat_class=vat_class,
+                        sld_length=sld_length,
+                        currency="GBP",
+                        registration=registration,
+                        registration_inc_vat=registration_inc_vat,
+                        renewal=renewal,
+                        renewal_inc_vat=renewal_inc_vat,
+                        restore=restore,
+                        restore_inc_vat=restore_inc_vat,
+                        transfer=transfer,
+                        transfer_inc_vat=transfer_inc_vat,
+                    ))
+
+        with transaction.atomic():
+            version = (models.PriceTable.objects.aggregate(version=Max('version'))["version"] or 0) + 1
+            table = models.PriceTable.objects.create(version=version, generated_at=timezone.now())
+            models.PriceTableCountry.objects.bulk_create([
+                models.PriceTableCountry(table=table, country=country, vat_class=vat_class)
+                for country, vat_class in country_classes.items()
+            ])
+            for entry in entries:
+                entry.table = table
+            models.PriceTableEntry.objects.bulk_create(entries, batch_size=1000)
+
+        old_tables = models.PriceTable.objects.order_by('-version')[options["keep"]:]
+        models.PriceTable.objects.filter(id__in=[t.id for t in old_tables]).delete()
+
+        print(f"Built price table v{version} with {len(entries)} entries in {time.monotonic() - start:.2f}s")
@@ -0,0 +1,157 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+import dataclasses
+import datetime
+import threading
+import time
+import typing
+import grpc
+from domains import models, zone_info, apps
+
+PRIORITY_VIEW_WINDOW = datetime.timedelta(days=1)
+PRIORITY_EXPIRY_WINDOW = datetime.timedelta(days=60)
+
+
+@dataclasses.dataclass
+class SyncItem:
+    object_type: str
+    name: str
+    registry_name: str
+    priority: bool
+    synced_at: typing.Optional[datetime.datetime]
+
+    @property
+    def sort_key(self):
+        return (
+            self.synced_at is not None,
+            not self.priority,
+            self.synced_at or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        )
+
+
+class RegistryWorker(threading.Thread):
+    def __init__(self, registry_name: str, items: typing.List[SyncItem], rate: float):
+        super().__init__(daemon=True)
+        self.registry_name = registry_name
+        self.items = sorted(items, key=lambda i: i.sort_key)
+        self.interval = 1 / rate if rate else 0
+        self.synced = 0
+        self.failed = 0
+
+    def run(self):
+        try:
+            for item in self.items:
+                started = time.monotonic()
+                try:
+                    if item.object_type == models.RegistrySnapshot.TYPE_DOMAIN:
+                        domain_data = apps.epp_client.get_domain(item.name, use_cache=False)
+                        models.DomainRegistration.mirror_registry_data(domain_data)
+                        models.RegistrySnapshot.record_domain(domain_data)
+                    else:
+                        models.RegistrySnapshot.record_host(apps.epp_client.get_host(item.name, item.registry_name))
+                    self.synced += 1
+                except grpc.RpcError as rpc_error:
+                    print(f"Can't sync {item.name} from {self.registry_name}: {rpc_error.details()}")
+                    self.failed += 1
+
+                elapsed = time.monotonic() - started
+                if elapsed < self.interval:
+                    time.sleep(self.interval - elapsed)
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Keeps the local registry snapshot of domains and name servers up to date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval", type=int, default=6 * 3600,
+            help="Seconds after which any snapshot is refreshed"
+        )
+        parser.add_argument(
+            "--priority-interval", type=int, default=settings.REGISTRY_SNAPSHOT_MAX_AGE,
+            help="Seconds after which snapshots of recently viewed or soon expiring domains are refreshed"
+        )
+        parser.add_argument("--once", action="store_true", help="Run a single sync pass and exit")
+
+    def handle(self, *args, **options):
+        interval = datetime.timedelta(seconds=options["interval"])
+        priority_interval = datetime.timedelta(seconds=options["priority_interval"])
+
+        print("Registry sync running")
+        try:
+            while True:
+                started = time.monotonic()
+                queues = self.build_queues(interval, priority_interval)
+                workers = [
+                    RegistryWorker(
+                        registry_name, items,
+                        settings.REGISTRY_SYNC_RATES.get(registry_name, settings.REGISTRY_SYNC_DEFAULT_RATE)
+                    ) for registry_name, items in queues.items()
+                ]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+
+                for worker in workers:
+                    print(f"{worker.registry_name}: {worker.synced} synced, {worker.failed} failed")
+                print(f"Sync pass took {time.monotonic() - started:.2f}s")
+
+                if options["once"]:
+                    break
+                time.sleep(60)
+        except (KeyboardInterrupt, SystemExit):
+            print("Exiting...")
+
+    @staticmethod
+    def build_queues(interval: datetime.timedelta, priority_interval: datetime.timedelta) -> \
+            typing.Dict[str, typing.List[SyncItem]]:
+        now = timezone.now()
+        queues = {}
+        snapshots = {
+            (s.object_type, s.name): s for s in models.RegistrySnapshot.objects.all().only(
+                "object_type", "name", "registry_name", "synced_at", "last_viewed"
+            )
+        }
+
+        def queue_item(item: SyncItem):
+            due = now - (priority_interval if item.priority else interval)
+            if item.synced_at and item.synced_at > due:
+                return
+            queues.setdefault(item.registry_name, []).append(item)
+
+        for domain in models.DomainRegistration.objects.filter(deleted=False, former_domain=False):
+            snapshot = snapshots.get((models.RegistrySnapshot.TYPE_DOMAIN, domain.domain.lower()))
+            if snapshot:
+                registry_name = snapshot.registry_name
+            else:
+                domain_info = zone_info.get_domain_info(domain.domain)[0]
+                registry_name = domain_info.registry if domain_info else ""
+            queue_item(SyncItem(
+                object_type=models.RegistrySnapshot.TYPE_DOMAIN,
+                name=domain.domain,
+                registry_name=registry_name,
+                priority=bool(
+                    (snapshot and snapshot.last_viewed and snapshot.last_viewed + PRIORITY_VIEW_WINDOW >= now) or
+                    not domain.registry_expiry_date or domain.registry_expiry_date <= now + PRIORITY_EXPIRY_WINDOW
+                ),
+                synced_at=snapshot.synced_at if snapshot else None
+            ))
+
+        for name_server in models.NameServer.objects.all():
+            snapshot = snapshots.get((models.RegistrySnapshot.TYPE_HOST, name_server.name_server.lower()))
+            if snapshot and snapshot.registry_name != name_server.registry_id:
+                snapshot = None
+            queue_item(SyncItem(
+                object_type=models.RegistrySnapshot.TYPE_HOST,
+                name=name_server.name_server,
+                registry_name=name_server.registry_id,
+                priority=bool(snapshot and snapshot.last_viewed and snapshot.last_viewed + PRIORITY_VIEW_WINDOW >= now),
+                synced_at=snapshot.synced_at if snapshot else None
+            ))
+
+        return queues
@@ -38,7 +38,8 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         now = timezone.now()
-        orders = models.DomainTransferOrder.objects.filter(state=models.DomainTransferOrder.STATE_PENDING_APPROVAL)
+        orders = models.DomainTransferOrder.objects.filter(state=models.DomainTransferOrder.STATE_PENDING_APPROVAL)\
+            .select_related('owner')
 
         for order in orders:
             domain_info, sld = zone_info.get_domain_info(order.domain)  # type: (zone_info.DomainInfo, str)
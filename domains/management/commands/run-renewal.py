@@ -1,11 +1,19 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
 from django.shortcuts import reverse
 from django.conf import settings
 from django.utils import timezone
+from django.db.models import Q
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
 import datetime
+import decimal
 import grpc
+import time
+import typing
+import uuid
+import as207960_utils.models
 from domains import models, zone_info, apps, tasks
 from domains.views import billing, emails
 
@@ -54,117 +62,320 @@ def mail_deleted(user, domains):
     email.send()
 
 
+@dataclasses.dataclass
+class RenewalDecision:
+    ACTION_NONE = "none"
+    ACTION_SKIP = "skip"
+    ACTION_NOTIFY = "notify"
+    ACTION_RENEW = "renew"
+    ACTION_DELETE = "delete"
+
+    domain: models.DomainRegistration
+    action: str
+    reason: str
+    domain_data: typing.Optional[apps.epp_api.Domain] = None
+    user: typing.Any = None
+    renewal_period: typing.Optional[apps.epp_api.Period] = None
+    renewal_price: typing.Optional[decimal.Decimal] = None
+    last_renew_order: typing.Optional[models.DomainAutomaticRenewOrder] = None
+
+    @property
+    def expiry_date(self):
+        if self.domain_data:
+            return self.domain_data.expiry_date.replace(tzinfo=datetime.timezone.utc)
+
+    @property
+    def email_data(self):
+        return {
+            "obj": self.domain,
+            "domain": self.domain_data,
+            "expiry_date": self.expiry_date
+        }
+
+
+class BulkUpdater:
+    def __init__(self, model, batch_size=100):
+        self.model = model
+        self.batch_size = batch_size
+        self.pending = {}
+
+    def add(self, obj, field: str):
+        self.pending.setdefault(field, []).append(obj)
+        if len(self.pending[field]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for field, objs in self.pending.items():
+            if objs:
+                self.model.objects.bulk_update(objs, [field])
+        self.pending = {}
+
+
+def parse_shard(value: str) -> typing.Tuple[int, int]:
+    try:
+        index, count = map(int, value.split("/", 1))
+    except ValueError:
+        raise CommandError("Shard must be given as i/n")
+    if count < 1 or not (0 <= index < count):
+        raise CommandError("Shard index must be between 0 and n-1")
+    return index, count
+
+
+def shard_filter(shard: typing.Tuple[int, int]) -> Q:
+    index, count = shard
+    lower = (index << 128) // count
+    upper = ((index + 1) << 128) // count
+    query = Q(id__gte=uuid.UUID(int=lower))
+    if upper < (1 << 128):
+        query &= Q(id__lt=uuid.UUID(int=upper))
+    return query
+
+
+def resolve_owner(domain: models.DomainRegistration, dry_run: bool):
+    if domain.owner_is_fresh:
+        return domain.owner
+    if dry_run:
+        return as207960_utils.models.get_resource_owner(domain.resource_id)
+    return domain.refresh_owner()
+
+
+def latest_orders(model, domain_ids, since, **filters) -> dict:
+    orders = {}
+    for order in model.objects.filter(domain_obj__in=domain_ids, timestamp__gte=since, **filters)\
+            .order_by("-timestamp"):
+        orders.setdefault(order.domain_obj_id, order)
+    return orders
+
+
 class Command(BaseCommand):
     help = 'Automatically renews all eligible domains'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shard", type=str, default="0/1",
+            help="Only process shard i of n (given as i/n), so runs can be split across workers"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=8,
+            help="Number of domains to make renewal decisions for at once"
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Print the renewal decisions without charging, deleting, emailing or saving anything"
+        )
+
     def handle(self, *args, **options):
         now = timezone.now()
-        domains = models.DomainRegistration.objects.filter(deleted=False, former_domain=False)
-        deleted_domains = models.DomainRegistration.objects.filter(deleted=True, former_domain=False)
-
-        notifications = {}
-        deleted = {}
+        shard = parse_shard(options["shard"])
+        dry_run = options["dry_run"]
+        timings = {}
+
+        started = time.monotonic()
+        renewable_domains = []
+        expiring_domains = models.DomainRegistration.objects.filter(
+            Q(registry_expiry_date__isnull=True) | Q(registry_expiry_date__lte=now + NOTIFY_INTERVAL),
+            shard_filter(shard), deleted=False, former_domain=False
+        ).select_related('owner')
+        for domain in expiring_domains:
+            domain_info, sld = zone_info.get_domain_info(domain.domain)
 
-        def insert_into_dict(d, key, value):
-            if key not in d:
-                d[key] = [value]
-            else:
-                d[key].append(value)
+            if not domain_info:
+                print(f"Can't renew {domain.domain}: unknown zone")
+                continue
 
-        for domain in domains:
+            renewable_domains.append((domain, domain_info, sld))
+
+        domains_data = apps.epp_client.get_domains(
+            (d[0].domain for d in renewable_domains), max_in_flight=options["workers"], use_cache=False
+        )
+        timings["fetch"] = time.monotonic() - started
+
+        started = time.monotonic()
+        domain_ids = [d[0].id for d in renewable_domains]
+        users = {d[0].id: resolve_owner(d[0], dry_run) for d in renewable_domains}
+        renew_orders = latest_orders(models.DomainAutomaticRenewOrder, domain_ids, now - NOTIFY_INTERVAL)
+        restore_orders = latest_orders(
+            models.DomainRestoreOrder, domain_ids, now - NOTIFY_INTERVAL, should_renew=True
+        )
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            decisions = list(executor.map(
+                lambda d: self.decide(
+                    now, *d[0], d[1], users[d[0][0].id],
+                    renew_orders.get(d[0][0].id), restore_orders.get(d[0][0].id)
+                ),
+                zip(renewable_domains, domains_data)
+            ))
+        timings["decide"] = time.monotonic() - started
+
+        started = time.monotonic()
+        if dry_run:
+            self.print_decisions(decisions)
+        else:
+            for domain_data in domains_data:
+                if not isinstance(domain_data, grpc.RpcError):
+                    models.DomainRegistration.mirror_registry_data(domain_data)
+            self.apply(now, decisions)
+
+        expired_domains = []
+        for domain in models.DomainRegistration.objects.filter(shard_filter(shard), deleted=True, former_domain=False):
             domain_info, sld = zone_info.get_domain_info(domain.domain)
 
             if not domain_info:
-                print(f"Can't renew {domain.domain}: unknown zone")
+                print(f"Can't check RGP on {domain.domain}: unknown zone")
                 continue
 
+            if domain.deleted_date and domain_info.redemption_period:
+                if domain.deleted_date + domain_info.redemption_period <= now:
+                    domain.former_domain = True
+                    expired_domains.append(domain)
+
+        if dry_run:
+            for domain in expired_domains:
+                print(f"{domain.domain} redemption period over, would mark as former domain")
+        elif expired_domains:
+            models.DomainRegistration.objects.bulk_update(expired_domains, ["former_domain"])
+        timings["apply"] = time.monotonic() - started
+
+        print(f"Shard {shard[0]}/{shard[1]}: {len(decisions)} domains, " + ", ".join(
+            f"{stage} {duration:.2f}s" for stage, duration in timings.items()
+        ))
+
+    @staticmethod
+    def decide(now, domain, domain_info, sld, domain_data, user, last_renew_order, last_restore_order) \
+            -> RenewalDecision:
+        if isinstance(domain_data, grpc.RpcError):
+            return RenewalDecision(
+                domain=domain, action=RenewalDecision.ACTION_SKIP,
+                reason=f"can't get data: {domain_data.details()}"
+            )
+
+        if apps.epp_api.domain_common_pb2.PendingDelete in domain_data.statuses:
+            return RenewalDecision(
+                domain=domain, domain_data=domain_data, action=RenewalDecision.ACTION_SKIP,
+                reason="already pending delete, not touching"
+            )
+
+        decision = RenewalDecision(
+            domain=domain, domain_data=domain_data, action=RenewalDecision.ACTION_NONE, reason="not expiring soon",
+            user=user
+        )
+        expiry_date = decision.expiry_date
+
+        if (expiry_date - RENEW_INTERVAL) <= now:
+            renewal_period = domain_info.pricing.periods[0]
+            decision.renewal_period = renewal_period
+
             try:
-                domain_data = apps.epp_client.get_domain(domain.domain)
+                decision.renewal_price = domain_info.pricing.renewal(
+                    country=None, username=decision.user.username, sld=sld,
+                    unit=renewal_period.unit, value=renewal_period.value
+                ).amount
             except grpc.RpcError as rpc_error:
-                print(f"Can't get data for {domain.domain}: {rpc_error.details()}")
-                continue
+                decision.action = RenewalDecision.ACTION_SKIP
+                decision.reason = f"can't get renewal price: {rpc_error.details()}"
+                return decision
+
+            if not decision.renewal_price:
+                decision.action = RenewalDecision.ACTION_SKIP
+                decision.reason = "no renewal price available"
+                return decision
+
+            if (expiry_date - FAIL_INTERVAL) <= now and domain_info.renews_if_not_deleted:
+                if last_renew_order and last_renew_order.state == last_renew_order.STATE_COMPLETED and \
+                        last_renew_order.timestamp + NOTIFY_INTERVAL >= now:
+                    decision.reason = "expiring soon, renewal already succeeded"
+                    return decision
+                if last_restore_order and last_restore_order.state == last_restore_order.STATE_COMPLETED and \
+                        last_restore_order.timestamp + NOTIFY_INTERVAL >= now:
+                    decision.reason = "expiring soon, renewal (by restore) already succeeded"
+                    return decision
+
+                decision.action = RenewalDecision.ACTION_DELETE
+                decision.reason = "billing failure"
+                decision.last_renew_order = last_renew_order
+            else:
+                if (domain.last_billed + RENEW_INTERVAL) >= now:
+                    decision.reason = "expiring soon, renewal already charged"
+                    return decision
 
-            if apps.epp_api.domain_common_pb2.PendingDelete in domain_data.statuses:
-                print(f"{domain_data.name} is already pending delete, not touching")
-                continue
+                decision.action = RenewalDecision.ACTION_RENEW
+                decision.reason = f"expiring soon, renewing for {decision.renewal_price:.2f} GBP"
 
-            user = domain.get_user()
-
-            expiry_date = domain_data.expiry_date.replace(tzinfo=datetime.timezone.utc)
-            email_data = {
-                "obj": domain,
-                "domain": domain_data,
-                "expiry_date": expiry_date
-            }
-            print(f"{domain_data.name} expiring on {expiry_date}")
-
-            if (expiry_date - RENEW_INTERVAL) <= now:
-                print(f"{domain_data.name} expiring soon, renewing")
-                renewal_period = domain_info.pricing.periods[0]
-
-                try:
-                    renewal_price = domain_info.pricing.renewal(
-                        country=None, username=user.username, sld=sld,
-                        unit=renewal_period.unit, value=renewal_period.value
-                    ).amount
-                except grpc.RpcError as rpc_error:
-                    print(f"Can't get renewal price for {domain.domain}: {rpc_error.details()}")
-                    continue
-
-                if not renewal_price:
-                    print(f"No renewal price available for {domain.domain}")
-                    continue
-
-                if (expiry_date - FAIL_INTERVAL) <= now and domain_info.renews_if_not_deleted:
-                    last_renew_order = models.DomainAutomaticRenewOrder.objects.filter(domain_obj=domain)\
-                        .order_by("-timestamp").first()  # type: models.DomainAutomaticRenewOrder
-                    if last_renew_order and last_renew_order.state == last_renew_order.STATE_COMPLETED and \
-                            last_renew_order.timestamp + NOTIFY_INTERVAL >= now:
-                        print(f"{domain_data.name} expiring soon, renewal already succeeded")
-                        continue
-                    last_restore_order = models.DomainRestoreOrder.objects.filter(domain_obj=domain, should_renew=True)\
-                        .order_by("-timestamp").first()  # type: models.DomainRestoreOrder
-                    if last_restore_order and last_restore_order.state == last_restore_order.STATE_COMPLETED and \
-                            last_restore_order.timestamp + NOTIFY_INTERVAL >= now:
-                        print(f"{domain_data.name} expiring soon, renewal (by restore) already succeeded")
-                        continue
+        elif (expiry_date - NOTIFY_INTERVAL) <= now:
+            if domain.last_renew_notify + NOTIFY_INTERVAL > now:
+                decision.reason = "expiring soon, already notified"
+                return decision
+
+            decision.action = RenewalDecision.ACTION_NOTIFY
+            decision.reason = "expiring soon, notifying owner"
+
+        return decision
 
+    @staticmethod
+    def print_decisions(decisions: typing.List[RenewalDecision]):
+        name_width = max([len(d.domain.domain) for d in decisions] + [6])
+        print(f"{'Domain':<{name_width}}  {'Expiry':<25}  {'Action':<6}  Reason")
+        for decision in decisions:
+            expiry_date = str(decision.expiry_date) if decision.expiry_date else "-"
+            print(f"{decision.domain.domain:<{name_width}}  {expiry_date:<25}  {decision.action:<6}  {decision.reason}")
+
+    @staticmethod
+    def apply(now, decisions: typing.List[RenewalDecision]):
+        notifications = {}
+        deleted = {}
+        updater = BulkUpdater(models.DomainRegistration)
+
+        def insert_into_dict(d, key, value):
+            if key not in d:
+                d[key] = [value]
+            else:
+                d[key].append(value)
+
+        try:
+            for decision in decisions:
+                domain = decision.domain
+                if decision.expiry_date:
+                    print(f"{domain.domain} expiring on {decision.expiry_date}: {decision.reason}")
+                else:
+                    print(f"{domain.domain}: {decision.reason}")
+
+                if decision.action in (RenewalDecision.ACTION_DELETE, RenewalDecision.ACTION_RENEW):
+                    decision.user = domain.refresh_owner()
+
+                if decision.action == RenewalDecision.ACTION_DELETE:
+                    last_renew_order = decision.last_renew_order
                     print(f"Deleting {domain.domain} due to billing failure")
-                    if last_renew_order.timestamp + NOTIFY_INTERVAL >= now:
+                    if last_renew_order and last_renew_order.timestamp + NOTIFY_INTERVAL >= now:
                         print(f"Reversing charge just to be sure")
                         billing.reverse_charge(last_renew_order.id)
                     try:
-                        apps.epp_client.delete_domain(domain_data.name)
+                        apps.epp_client.delete_domain(decision.domain_data.name)
                     except grpc.RpcError as rpc_error:
                         print(f"Failed to delete {domain.domain}: {rpc_error.details()}")
                         billing.charge_account(
-                            user.username, renewal_price, f"{domain.unicode_domain} automatic renewal",
+                            decision.user.username, decision.renewal_price,
+                            f"{domain.unicode_domain} automatic renewal",
                             f"dm_auto_renew_{domain.id}", can_reject=False
                         )
                         continue
                     domain.former_domain = True
-                    domain.save()
+                    updater.add(domain, "former_domain")
                     print(f"Deleted {domain.domain}")
-                    insert_into_dict(deleted, user, email_data)
-
-                else:
-                    if (domain.last_billed + RENEW_INTERVAL) >= now:
-                        print(f"{domain_data.name} expiring soon, renewal already charged")
-                        continue
+                    insert_into_dict(deleted, decision.user, decision.email_data)
 
-                    print(f"{domain_data.name} expiring soon, renewing for {renewal_price:.2f} GBP")
+                elif decision.action == RenewalDecision.ACTION_RENEW:
                     order = models.DomainAutomaticRenewOrder(
                         domain=domain.domain,
                         domain_obj=domain,
-                        period_unit=renewal_period.unit,
-                        period_value=renewal_period.value,
-                        price=renewal_price,
+                        period_unit=decision.renewal_period.unit,
+                        period_value=decision.renewal_period.value,
+                        price=decision.renewal_price,
                         off_session=True,
                     )
                     order.save()
                     tasks.charge_order(
                         order=order,
-                        username=user.username,
+                        username=decision.user.username,
                         descriptor=f"{domain.unicode_domain} automatic renewal",
                         charge_id=order.id,
                         return_uri=None,
@@ -172,39 +383,23 @@ class Command(BaseCommand):
                         notif_queue="domains_auto_renew_billing_notif"
                     )
                     domain.last_billed = now
-                    domain.save()
+                    updater.add(domain, "last_billed")
                     if order.state == order.STATE_NEEDS_PAYMENT:
                         emails.mail_auto_renew_redirect.delay(order.id)
                     elif order.state == order.STATE_FAILED:
                         emails.mail_auto_renew_failed.delay(order.id)
 
-            elif (expiry_date - NOTIFY_INTERVAL) <= now:
-                if domain.last_renew_notify + NOTIFY_INTERVAL > now:
-                    print(f"{domain_data.name} expiring soon, already notified")
-                    continue
-
-                print(f"{domain_data.name} expiring soon, notifying owner")
-                insert_into_dict(notifications, user, email_data)
-            else:
-                print(f"Not doing anything with {domain_data.name}")
+                elif decision.action == RenewalDecision.ACTION_NOTIFY:
+                    insert_into_dict(notifications, decision.user, decision.email_data)
+        finally:
+            updater.flush()
 
         for user, domains in notifications.items():
             mail_upcoming(user, domains)
             for domain in domains:
                 domain["obj"].last_renew_notify = now
-                domain["obj"].save()
+                updater.add(domain["obj"], "last_renew_notify")
+        updater.flush()
 
         for user, domains in deleted.items():
             mail_deleted(user, domains)
-
-        for domain in deleted_domains:
-            domain_info, sld = zone_info.get_domain_info(domain.domain)
-
-            if not domain_info:
-                print(f"Can't check RGP on {domain.domain}: unknown zone")
-                continue
-
-            if domain.deleted_date and domain_info.redemption_period:
-                if domain.deleted_date + domain_info.redemption_period <= now:
-                    domain.former_domain = True
-                    domain.save()
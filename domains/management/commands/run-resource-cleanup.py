@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+import as207960_utils.models
+from domains import models
+
+
+class Command(BaseCommand):
+    help = 'Deletes Keycloak resources left behind by removed objects'
+
+    def handle(self, *args, **options):
+        deleted = 0
+        failed = 0
+        for orphan in models.OrphanedResource.objects.order_by('created').iterator():
+            try:
+                as207960_utils.models.delete_resource(orphan.resource_id)
+            except Exception as e:
+                print(f"Can't delete resource {orphan.resource_id} ({orphan.reason}): {e}")
+                failed += 1
+                continue
+            orphan.delete()
+            deleted += 1
+
+        print(f"{deleted} orphaned resources deleted, {failed} failed")
@@ -1,5 +1,8 @@
 import django_countries
 import dataclasses
+import collections
+import threading
+import time
 import domains.views.billing
 import domains.apps
 import decimal
@@ -24,28 +27,118 @@ def map_country(cc):
     )
 
 
+class CountryLookupStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.total_time = collections.Counter()
+
+    def record(self, source: str, started: float):
+        elapsed = time.monotonic() - started
+        with self.lock:
+            self.counts[source] += 1
+            self.total_time[source] += elapsed
+
+    def snapshot(self):
+        with self.lock:
+            return [{
+                "source": source,
+                "count": count,
+                "mean_ms": self.total_time[source] / count * 1000,
+            } for source, count in sorted(self.counts.items())]
+
+
+class IPCountryCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+
+    def get(self, ip):
+        with self.lock:
+            entry = self.entries.get(ip)
+            if not entry:
+                return None
+            if entry[1] + self.ttl < time.monotonic():
+                del self.entries[ip]
+                return None
+            self.entries.move_to_end(ip)
+            return entry[0]
+
+    def set(self, ip, country: str):
+        with self.lock:
+            self.entries[ip] = (country, time.monotonic())
+            self.entries.move_to_end(ip)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+country_lookup_stats = CountryLookupStats()
+ip_country_cache = IPCountryCache(max_size=1024, ttl=3600)
+
+COUNTRY_LOOKUP_SKIP_PATHS = (
+    "/api/",
+    "/gchat_bot/webhook/",
+    "/privacy/webhook/",
+    "/isnic/webhook/",
+)
+
+
 class CountryMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
+        started = time.monotonic()
         if "selected_billing_country" in request.session:
             selected_country = request.session["selected_billing_country"].upper()
+        elif request.path.startswith(COUNTRY_LOOKUP_SKIP_PATHS):
+            selected_country = "GB"
+        elif request.user.is_authenticated:
+            username = request.user.username
+            resolved = request.session.get("resolved_billing_country")
+            if resolved and resolved["username"] == username:
+                selected_country = resolved["country"]
+                country_lookup_stats.record("session", started)
+            else:
+                selected_country = self.lookup_country(request, username)
+                if selected_country:
+                    request.session["resolved_billing_country"] = {
+                        "username": username,
+                        "country": selected_country
+                    }
+                    country_lookup_stats.record("billing", started)
+                else:
+                    selected_country = "GB"
         else:
-            username = request.user.username if request.user.is_authenticated else None
-            try:
-                price_resp = domains.views.billing.convert_currency(
-                    decimal.Decimal(0), "GBP", username, domains.apps.get_ip(request), None, timeout=3
-                )
-                selected_country = price_resp.country.upper()
-            except as207960_utils.rpc.TimeoutError:
-                selected_country = "GB"
+            ip = domains.apps.get_ip(request)
+            selected_country = ip_country_cache.get(ip)
+            if selected_country:
+                country_lookup_stats.record("ip", started)
+            else:
+                selected_country = self.lookup_country(request, None)
+                if selected_country:
+                    ip_country_cache.set(ip, selected_country)
+                    country_lookup_stats.record("billing", started)
+                else:
+                    selected_country = "GB"
 
         request.country = map_country(selected_country)
         response = self.get_response(request)
 
         return response
 
+    @staticmethod
+    def lookup_country(request, username):
+        try:
+            price_resp = domains.views.billing.convert_currency(
+                decimal.Decimal(0), "GBP", username, domains.apps.get_ip(request), None, timeout=3
+            )
+            return price_resp.country.upper()
+        except as207960_utils.rpc.TimeoutError:
+            return None
+
 
 class CountryDummyMiddleware:
     def __init__(self, get_response):
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.13 on 2021-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0050_auto_20210912_1335'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='domainregistration',
+            name='registry_expiry_date',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='domainregistration',
+            name='registry_rgp_state',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='domainregistration',
+            name='registry_statuses',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
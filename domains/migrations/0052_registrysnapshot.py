@@ -0,0 +1,29 @@
+# Generated by Django 3.1.13 on 2021-10-18 12:30
+
+import as207960_utils.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0051_auto_20211018_1200'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrySnapshot',
+            fields=[
+                ('id', as207960_utils.models.TypedUUIDField(data_type='domains_registrysnapshot', primary_key=True, serialize=False)),
+                ('object_type', models.CharField(choices=[('D', 'Domain'), ('H', 'Host')], max_length=1)),
+                ('name', models.CharField(max_length=255)),
+                ('registry_name', models.CharField(max_length=255)),
+                ('data', models.BinaryField()),
+                ('synced_at', models.DateTimeField(db_index=True)),
+                ('last_viewed', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('object_type', 'name', 'registry_name')},
+            },
+        ),
+    ]
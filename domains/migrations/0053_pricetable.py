@@ -0,0 +1,60 @@
+# Generated by Django 3.1.13 on 2021-10-18 14:10
+
+import as207960_utils.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0052_registrysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceTable',
+            fields=[
+                ('id', as207960_utils.models.TypedUUIDField(data_type='domains_pricetable', primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('generated_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-version'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceTableEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zone', models.CharField(max_length=255)),
+                ('vat_class', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('sld_length', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('currency', models.CharField(max_length=3)),
+                ('registration', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('registration_inc_vat', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('renewal', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('renewal_inc_vat', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('restore', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('restore_inc_vat', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('transfer', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('transfer_inc_vat', models.DecimalField(blank=True, decimal_places=2, max_digits=9, null=True)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='domains.pricetable')),
+            ],
+            options={
+                'index_together': {('table', 'zone', 'vat_class')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceTableCountry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country', models.CharField(max_length=2)),
+                ('vat_class', models.PositiveSmallIntegerField()),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='countries', to='domains.pricetable')),
+            ],
+            options={
+                'unique_together': {('table', 'country')},
+            },
+        ),
+    ]
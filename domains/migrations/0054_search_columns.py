@@ -0,0 +1,84 @@
+# Generated by Django 3.1.13 on 2021-10-19 11:02
+
+from django.db import migrations, models
+
+
+def populate_search_columns(apps, schema_editor):
+    DomainRegistration = apps.get_model('domains', 'DomainRegistration')
+    NameServer = apps.get_model('domains', 'NameServer')
+    ContactAddress = apps.get_model('domains', 'ContactAddress')
+    Contact = apps.get_model('domains', 'Contact')
+    ContactRegistry = apps.get_model('domains', 'ContactRegistry')
+
+    for domain in DomainRegistration.objects.only('id', 'domain').iterator():
+        domain_lower = domain.domain.lower()
+        DomainRegistration.objects.filter(id=domain.id).update(
+            domain_lower=domain_lower, domain_reversed=domain_lower[::-1]
+        )
+    for name_server in NameServer.objects.only('id', 'name_server').iterator():
+        name_server_lower = name_server.name_server.lower()
+        NameServer.objects.filter(id=name_server.id).update(
+            name_server_lower=name_server_lower, name_server_reversed=name_server_lower[::-1]
+        )
+    for address in ContactAddress.objects.only('id', 'name', 'organisation').iterator():
+        ContactAddress.objects.filter(id=address.id).update(
+            name_lower=address.name.lower(),
+            organisation_lower=address.organisation.lower() if address.organisation else None
+        )
+    for contact in Contact.objects.exclude(trading_name=None).exclude(trading_name="").only('id', 'trading_name').iterator():
+        Contact.objects.filter(id=contact.id).update(trading_name_lower=contact.trading_name.lower())
+    for contact_registry in ContactRegistry.objects.only('id', 'registry_contact_id').iterator():
+        ContactRegistry.objects.filter(id=contact_registry.id).update(
+            registry_contact_id_lower=contact_registry.registry_contact_id.lower()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0053_pricetable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='domainregistration',
+            name='domain_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='domainregistration',
+            name='domain_reversed',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='nameserver',
+            name='name_server_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='nameserver',
+            name='name_server_reversed',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='contactaddress',
+            name='name_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='contactaddress',
+            name='organisation_lower',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='trading_name_lower',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactregistry',
+            name='registry_contact_id_lower',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=16),
+        ),
+        migrations.RunPython(populate_search_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.1.13 on 2021-10-19 15:37
+
+from django.db import migrations
+
+
+def live_contact_ids(DomainRegistration):
+    contact_ids = set()
+    for field in ('registrant_contact_id', 'admin_contact_id', 'billing_contact_id', 'tech_contact_id'):
+        contact_ids.update(
+            DomainRegistration.objects.filter(deleted=False, former_domain=False)
+            .exclude(**{field: None}).values_list(field, flat=True)
+        )
+    return contact_ids
+
+
+def remove_duplicate_mappings(apps, schema_editor):
+    ContactRegistry = apps.get_model('domains', 'ContactRegistry')
+    DomainRegistration = apps.get_model('domains', 'DomainRegistration')
+
+    in_use = live_contact_ids(DomainRegistration)
+    contact_registries = sorted(
+        ContactRegistry.objects.iterator(), key=lambda c: (c.contact_id not in in_use, c.id)
+    )
+
+    seen_contacts = {}
+    seen_registry_ids = {}
+    for contact_registry in contact_registries:
+        contact_key = (contact_registry.contact_id, contact_registry.registry_id)
+        registry_key = (contact_registry.registry_id, contact_registry.registry_contact_id)
+        kept = seen_contacts.get(contact_key) or seen_registry_ids.get(registry_key)
+        if kept:
+            print(f"Removing duplicate contact mapping {contact_registry.id}: contact {contact_registry.contact_id} "
+                  f"as {contact_registry.registry_contact_id} on {contact_registry.registry_id}, keeping {kept.id}: "
+                  f"contact {kept.contact_id} as {kept.registry_contact_id}")
+            contact_registry.delete()
+            continue
+        seen_contacts[contact_key] = contact_registry
+        seen_registry_ids[registry_key] = contact_registry
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0054_search_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_mappings, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='contactregistry',
+            unique_together={('contact', 'registry_id'), ('registry_id', 'registry_contact_id')},
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.1.13 on 2021-10-19 17:12
+
+from django.db import migrations, models
+
+
+def remove_duplicate_name_servers(apps, schema_editor):
+    NameServer = apps.get_model('domains', 'NameServer')
+    OrphanedResource = apps.get_model('domains', 'OrphanedResource')
+
+    groups = {}
+    for name_server in NameServer.objects.iterator():
+        groups.setdefault((name_server.name_server.lower(), name_server.registry_id), []).append(name_server)
+
+    for (name, registry_id), name_servers in groups.items():
+        if len(name_servers) < 2:
+            continue
+
+        name_servers.sort(key=lambda n: (n.resource_id is None, str(n.id)))
+        for name_server in name_servers[1:]:
+            print(f"Removing duplicate host {name_server.name_server} ({name_server.id}) on {registry_id}, "
+                  f"keeping {name_servers[0].id}")
+            name_server.delete()
+            if name_server.resource_id:
+                OrphanedResource.objects.get_or_create(
+                    resource_id=name_server.resource_id,
+                    defaults={"reason": f"duplicate name-server {name}"}
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0055_contactregistry_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrphanedResource',
+            fields=[
+                ('resource_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(remove_duplicate_name_servers, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='nameserver',
+            unique_together={('name_server_lower', 'registry_id')},
+        ),
+    ]
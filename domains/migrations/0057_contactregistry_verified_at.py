@@ -0,0 +1,18 @@
+# Generated by Django 3.1.13 on 2021-10-20 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0056_nameserver_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactregistry',
+            name='verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.1.13 on 2021-10-21 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domains', '0058_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='domainregistration',
+            name='owner_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='domainregistrationorder',
+            name='owner_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='domainreneworder',
+            name='owner_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='domainrestoreorder',
+            name='owner_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='domaintransferorder',
+            name='owner_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,26 +1,31 @@
-from django.db import models, InternalError
+from django.db import models, transaction, InternalError, IntegrityError
 from django.core import validators
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse
+from asgiref.sync import sync_to_async
 import phonenumbers
 import django_keycloak_auth.clients
 from phonenumber_field.modelfields import PhoneNumberField
 from django_countries.fields import CountryField
-from . import apps, zone_info
+from . import apps, zone_info, permissions
 import uuid
 import grpc
+import asyncio
+import contextlib
+import contextvars
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 import time
 import secrets
 import typing
-import threading
 import enum
 import as207960_utils.models
 
-CONTACT_SEARCH = threading.Lock()
-NAME_SERVER_SEARCH = threading.Lock()
+CONTACT_PROVISION_ATTEMPTS = 3
+USED_CONTACT_REGISTRIES = contextvars.ContextVar("used_contact_registries", default=None)
 
 
 class RegistryLockState(enum.Enum):
@@ -88,6 +93,8 @@ class ContactAddress(models.Model):
     disclose_organisation = models.BooleanField(default=False, blank=True)
     disclose_address = models.BooleanField(default=False, blank=True)
     resource_id = models.UUIDField(null=True, db_index=True)
+    name_lower = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    organisation_lower = models.CharField(max_length=255, db_index=True, editable=False, blank=True, null=True)
 
     def __init__(self, *args, user=None, **kwargs):
         self.user = user
@@ -102,7 +109,7 @@ class ContactAddress(models.Model):
 
     @classmethod
     def get_object_list(cls, access_token: str, action='view'):
-        return cls.objects.filter(resource_id__in=as207960_utils.models.get_object_ids(access_token, 'contact-address', action))
+        return cls.objects.filter(resource_id__in=permissions.get_object_ids(access_token, 'contact-address', action))
 
     @classmethod
     def has_class_scope(cls, access_token: str, action='view'):
@@ -111,10 +118,11 @@ class ContactAddress(models.Model):
             .eval_permission(access_token, f"contact-address", scope_name)
 
     def has_scope(self, access_token: str, action='view'):
-        scope_name = f"{action}-contact-address"
-        return as207960_utils.models.eval_permission(access_token, self.resource_id, scope_name)
+        return permissions.has_scope(access_token, 'contact-address', self.resource_id, action)
 
     def save(self, *args, **kwargs):
+        self.name_lower = self.name.lower()
+        self.organisation_lower = self.organisation.lower() if self.organisation else None
         as207960_utils.models.sync_resource_to_keycloak(
             self,
             display_name="Contact address", scopes=[
@@ -125,6 +133,8 @@ class ContactAddress(models.Model):
             urn="urn:as207960:domains:contact_address", super_save=super().save, view_name='edit_address',
             args=args, kwargs=kwargs
         )
+        if self.user:
+            permissions.invalidate_user(self.user.username)
 
     def delete(self, *args, **kwargs):
         super().delete(*args, *kwargs)
@@ -220,6 +230,7 @@ class Contact(models.Model):
     disclose_email = models.BooleanField(default=False, blank=True)
     privacy_email = models.UUIDField(default=uuid.uuid4)
     resource_id = models.UUIDField(null=True, db_index=True)
+    trading_name_lower = models.CharField(max_length=255, db_index=True, editable=False, blank=True, null=True)
 
     class Meta:
         ordering = ['description']
@@ -230,7 +241,7 @@ class Contact(models.Model):
 
     @classmethod
     def get_object_list(cls, access_token: str, action='view'):
-        return cls.objects.filter(resource_id__in=as207960_utils.models.get_object_ids(access_token, 'contact', action))
+        return cls.objects.filter(resource_id__in=permissions.get_object_ids(access_token, 'contact', action))
 
     @classmethod
     def has_class_scope(cls, access_token: str, action='view'):
@@ -239,12 +250,12 @@ class Contact(models.Model):
             .eval_permission(access_token, f"contact", scope_name)
 
     def has_scope(self, access_token: str, action='view'):
-        scope_name = f"{action}-contact"
-        return as207960_utils.models.eval_permission(access_token, self.resource_id, scope_name)
+        return permissions.has_scope(access_token, 'contact', self.resource_id, action)
 
     def save(self, *args, **kwargs):
         if not kwargs.pop('skip_update_date', False):
             self.updated_date = timezone.now()
+        self.trading_name_lower = self.trading_name.lower() if self.trading_name else None
 
         as207960_utils.models.sync_resource_to_keycloak(
             self,
@@ -256,6 +267,8 @@ class Contact(models.Model):
             urn="urn:as207960:domains:contact", super_save=super().save, view_name='edit_contact',
             args=args, kwargs=kwargs
         )
+        if self.user:
+            permissions.invalidate_user(self.user.username)
 
     def __str__(self):
         return self.description
@@ -315,20 +328,29 @@ class Contact(models.Model):
         as207960_utils.models.delete_resource(self.resource_id)
         super().delete(*args, **kwargs)
 
-    def get_registry_id(self, registry_id: str, zone_data: typing.Optional[zone_info.DomainInfo] = None):
-        is_isnic = zone_data and zone_data.registry == zone_data.REGISTRY_ISNIC
+    def _provision_registry_id(self, registry_id: str, is_isnic: bool) -> typing.Tuple["ContactRegistry", bool]:
+        contact_registry = ContactRegistry.objects\
+            .filter(contact=self, registry_id=registry_id).first()  # type: ContactRegistry
+        if contact_registry and (is_isnic or contact_registry.is_verified):
+            return contact_registry, False
 
-        with CONTACT_SEARCH:
-            contact_registry = ContactRegistry.objects.filter(contact=self, registry_id=registry_id)\
-                .first()   # type: ContactRegistry
+        with transaction.atomic():
+            contact_registry = ContactRegistry.objects.select_for_update()\
+                .filter(contact=self, registry_id=registry_id).first()  # type: ContactRegistry
             if contact_registry:
-                if is_isnic:
-                    return contact_registry
+                if is_isnic or contact_registry.is_verified:
+                    return contact_registry, False
 
                 if not apps.epp_client.check_contact(contact_registry.registry_contact_id, registry_id)[0]:
-                    return contact_registry
-                else:
-                    contact_registry.delete()
+                    contact_registry.verified_at = timezone.now()
+                    contact_registry.save()
+                    return contact_registry, False
+            else:
+                contact_registry = ContactRegistry.objects.create(
+                    contact=self,
+                    registry_id=registry_id,
+                    registry_contact_id=make_id()
+                )
 
             auth_info = make_secret()
             if is_isnic:
@@ -359,19 +381,35 @@ class Contact(models.Model):
                 registry_name=registry_id
             )
 
-            contact_registry = ContactRegistry(
-                contact=self,
-                registry_id=registry_id,
-                registry_contact_id=contact_id,
-                auth_info=auth_info
-            )
+            contact_registry.registry_contact_id = contact_id
+            contact_registry.auth_info = auth_info
+            contact_registry.verified_at = timezone.now()
             contact_registry.save()
 
-        if is_isnic:
+        return contact_registry, True
+
+    def get_registry_id(self, registry_id: str, zone_data: typing.Optional[zone_info.DomainInfo] = None):
+        is_isnic = zone_data and zone_data.registry == zone_data.REGISTRY_ISNIC
+
+        attempt = 0
+        while True:
+            try:
+                contact_registry, created = self._provision_registry_id(registry_id, is_isnic)
+                break
+            except IntegrityError:
+                attempt += 1
+                if attempt >= CONTACT_PROVISION_ATTEMPTS:
+                    raise
+
+        used_contact_registries = USED_CONTACT_REGISTRIES.get()
+        if used_contact_registries is not None:
+            used_contact_registries.append(contact_registry)
+
+        if is_isnic and created:
             count = 0
             while True:
                 time.sleep(1)
-                contact_info = apps.epp_client.get_contact(contact_id, registry_id)
+                contact_info = apps.epp_client.get_contact(contact_registry.registry_contact_id, registry_id)
                 is_pending = apps.epp_api.isnic_pb2.ContactStatus.PendingCreate in contact_info.isnic_info.statuses
                 if not is_pending:
                     break
@@ -385,86 +423,98 @@ class Contact(models.Model):
     def get_contact(cls, registry_contact_id: str, registry_id: str, user, zone_data: typing.Optional[zone_info.DomainInfo] = None):
         is_isnic = zone_data and zone_data.registry == zone_data.REGISTRY_ISNIC
 
-        with CONTACT_SEARCH:
-            contact_registry = ContactRegistry.objects\
-                .filter(registry_contact_id=registry_contact_id, registry_id=registry_id).first()
-            if contact_registry:
-                return contact_registry.contact
-
-            registry_contact = apps.epp_client.get_contact(registry_contact_id, registry_id)
-
-            local_address = registry_contact.local_address if not is_isnic else registry_contact.int_address
-            local_streets = iter(local_address.streets)
-            local_address = ContactAddress(
-                description=local_address.name,
-                name=local_address.name,
-                organisation=local_address.organisation,
-                street_1=next(local_streets, None),
-                street_2=next(local_streets, None),
-                street_3=next(local_streets, None),
-                city=local_address.city,
-                province=local_address.province,
-                postal_code=local_address.postal_code,
-                country_code=local_address.country_code,
-                user=user
-            )
-            local_address.save()
-            if registry_contact.int_address and not is_isnic:
-                int_streets = iter(registry_contact.int_address.streets)
-                int_address = ContactAddress(
-                    description=registry_contact.int_address.name,
-                    name=registry_contact.int_address.name,
-                    organisation=registry_contact.int_address.organisation,
-                    street_1=next(int_streets, None),
-                    street_2=next(int_streets, None),
-                    street_3=next(int_streets, None),
-                    city=registry_contact.int_address.city,
-                    province=registry_contact.int_address.province,
-                    postal_code=registry_contact.int_address.postal_code,
-                    country_code=registry_contact.int_address.country_code,
+        contact_registry = ContactRegistry.objects\
+            .filter(registry_contact_id=registry_contact_id, registry_id=registry_id).first()
+        if contact_registry:
+            return contact_registry.contact
+
+        registry_contact = apps.epp_client.get_contact(registry_contact_id, registry_id)
+        created = []
+
+        try:
+            with transaction.atomic():
+                local_address = registry_contact.local_address if not is_isnic else registry_contact.int_address
+                local_streets = iter(local_address.streets)
+                local_address = ContactAddress(
+                    description=local_address.name,
+                    name=local_address.name,
+                    organisation=local_address.organisation,
+                    street_1=next(local_streets, None),
+                    street_2=next(local_streets, None),
+                    street_3=next(local_streets, None),
+                    city=local_address.city,
+                    province=local_address.province,
+                    postal_code=local_address.postal_code,
+                    country_code=local_address.country_code,
                     user=user
                 )
-                int_address.save()
-            else:
-                int_address = None
+                local_address.save()
+                created.append(local_address)
+                if registry_contact.int_address and not is_isnic:
+                    int_streets = iter(registry_contact.int_address.streets)
+                    int_address = ContactAddress(
+                        description=registry_contact.int_address.name,
+                        name=registry_contact.int_address.name,
+                        organisation=registry_contact.int_address.organisation,
+                        street_1=next(int_streets, None),
+                        street_2=next(int_streets, None),
+                        street_3=next(int_streets, None),
+                        city=registry_contact.int_address.city,
+                        province=registry_contact.int_address.province,
+                        postal_code=registry_contact.int_address.postal_code,
+                        country_code=registry_contact.int_address.country_code,
+                        user=user
+                    )
+                    int_address.save()
+                    created.append(int_address)
+                else:
+                    int_address = None
 
-            if registry_contact.phone:
-                phone = phonenumbers.parse(registry_contact.phone.number, settings.PHONENUMBER_DEFAULT_REGION)
-                if not phonenumbers.is_valid_number(phone):
+                if registry_contact.phone:
+                    phone = phonenumbers.parse(registry_contact.phone.number, settings.PHONENUMBER_DEFAULT_REGION)
+                    if not phonenumbers.is_valid_number(phone):
+                        phone = None
+                else:
                     phone = None
-            else:
-                phone = None
 
-            if registry_contact.fax:
-                fax = phonenumbers.parse(registry_contact.fax.number, settings.PHONENUMBER_DEFAULT_REGION)
-                if not phonenumbers.is_valid_number(fax):
+                if registry_contact.fax:
+                    fax = phonenumbers.parse(registry_contact.fax.number, settings.PHONENUMBER_DEFAULT_REGION)
+                    if not phonenumbers.is_valid_number(fax):
+                        fax = None
+                else:
                     fax = None
-            else:
-                fax = None
-
-            contact = cls(
-                description=local_address.name,
-                local_address=local_address,
-                int_address=int_address,
-                phone=phone,
-                phone_ext=registry_contact.phone.ext if registry_contact.phone else None,
-                fax=fax,
-                fax_ext=registry_contact.fax.ext if registry_contact.fax else None,
-                email=registry_contact.email,
-                entity_type=registry_contact.entity_type,
-                trading_name=registry_contact.trading_name,
-                company_number=registry_contact.company_number,
-                created_date=registry_contact.creation_date,
-                updated_date=registry_contact.last_updated_date,
-                user=user
-            )
-            contact.save(skip_update_date=True)
-            ContactRegistry(
-                contact=contact,
-                registry_contact_id=registry_contact_id,
-                registry_id=registry_id,
-                auth_info=registry_contact.auth_info,
-            ).save()
+
+                contact = cls(
+                    description=local_address.name,
+                    local_address=local_address,
+                    int_address=int_address,
+                    phone=phone,
+                    phone_ext=registry_contact.phone.ext if registry_contact.phone else None,
+                    fax=fax,
+                    fax_ext=registry_contact.fax.ext if registry_contact.fax else None,
+                    email=registry_contact.email,
+                    entity_type=registry_contact.entity_type,
+                    trading_name=registry_contact.trading_name,
+                    company_number=registry_contact.company_number,
+                    created_date=registry_contact.creation_date,
+                    updated_date=registry_contact.last_updated_date,
+                    user=user
+                )
+                contact.save(skip_update_date=True)
+                created.append(contact)
+                ContactRegistry(
+                    contact=contact,
+                    registry_contact_id=registry_contact_id,
+                    registry_id=registry_id,
+                    auth_info=registry_contact.auth_info,
+                    verified_at=timezone.now(),
+                ).save()
+        except IntegrityError:
+            for obj in created:
+                if obj.resource_id:
+                    as207960_utils.models.delete_resource(obj.resource_id)
+            return ContactRegistry.objects\
+                .get(registry_contact_id=registry_contact_id, registry_id=registry_id).contact
 
         return contact
 
@@ -514,25 +564,62 @@ class Contact(models.Model):
 class ContactRegistry(models.Model):
     contact = models.ForeignKey(Contact, on_delete=models.CASCADE)
     registry_contact_id = models.CharField(max_length=16, default=make_id)
+    registry_contact_id_lower = models.CharField(max_length=16, db_index=True, editable=False, default="")
     registry_id = models.CharField(max_length=255)
     auth_info = models.CharField(max_length=255, blank=True, null=True)
+    verified_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         verbose_name_plural = "Contact registries"
         ordering = ["registry_contact_id"]
+        unique_together = (
+            ("contact", "registry_id"),
+            ("registry_id", "registry_contact_id"),
+        )
 
     def __str__(self):
         return f"{self.contact.description} ({self.registry_id})"
 
+    def save(self, *args, **kwargs):
+        self.registry_contact_id_lower = self.registry_contact_id.lower()
+        super().save(*args, **kwargs)
+
+    @property
+    def is_verified(self) -> bool:
+        return self.verified_at is not None and \
+            self.verified_at > timezone.now() - datetime.timedelta(seconds=settings.CONTACT_REGISTRY_REVALIDATE_INTERVAL)
+
+    @classmethod
+    def mark_unverified(cls, contact_registries: typing.Iterable["ContactRegistry"]):
+        cls.objects.filter(id__in=[c.id for c in contact_registries]).update(verified_at=None)
+
+    @classmethod
+    @contextlib.contextmanager
+    def revalidate_on_error(cls):
+        used = []
+        token = USED_CONTACT_REGISTRIES.set(used)
+        try:
+            yield
+        except grpc.RpcError:
+            cls.mark_unverified(used)
+            raise
+        finally:
+            USED_CONTACT_REGISTRIES.reset(token)
+
 
 class NameServer(models.Model):
     id = as207960_utils.models.TypedUUIDField('domains_nameserver', primary_key=True)
     name_server = models.CharField(max_length=255)
+    name_server_lower = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    name_server_reversed = models.CharField(max_length=255, db_index=True, editable=False, default="")
     registry_id = models.CharField(max_length=255)
     resource_id = models.UUIDField(null=True, db_index=True)
 
     class Meta:
         ordering = ['name_server']
+        unique_together = (
+            ("name_server_lower", "registry_id"),
+        )
 
     def __init__(self, *args, user=None, **kwargs):
         self.user = user
@@ -547,7 +634,7 @@ class NameServer(models.Model):
 
     @classmethod
     def get_object_list(cls, access_token: str, action='view'):
-        return cls.objects.filter(resource_id__in=as207960_utils.models.get_object_ids(access_token, 'name-server', action))
+        return cls.objects.filter(resource_id__in=permissions.get_object_ids(access_token, 'name-server', action))
 
     @classmethod
     def has_class_scope(cls, access_token: str, action='view'):
@@ -556,10 +643,11 @@ class NameServer(models.Model):
             .eval_permission(access_token, f"name-server", scope_name)
 
     def has_scope(self, access_token: str, action='view'):
-        scope_name = f"{action}-name-server"
-        return as207960_utils.models.eval_permission(access_token, self.resource_id, scope_name)
+        return permissions.has_scope(access_token, 'name-server', self.resource_id, action)
 
     def save(self, *args, **kwargs):
+        self.name_server_lower = self.name_server.lower()
+        self.name_server_reversed = self.name_server_lower[::-1]
         as207960_utils.models.sync_resource_to_keycloak(
             self,
             display_name="Name server", scopes=[
@@ -570,6 +658,8 @@ class NameServer(models.Model):
             urn="urn:as207960:domains:name_server", super_save=super().save, view_name='host',
             args=args, kwargs=kwargs
         )
+        if self.user:
+            permissions.invalidate_user(self.user.username)
 
     def delete(self, *args, **kwargs):
         super().delete(*args, *kwargs)
@@ -581,23 +671,58 @@ class NameServer(models.Model):
     @classmethod
     def get_name_server(cls, name_server: str, registry_id: str, user):
         name_server = name_server.lower()
-        with NAME_SERVER_SEARCH:
-            name_server_obj = cls.objects.filter(name_server=name_server, registry_id=registry_id).first()
-            if name_server_obj:
-                return name_server_obj
+        name_server_obj = cls.objects.filter(name_server_lower=name_server, registry_id=registry_id).first()
+        if name_server_obj:
+            return name_server_obj
 
+        name_server_obj = cls(
+            name_server=name_server,
+            registry_id=registry_id,
+            user=user
+        )
+        try:
+            with transaction.atomic():
+                name_server_obj.save()
+        except IntegrityError:
+            if name_server_obj.resource_id:
+                as207960_utils.models.delete_resource(name_server_obj.resource_id)
+            return cls.objects.get(name_server_lower=name_server, registry_id=registry_id)
+        return name_server_obj
+
+    @classmethod
+    def replace_name_server(cls, name_server: str, registry_id: str, user):
+        with transaction.atomic():
+            stale = list(cls.objects.select_for_update().filter(
+                name_server_lower=name_server.lower(), registry_id=registry_id
+            ))
+            cls.objects.filter(id__in=[n.id for n in stale]).delete()
             name_server_obj = cls(
                 name_server=name_server,
                 registry_id=registry_id,
                 user=user
             )
             name_server_obj.save()
-            return name_server_obj
+
+        for stale_obj in stale:
+            if stale_obj.resource_id:
+                as207960_utils.models.delete_resource(stale_obj.resource_id)
+        return name_server_obj
+
 
 
+class OrphanedResource(models.Model):
+    resource_id = models.UUIDField(primary_key=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return str(self.resource_id)
+
 class DomainRegistration(models.Model):
     id = as207960_utils.models.TypedUUIDField('domains_domainregistration', primary_key=True)
     domain = models.CharField(max_length=255)
+    domain_lower = models.CharField(max_length=255, db_index=True, editable=False, default="")
+    domain_reversed = models.CharField(max_length=255, db_index=True, editable=False, default="")
     auth_info = models.CharField(max_length=255, blank=True, null=True)
     deleted = models.BooleanField(default=False, blank=True)
     former_domain = models.BooleanField(default=False, blank=True)
@@ -615,6 +740,13 @@ class DomainRegistration(models.Model):
     last_renew_notify = models.DateTimeField(default=timezone.datetime.min)
     deleted_date = models.DateTimeField(blank=True, null=True)
     pending_registry_lock_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    registry_expiry_date = models.DateTimeField(blank=True, null=True, db_index=True)
+    registry_statuses = models.JSONField(blank=True, null=True)
+    registry_rgp_state = models.JSONField(blank=True, null=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL, related_name='+', editable=False
+    )
+    owner_synced_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ['domain']
@@ -632,7 +764,7 @@ class DomainRegistration(models.Model):
 
     @classmethod
     def get_object_list(cls, access_token: str, action='view'):
-        return cls.objects.filter(resource_id__in=as207960_utils.models.get_object_ids(access_token, 'domain', action))
+        return cls.objects.filter(resource_id__in=permissions.get_object_ids(access_token, 'domain', action))
 
     @classmethod
     def has_class_scope(cls, access_token: str, action='view'):
@@ -641,10 +773,14 @@ class DomainRegistration(models.Model):
             .eval_permission(access_token, f"domain", scope_name)
 
     def has_scope(self, access_token: str, action='view'):
-        scope_name = f"{action}-domain"
-        return as207960_utils.models.eval_permission(access_token, self.resource_id, scope_name)
+        return permissions.has_scope(access_token, 'domain', self.resource_id, action)
 
     def save(self, *args, **kwargs):
+        self.domain_lower = self.domain.lower()
+        self.domain_reversed = self.domain_lower[::-1]
+        if self.user:
+            self.owner = self.user
+            self.owner_synced_at = timezone.now()
         as207960_utils.models.sync_resource_to_keycloak(
             self,
             display_name="Domain", scopes=[
@@ -656,13 +792,38 @@ class DomainRegistration(models.Model):
             urn="urn:as207960:domains:domain", super_save=super().save, view_name='domain',
             args=args, kwargs=kwargs
         )
+        if self.user:
+            permissions.invalidate_user(self.user.username)
 
     def delete(self, *args, **kwargs):
         super().delete(*args, *kwargs)
         as207960_utils.models.delete_resource(self.resource_id)
 
+    @property
+    def owner_is_fresh(self) -> bool:
+        return bool(self.owner_id and self.owner_synced_at and self.owner_synced_at + datetime.timedelta(
+            seconds=settings.RESOURCE_OWNER_TTL
+        ) >= timezone.now())
+
     def get_user(self):
-        return as207960_utils.models.get_resource_owner(self.resource_id)
+        if self.owner_is_fresh:
+            return self.owner
+        return self.refresh_owner()
+
+    def refresh_owner(self):
+        self.owner = as207960_utils.models.get_resource_owner(self.resource_id)
+        self.owner_synced_at = timezone.now()
+        DomainRegistration.objects.filter(pk=self.pk).update(owner=self.owner, owner_synced_at=self.owner_synced_at)
+        return self.owner
+
+    @classmethod
+    def mirror_registry_data(cls, domain_data: apps.epp_api.Domain):
+        expiry_date = timezone.make_aware(domain_data.expiry_date, timezone.utc) if domain_data.expiry_date else None
+        statuses = sorted(s.status for s in domain_data.statuses)
+        rgp_state = sorted(s.state for s in domain_data.rgp_state)
+        cls.objects.filter(domain=domain_data.name, former_domain=False).exclude(
+            registry_expiry_date=expiry_date, registry_statuses=statuses, registry_rgp_state=rgp_state
+        ).update(registry_expiry_date=expiry_date, registry_statuses=statuses, registry_rgp_state=rgp_state)
 
     @property
     def pending_restore(self):
@@ -672,6 +833,219 @@ class DomainRegistration(models.Model):
         return self.domain
 
 
+SNAPSHOT_INVALID_AT = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class RegistrySnapshot(models.Model):
+    TYPE_DOMAIN = "D"
+    TYPE_HOST = "H"
+
+    TYPES = (
+        (TYPE_DOMAIN, "Domain"),
+        (TYPE_HOST, "Host"),
+    )
+
+    id = as207960_utils.models.TypedUUIDField('domains_registrysnapshot', primary_key=True)
+    object_type = models.CharField(max_length=1, choices=TYPES)
+    name = models.CharField(max_length=255)
+    registry_name = models.CharField(max_length=255)
+    data = models.BinaryField()
+    synced_at = models.DateTimeField(db_index=True)
+    last_viewed = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = (
+            ("object_type", "name", "registry_name"),
+        )
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.synced_at + datetime.timedelta(seconds=settings.REGISTRY_SNAPSHOT_MAX_AGE) >= timezone.now()
+
+    def get_domain(self) -> apps.epp_api.Domain:
+        return apps.epp_api.Domain.from_pb(
+            apps.epp_api.domain_pb2.DomainInfoReply.FromString(bytes(self.data)), apps.epp_client
+        )
+
+    def get_host(self) -> apps.epp_api.Host:
+        return apps.epp_api.Host.from_pb(
+            apps.epp_api.host_pb2.HostInfoReply.FromString(bytes(self.data)), apps.epp_client, self.registry_name
+        )
+
+    @classmethod
+    def record_domain(cls, domain_data: apps.epp_api.Domain):
+        cls.objects.update_or_create(
+            object_type=cls.TYPE_DOMAIN, name=domain_data.name.lower(), registry_name=domain_data.registry_name,
+            defaults={
+                "data": domain_data._pb.SerializeToString(),
+                "synced_at": timezone.now(),
+            }
+        )
+
+    @classmethod
+    def record_host(cls, host_data: apps.epp_api.Host):
+        cls.objects.update_or_create(
+            object_type=cls.TYPE_HOST, name=host_data.name.lower(), registry_name=host_data.registry_name,
+            defaults={
+                "data": host_data._pb.SerializeToString(),
+                "synced_at": timezone.now(),
+            }
+        )
+
+    @classmethod
+    def invalidate(cls, object_type: str, name: str, registry_name: typing.Optional[str] = None):
+        snapshots = cls.objects.filter(object_type=object_type, name=name.lower())
+        if registry_name:
+            snapshots = snapshots.filter(registry_name=registry_name)
+        snapshots.update(synced_at=SNAPSHOT_INVALID_AT)
+
+    @classmethod
+    def load_domains(cls, names: typing.List[str], mark_viewed: bool):
+        snapshots = cls.objects.filter(object_type=cls.TYPE_DOMAIN, name__in=[n.lower() for n in names])
+        if mark_viewed:
+            snapshots.update(last_viewed=timezone.now())
+        snapshots = {s.name: s for s in snapshots if s.is_fresh}
+
+        results = [None] * len(names)
+        to_fetch = []
+        for i, name in enumerate(names):
+            snapshot = snapshots.get(name.lower())
+            if snapshot:
+                results[i] = (snapshot.get_domain(), snapshot.synced_at)
+            else:
+                to_fetch.append(i)
+        return results, to_fetch
+
+    @classmethod
+    def get_domains(cls, names: typing.Iterable[str], mark_viewed=False, max_in_flight=16) -> \
+            typing.List[typing.Tuple[typing.Union[apps.epp_api.Domain, grpc.RpcError], datetime.datetime]]:
+        names = list(names)
+        results, to_fetch = cls.load_domains(names, mark_viewed)
+
+        now = timezone.now()
+        for i, domain_data in zip(to_fetch, apps.epp_client.get_domains(
+                (names[i] for i in to_fetch), max_in_flight=max_in_flight
+        )):
+            results[i] = (domain_data, now)
+        return results
+
+    @classmethod
+    async def aget_domains(cls, names: typing.Iterable[str], mark_viewed=False) -> \
+            typing.List[typing.Tuple[typing.Union[apps.epp_api.Domain, grpc.RpcError], datetime.datetime]]:
+        names = list(names)
+        results, to_fetch = await sync_to_async(cls.load_domains, thread_sensitive=True)(names, mark_viewed)
+
+        now = timezone.now()
+        for i, domain_data in zip(to_fetch, await apps.async_epp_client.get_domains(names[i] for i in to_fetch)):
+            results[i] = (domain_data, now)
+        return results
+
+    @classmethod
+    def load_hosts(cls, hosts: typing.List[typing.Tuple[str, str]], mark_viewed: bool):
+        snapshots = cls.objects.filter(object_type=cls.TYPE_HOST, name__in=[n.lower() for n, _ in hosts])
+        if mark_viewed:
+            snapshots.update(last_viewed=timezone.now())
+        snapshots = {(s.name, s.registry_name): s for s in snapshots if s.is_fresh}
+
+        results = [None] * len(hosts)
+        to_fetch = []
+        for i, (name, registry_name) in enumerate(hosts):
+            snapshot = snapshots.get((name.lower(), registry_name))
+            if snapshot:
+                results[i] = (snapshot.get_host(), snapshot.synced_at)
+            else:
+                to_fetch.append(i)
+        return results, to_fetch
+
+    @classmethod
+    def get_hosts(cls, hosts: typing.Iterable[typing.Tuple[str, str]], mark_viewed=False, max_workers=None) -> \
+            typing.List[typing.Tuple[typing.Union[apps.epp_api.Host, grpc.RpcError], datetime.datetime]]:
+        hosts = list(hosts)
+        results, to_fetch = cls.load_hosts(hosts, mark_viewed)
+
+        def get_host(i):
+            try:
+                results[i] = (apps.epp_client.get_host(*hosts[i]), timezone.now())
+            except grpc.RpcError as rpc_error:
+                results[i] = (rpc_error, timezone.now())
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(get_host, to_fetch))
+        return results
+
+    @classmethod
+    async def aget_hosts(cls, hosts: typing.Iterable[typing.Tuple[str, str]], mark_viewed=False) -> \
+            typing.List[typing.Tuple[typing.Union[apps.epp_api.Host, grpc.RpcError], datetime.datetime]]:
+        hosts = list(hosts)
+        results, to_fetch = await sync_to_async(cls.load_hosts, thread_sensitive=True)(hosts, mark_viewed)
+
+        async def get_host(i):
+            try:
+                results[i] = (await apps.async_epp_client.get_host(*hosts[i]), timezone.now())
+            except grpc.RpcError as rpc_error:
+                results[i] = (rpc_error, timezone.now())
+
+        await asyncio.gather(*(get_host(i) for i in to_fetch))
+        return results
+
+
+class PriceTable(models.Model):
+    id = as207960_utils.models.TypedUUIDField('domains_pricetable', primary_key=True)
+    version = models.PositiveIntegerField(unique=True)
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-version']
+
+    @classmethod
+    def latest(cls) -> typing.Optional["PriceTable"]:
+        return cls.objects.order_by('-version').first()
+
+    def public_prices(self):
+        return self.entries.filter(vat_class__isnull=True, sld_length__isnull=True).order_by('zone')
+
+    def get_entry(self, zone: str, sld: str, country: str) -> typing.Optional["PriceTableEntry"]:
+        vat_class = self.countries.filter(country=country.upper()).values_list("vat_class", flat=True).first()
+        if vat_class is None:
+            return None
+        entries = list(self.entries.filter(
+            models.Q(sld_length=len(sld)) | models.Q(sld_length__isnull=True), zone=zone.lower(), vat_class=vat_class
+        ))
+        return next((e for e in entries if e.sld_length is not None), None) or next(iter(entries), None)
+
+
+class PriceTableCountry(models.Model):
+    table = models.ForeignKey(PriceTable, on_delete=models.CASCADE, related_name='countries')
+    country = models.CharField(max_length=2)
+    vat_class = models.PositiveSmallIntegerField()
+
+    class Meta:
+        unique_together = (
+            ("table", "country"),
+        )
+
+
+class PriceTableEntry(models.Model):
+    table = models.ForeignKey(PriceTable, on_delete=models.CASCADE, related_name='entries')
+    zone = models.CharField(max_length=255)
+    vat_class = models.PositiveSmallIntegerField(blank=True, null=True)
+    sld_length = models.PositiveSmallIntegerField(blank=True, null=True)
+    currency = models.CharField(max_length=3)
+    registration = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    registration_inc_vat = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    renewal = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    renewal_inc_vat = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    restore = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    restore_inc_vat = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    transfer = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+    transfer_inc_vat = models.DecimalField(decimal_places=2, max_digits=9, blank=True, null=True)
+
+    class Meta:
+        index_together = (
+            ("table", "zone", "vat_class"),
+        )
+
+
 class WebAuthNKey(models.Model):
     id = as207960_utils.models.TypedUUIDField('domains_webauthnkey', primary_key=True)
     domain = models.ForeignKey(DomainRegistration, on_delete=models.CASCADE, related_name='webauthn_keys')
@@ -716,6 +1090,10 @@ class SimpleAbstractOrder(models.Model):
 
 class AbstractOrder(SimpleAbstractOrder):
     resource_id = models.UUIDField(null=True, db_index=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL, related_name='+', editable=False
+    )
+    owner_synced_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     resource_type: str
     resource_urn: str
@@ -730,7 +1108,7 @@ class AbstractOrder(SimpleAbstractOrder):
 
     @classmethod
     def get_object_list(cls, access_token: str, action='view'):
-        return cls.objects.filter(resource_id__in=as207960_utils.models.get_object_ids(access_token, cls.resource_type, action))
+        return cls.objects.filter(resource_id__in=permissions.get_object_ids(access_token, cls.resource_type, action))
 
     @classmethod
     def has_class_scope(cls, access_token: str, action='view'):
@@ -739,10 +1117,12 @@ class AbstractOrder(SimpleAbstractOrder):
             .eval_permission(access_token, cls.resource_type, scope_name)
 
     def has_scope(self, access_token: str, action='view'):
-        scope_name = f"{action}-{self.resource_type}"
-        return as207960_utils.models.eval_permission(access_token, self.resource_id, scope_name)
+        return permissions.has_scope(access_token, self.resource_type, self.resource_id, action)
 
     def save(self, *args, **kwargs):
+        if self.user:
+            self.owner = self.user
+            self.owner_synced_at = timezone.now()
         as207960_utils.models.sync_resource_to_keycloak(
             self,
             display_name=self.resource_display_name, scopes=[
@@ -753,15 +1133,31 @@ class AbstractOrder(SimpleAbstractOrder):
             urn=self.resource_urn, super_save=super().save, view_name=None,
             args=args, kwargs=kwargs
         )
+        if self.user:
+            permissions.invalidate_user(self.user.username)
 
     def delete(self, *args, **kwargs):
         super().delete(*args, *kwargs)
         as207960_utils.models.delete_resource(self.resource_id)
 
+    @property
+    def owner_is_fresh(self) -> bool:
+        return bool(self.owner_id and self.owner_synced_at and self.owner_synced_at + datetime.timedelta(
+            seconds=settings.RESOURCE_OWNER_TTL
+        ) >= timezone.now())
+
     def get_user(self):
         if self.user:
             return self.user
-        return as207960_utils.models.get_resource_owner(self.resource_id)
+        if self.owner_is_fresh:
+            return self.owner
+        return self.refresh_owner()
+
+    def refresh_owner(self):
+        self.owner = as207960_utils.models.get_resource_owner(self.resource_id)
+        self.owner_synced_at = timezone.now()
+        type(self).objects.filter(pk=self.pk).update(owner=self.owner, owner_synced_at=self.owner_synced_at)
+        return self.owner
 
 
 class DomainRegistrationOrder(AbstractOrder):
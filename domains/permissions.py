@@ -0,0 +1,95 @@
+import hashlib
+import time
+import typing
+import uuid
+
+import as207960_utils.models
+import jwt
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = "keycloak_permissions"
+UNCACHEABLE = "uncacheable"
+
+
+def _normalise_id(resource_id) -> typing.Optional[str]:
+    try:
+        return str(uuid.UUID(str(resource_id)))
+    except ValueError:
+        return None
+
+
+def _token_claims(access_token: str) -> dict:
+    try:
+        return jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return {}
+
+
+def _generation_key(subject: typing.Optional[str]) -> str:
+    return f"{CACHE_PREFIX}_generation:{subject}"
+
+
+def _generation(subject: typing.Optional[str]) -> int:
+    key = _generation_key(subject)
+    cache.add(key, 0, timeout=None)
+    return cache.get(key, 0)
+
+
+def invalidate_user(username: str):
+    key = _generation_key(username)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def _cache_key(access_token: str, claims: dict, resource_type: str, action: str) -> str:
+    token_id = claims.get("jti") or hashlib.sha256(access_token.encode()).hexdigest()
+    subject = claims.get("sub")
+    return f"{CACHE_PREFIX}:{subject}:{_generation(subject)}:{token_id}:{resource_type}:{action}"
+
+
+def _cache_ttl(claims: dict) -> int:
+    ttl = settings.PERMISSION_CACHE_TTL
+    if "exp" in claims:
+        ttl = min(ttl, int(claims["exp"] - time.time()))
+    return ttl
+
+
+def _fetch_object_ids(access_token: str, claims: dict, key: str, resource_type: str, action: str) \
+        -> typing.FrozenSet[str]:
+    object_ids = frozenset(filter(None, map(
+        _normalise_id, as207960_utils.models.get_object_ids(access_token, resource_type, action)
+    )))
+    ttl = _cache_ttl(claims)
+    if ttl > 0:
+        if len(object_ids) <= settings.PERMISSION_CACHE_MAX_OBJECTS:
+            cache.set(key, object_ids, timeout=ttl)
+        else:
+            cache.set(key, UNCACHEABLE, timeout=ttl)
+    return object_ids
+
+
+def get_object_ids(access_token: str, resource_type: str, action='view') -> typing.FrozenSet[str]:
+    claims = _token_claims(access_token)
+    key = _cache_key(access_token, claims, resource_type, action)
+    object_ids = cache.get(key)
+    if object_ids is None or object_ids == UNCACHEABLE:
+        object_ids = _fetch_object_ids(access_token, claims, key, resource_type, action)
+    return object_ids
+
+
+def has_scope(access_token: str, resource_type: str, resource_id, action='view') -> bool:
+    resource_id = _normalise_id(resource_id) if resource_id else None
+    if not resource_id:
+        return False
+    claims = _token_claims(access_token)
+    key = _cache_key(access_token, claims, resource_type, action)
+    object_ids = cache.get(key)
+    if object_ids == UNCACHEABLE:
+        return as207960_utils.models.eval_permission(access_token, resource_id, f"{action}-{resource_type}")
+    if object_ids is None:
+        object_ids = _fetch_object_ids(access_token, claims, key, resource_type, action)
+    return resource_id in object_ids
@@ -1,21 +1,157 @@
 import grpc
 import google.protobuf.wrappers_pb2
 import google.protobuf.timestamp_pb2
+import base64
+import binascii
+import json
 import re
+import typing
 import django.core.exceptions
 import datetime
+import functools
 import concurrent.futures
+from django.conf import settings
+from django.db import connection
 from django.db.models import Q
+from django.utils import timezone
 from .rdap_grpc import rdap_pb2
 from .rdap_grpc import rdap_pb2_grpc
 from . import models, apps, zone_info
 
 
+CURSOR_METADATA_KEY = "rdap-cursor"
+PAGE_SIZE_METADATA_KEY = "rdap-page-size"
+NEXT_CURSOR_METADATA_KEY = "rdap-next-cursor"
+
+
 def grpc_hook(server):
-    rdap_pb2_grpc.add_RDAPServicer_to_server(RDAPServicer(), server)
+    servicer = RDAPServicer()
+    rdap_pb2_grpc.add_RDAPServicer_to_server(servicer, server)
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler('rdap.RDAP', {
+        'DomainSearchStream': grpc.unary_stream_rpc_method_handler(
+            servicer.DomainSearchStream,
+            request_deserializer=rdap_pb2.DomainSearchRequest.FromString,
+            response_serializer=rdap_pb2.DomainResponse.SerializeToString,
+        ),
+        'NameServerSearchStream': grpc.unary_stream_rpc_method_handler(
+            servicer.NameServerSearchStream,
+            request_deserializer=rdap_pb2.NameServerSearchRequest.FromString,
+            response_serializer=rdap_pb2.NameServerResponse.SerializeToString,
+        ),
+    }),))
+
+
+def close_connection_after(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connection.close()
+
+    return wrapper
+
+
+def iter_completed(futures: typing.List[concurrent.futures.Future]) -> typing.Iterator:
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def wildcard_filter(
+        pattern: str, lower_field: str, reversed_field: typing.Optional[str] = None
+) -> typing.Tuple[Q, bool]:
+    pattern = pattern.lower()
+    parts = pattern.split("*")
+    if len(parts) == 1:
+        return Q(**{lower_field: pattern}), True
+    elif len(parts) == 2:
+        prefix, suffix = parts
+        query = Q()
+        if prefix:
+            query &= Q(**{f"{lower_field}__startswith": prefix})
+        if suffix:
+            if reversed_field:
+                query &= Q(**{f"{reversed_field}__startswith": suffix[::-1]})
+            elif prefix:
+                query &= Q(**{f"{lower_field}__endswith": suffix})
+        if prefix or reversed_field or not suffix:
+            return query, True
+
+    regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', pattern).replace("*", ".*")
+    return Q(**{f"{lower_field}__regex": f"^{regex}$"}), False
+
+
+def limit_results(queryset, indexed: bool) -> typing.Tuple[list, bool]:
+    limit = settings.RDAP_SEARCH_LIMIT if indexed else settings.RDAP_REGEX_SEARCH_LIMIT
+    objs = list(queryset[:limit + 1])
+    return objs[:limit], len(objs) > limit
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(key: str, obj_id) -> str:
+    return base64.urlsafe_b64encode(json.dumps([key, str(obj_id)]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> typing.Tuple[str, str]:
+    try:
+        key, obj_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise InvalidCursor()
+    if not isinstance(key, str) or not isinstance(obj_id, str):
+        raise InvalidCursor()
+    return key, obj_id
+
+
+def paginate(queryset, key_field: str, context, indexed: bool) -> typing.Tuple[list, typing.Optional[str]]:
+    metadata = dict(context.invocation_metadata())
+    limit = settings.RDAP_SEARCH_LIMIT if indexed else settings.RDAP_REGEX_SEARCH_LIMIT
+    try:
+        page_size = max(min(int(metadata.get(PAGE_SIZE_METADATA_KEY, limit)), limit), 1)
+    except ValueError:
+        page_size = limit
+
+    cursor = metadata.get(CURSOR_METADATA_KEY)
+    if cursor:
+        key, obj_id = decode_cursor(cursor)
+        try:
+            queryset = queryset.filter(Q(**{f"{key_field}__gt": key}) | Q(**{key_field: key, "id__gt": obj_id}))
+        except django.core.exceptions.ValidationError:
+            raise InvalidCursor()
+
+    objs = list(queryset.order_by(key_field, "id")[:page_size + 1])
+    if len(objs) <= page_size:
+        return objs, None
+
+    last_obj = objs[page_size - 1]
+    next_cursor = encode_cursor(getattr(last_obj, key_field), last_obj.id)
+    context.set_trailing_metadata(((NEXT_CURSOR_METADATA_KEY, next_cursor),))
+    return objs[:page_size], next_cursor
+
+
+def add_truncation_remark(resp_data: list):
+    if resp_data:
+        resp_data[-1].remarks.append(rdap_pb2.Remark(
+            title=google.protobuf.wrappers_pb2.StringValue(value="Search results truncated"),
+            description="the search matched more objects than can be returned, "
+                        "refine the search or request the next page to see more",
+            type=google.protobuf.wrappers_pb2.StringValue(value="result set truncated due to excessive load")
+        ))
 
 
 class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
+    @staticmethod
+    def snapshot_time(synced_at: typing.Optional[datetime.datetime]) -> datetime.datetime:
+        if not synced_at:
+            return datetime.datetime.utcnow()
+        return synced_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
     def contact_to_card(self, handle: str, roles, contact: models.Contact) -> rdap_pb2.Entity:
         entity = rdap_pb2.Entity(
             handle=handle,
@@ -180,8 +316,14 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
         elif status == apps.epp_api.rgp_pb2.RGPState.PendingDelete:
             return rdap_pb2.StatusPendingDelete
 
-    def domain_to_proto(self, domain_obj: models.DomainRegistration) -> rdap_pb2.Domain:
-        domain_data = apps.epp_client.get_domain(domain_obj.domain)
+    def domain_to_proto(
+            self, domain_obj: models.DomainRegistration, domain_data: typing.Optional[apps.epp_api.Domain] = None,
+            synced_at: typing.Optional[datetime.datetime] = None
+    ) -> rdap_pb2.Domain:
+        if not domain_data:
+            domain_data, synced_at = models.RegistrySnapshot.get_domains([domain_obj.domain])[0]
+            if isinstance(domain_data, grpc.RpcError):
+                raise domain_data
         zone_data = zone_info.get_domain_info(domain_data.name)[0]
 
         resp_data = rdap_pb2.Domain(
@@ -319,7 +461,7 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
             ))
 
         date = google.protobuf.timestamp_pb2.Timestamp()
-        date.FromDatetime(datetime.datetime.utcnow())
+        date.FromDatetime(self.snapshot_time(synced_at))
         resp_data.events.append(rdap_pb2.Event(
             action=rdap_pb2.EventLastUpdateOfRDAP,
             date=date
@@ -382,8 +524,17 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
         elif status == apps.epp_api.host_pb2.ServerUpdateProhibited:
             return rdap_pb2.StatusServerUpdateProhibited
 
-    def name_server_to_proto(self, name_server_obj: models.NameServer) -> rdap_pb2.NameServer:
-        name_server_data = apps.epp_client.get_host(name_server_obj.name_server, name_server_obj.registry_id)
+    def name_server_to_proto(
+            self, name_server_obj: models.NameServer,
+            name_server_data: typing.Optional[apps.epp_api.Host] = None,
+            synced_at: typing.Optional[datetime.datetime] = None
+    ) -> rdap_pb2.NameServer:
+        if not name_server_data:
+            name_server_data, synced_at = models.RegistrySnapshot.get_hosts(
+                [(name_server_obj.name_server, name_server_obj.registry_id)]
+            )[0]
+        if isinstance(name_server_data, grpc.RpcError):
+            raise name_server_data
 
         resp_data = rdap_pb2.NameServer(
             handle=name_server_data.registry_id,
@@ -416,6 +567,13 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
                 date=date
             ))
 
+        date = google.protobuf.timestamp_pb2.Timestamp()
+        date.FromDatetime(self.snapshot_time(synced_at))
+        resp_data.events.append(rdap_pb2.Event(
+            action=rdap_pb2.EventLastUpdateOfRDAP,
+            date=date
+        ))
+
         for address in name_server_data.addresses:
             if address.ip_type == apps.epp_api.common_pb2.IPAddress.IPv4:
                 resp_data.ip_addresses.v4.append(address.address)
@@ -450,37 +608,102 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
         response = rdap_pb2.DomainResponse(success=resp_data)
         return response
 
+    @staticmethod
+    def not_provided_error() -> rdap_pb2.ErrorResponse:
+        return rdap_pb2.ErrorResponse(
+            error_code=400,
+            title="Not provided",
+            description="Service not provided"
+        )
+
+    @staticmethod
+    def invalid_cursor_error() -> rdap_pb2.ErrorResponse:
+        return rdap_pb2.ErrorResponse(
+            error_code=400,
+            title="Bad request",
+            description="Invalid pagination cursor"
+        )
+
+    @staticmethod
+    def rpc_error(e: grpc.RpcError) -> rdap_pb2.ErrorResponse:
+        return rdap_pb2.ErrorResponse(
+            error_code=500,
+            title="Internal Server Error",
+            description=e.details()
+        )
+
+    def domain_search_page(self, request: rdap_pb2.DomainSearchRequest, context) -> \
+            typing.Tuple[typing.List[models.DomainRegistration], typing.Optional[str]]:
+        query, indexed = wildcard_filter(request.name, "domain_lower", "domain_reversed")
+        return paginate(models.DomainRegistration.objects.filter(
+            query,
+            former_domain=False
+        ), "domain_lower", context, indexed)
+
+    def domain_proto_futures(
+            self, executor: concurrent.futures.Executor, domain_objs: typing.List[models.DomainRegistration]
+    ) -> typing.List[concurrent.futures.Future]:
+        snapshots, to_fetch = models.RegistrySnapshot.load_domains([d.domain for d in domain_objs], False)
+        to_fetch = set(to_fetch)
+
+        @close_connection_after
+        def to_proto(i):
+            if i in to_fetch:
+                domain_data, synced_at = apps.epp_client.get_domain(domain_objs[i].domain), timezone.now()
+            else:
+                domain_data, synced_at = snapshots[i]
+            return self.domain_to_proto(domain_objs[i], domain_data, synced_at)
+
+        return [executor.submit(to_proto, i) for i in range(len(domain_objs))]
+
+    def domains_to_proto(self, domain_objs: typing.List[models.DomainRegistration]) -> \
+            typing.List[rdap_pb2.Domain]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=settings.RDAP_SEARCH_CONCURRENCY) as executor:
+            futures = self.domain_proto_futures(executor, domain_objs)
+            list(iter_completed(futures))
+            return [f.result() for f in futures]
+
+    def iter_domains_to_proto(self, domain_objs: typing.List[models.DomainRegistration]) -> \
+            typing.Iterator[rdap_pb2.Domain]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=settings.RDAP_SEARCH_CONCURRENCY) as executor:
+            yield from iter_completed(self.domain_proto_futures(executor, domain_objs))
+
     def DomainSearch(self, request: rdap_pb2.DomainSearchRequest, context):
-        if request.WhichOneof("query") == "name":
-            regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', request.name).replace("*", ".*")
-            domain_objs = models.DomainRegistration.objects.filter(
-                domain__iregex=f"^{regex}$",
-                former_domain=False
-            )
-        else:
-            response = rdap_pb2.DomainResponse(error=rdap_pb2.ErrorResponse(
-                error_code=400,
-                title="Not provided",
-                description="Service not provided"
-            ))
-            return response
+        if request.WhichOneof("query") != "name":
+            return rdap_pb2.DomainSearchResponse(error=self.not_provided_error())
 
         try:
-            with concurrent.futures.ThreadPoolExecutor() as p:
-                resp_data = list(p.map(self.domain_to_proto, domain_objs))
+            domain_objs, next_cursor = self.domain_search_page(request, context)
+            resp_data = self.domains_to_proto(domain_objs)
+        except InvalidCursor:
+            return rdap_pb2.DomainSearchResponse(error=self.invalid_cursor_error())
         except grpc.RpcError as e:
-            response = rdap_pb2.DomainResponse(error=rdap_pb2.ErrorResponse(
-                error_code=500,
-                title="Internal Server Error",
-                description=e.details()
-            ))
-            return response
+            return rdap_pb2.DomainSearchResponse(error=self.rpc_error(e))
 
+        if next_cursor:
+            add_truncation_remark(resp_data)
         response = rdap_pb2.DomainSearchResponse(success=rdap_pb2.DomainSearchResponse.Domains(
             data=resp_data
         ))
         return response
 
+    def DomainSearchStream(self, request: rdap_pb2.DomainSearchRequest, context):
+        if request.WhichOneof("query") != "name":
+            yield rdap_pb2.DomainResponse(error=self.not_provided_error())
+            return
+
+        try:
+            domain_objs, _ = self.domain_search_page(request, context)
+        except InvalidCursor:
+            yield rdap_pb2.DomainResponse(error=self.invalid_cursor_error())
+            return
+
+        try:
+            for domain in self.iter_domains_to_proto(domain_objs):
+                yield rdap_pb2.DomainResponse(success=domain)
+        except grpc.RpcError as e:
+            yield rdap_pb2.DomainResponse(error=self.rpc_error(e))
+
     def EntityLookup(self, request: rdap_pb2.LookupRequest, context):
         try:
             contact_obj = models.Contact.objects.filter(
@@ -508,33 +731,50 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
 
     def EntitySearch(self, request: rdap_pb2.EntitySearchRequest, context):
         entities = {}
+        truncated = False
 
         if request.WhichOneof("query") == "name":
-            regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', request.name).replace("*", ".*")
-            contact_objs = models.Contact.objects.filter(
-                Q(local_address__name__iregex=f"^{regex}$", local_address__disclose_name=True) |
-                Q(int_address__name__iregex=f"^{regex}$", int_address__disclose_name=True) |
-                Q(local_address__organisation__iregex=f"^{regex}$", local_address__disclose_organisation=True) |
-                Q(int_address__name__iregex=f"^{regex}$", int_address__disclose_organisation=True) |
-                Q(trading_name__iregex=f"^{regex}$")
+            name_query, indexed = wildcard_filter(request.name, "name_lower")
+            organisation_query, _ = wildcard_filter(request.name, "organisation_lower")
+            trading_name_query, _ = wildcard_filter(request.name, "trading_name_lower")
+            name_addresses = models.ContactAddress.objects.filter(name_query, disclose_name=True)
+            organisation_addresses = models.ContactAddress.objects.filter(
+                organisation_query, disclose_organisation=True
             )
+            contact_objs, truncated = limit_results(models.Contact.objects.filter(
+                Q(local_address__in=name_addresses) |
+                Q(int_address__in=name_addresses) |
+                Q(local_address__in=organisation_addresses) |
+                Q(int_address__in=organisation_addresses) |
+                trading_name_query
+            ).order_by("id"), indexed)
             for contact_obj in contact_objs:
                 if contact_obj.id not in entities:
                     entities[contact_obj.id] = contact_obj
         elif request.WhichOneof("query") == "handle":
-            regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', request.handle).replace("*", ".*")
-            try:
-                contact_objs = list(models.Contact.objects.filter(
-                    id__regex=f"^{regex}$"
-                ))
-                for contact_obj in contact_objs:
-                    if contact_obj.id not in entities:
+            if "*" not in request.handle:
+                try:
+                    contact_obj = models.Contact.objects.filter(id=request.handle).first()
+                    if contact_obj:
                         entities[contact_obj.id] = contact_obj
-            except django.core.exceptions.ValidationError:
-                pass
-            registry_contact_objs = models.ContactRegistry.objects.filter(
-                registry_contact_id__iregex=f"^{regex}$"
-            )
+                except django.core.exceptions.ValidationError:
+                    pass
+            else:
+                regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', request.handle).replace("*", ".*")
+                try:
+                    contact_objs, truncated = limit_results(models.Contact.objects.filter(
+                        id__regex=f"^{regex}$"
+                    ).order_by("id"), False)
+                    for contact_obj in contact_objs:
+                        if contact_obj.id not in entities:
+                            entities[contact_obj.id] = contact_obj
+                except django.core.exceptions.ValidationError:
+                    pass
+            query, indexed = wildcard_filter(request.handle, "registry_contact_id_lower")
+            registry_contact_objs, registry_truncated = limit_results(models.ContactRegistry.objects.filter(
+                query
+            ).order_by("registry_contact_id_lower").select_related("contact"), indexed)
+            truncated = truncated or registry_truncated
             for registry_contact_obj in registry_contact_objs:
                 if registry_contact_obj.registry_contact_id not in entities:
                     entities[registry_contact_obj.registry_contact_id] = registry_contact_obj.contact
@@ -549,6 +789,8 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
         resp_data = []
         for handle, contact_obj in entities.items():
             resp_data.append(self.contact_to_card(handle, [], contact_obj))
+        if truncated:
+            add_truncation_remark(resp_data)
 
         response = rdap_pb2.EntitySearchResponse(success=rdap_pb2.EntitySearchResponse.Entities(
             data=resp_data
@@ -580,32 +822,72 @@ class RDAPServicer(rdap_pb2_grpc.RDAPServicer):
         response = rdap_pb2.NameServerResponse(success=resp_data)
         return response
 
+    def name_server_search_page(self, request: rdap_pb2.NameServerSearchRequest, context) -> \
+            typing.Tuple[typing.List[models.NameServer], typing.Optional[str]]:
+        query, indexed = wildcard_filter(request.name, "name_server_lower", "name_server_reversed")
+        return paginate(models.NameServer.objects.filter(query), "name_server_lower", context, indexed)
+
+    def name_server_proto_futures(
+            self, executor: concurrent.futures.Executor, name_server_objs: typing.List[models.NameServer]
+    ) -> typing.List[concurrent.futures.Future]:
+        hosts = [(n.name_server, n.registry_id) for n in name_server_objs]
+        snapshots, to_fetch = models.RegistrySnapshot.load_hosts(hosts, False)
+        to_fetch = set(to_fetch)
+
+        @close_connection_after
+        def to_proto(i):
+            if i in to_fetch:
+                name_server_data, synced_at = apps.epp_client.get_host(*hosts[i]), timezone.now()
+            else:
+                name_server_data, synced_at = snapshots[i]
+            return self.name_server_to_proto(name_server_objs[i], name_server_data, synced_at)
+
+        return [executor.submit(to_proto, i) for i in range(len(name_server_objs))]
+
+    def name_servers_to_proto(self, name_server_objs: typing.List[models.NameServer]) -> \
+            typing.List[rdap_pb2.NameServer]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=settings.RDAP_SEARCH_CONCURRENCY) as executor:
+            futures = self.name_server_proto_futures(executor, name_server_objs)
+            list(iter_completed(futures))
+            return [f.result() for f in futures]
+
+    def iter_name_servers_to_proto(self, name_server_objs: typing.List[models.NameServer]) -> \
+            typing.Iterator[rdap_pb2.NameServer]:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=settings.RDAP_SEARCH_CONCURRENCY) as executor:
+            yield from iter_completed(self.name_server_proto_futures(executor, name_server_objs))
+
     def NameServerSearch(self, request: rdap_pb2.NameServerSearchRequest, context):
-        if request.WhichOneof("query") == "name":
-            regex = re.sub(r"[-[\]{}()+?.,\\^$|#\s]", r'\\\g<0>', request.name).replace("*", ".*")
-            name_server_objs = models.NameServer.objects.filter(
-                name_server__iregex=f"^{regex}$"
-            )
-        else:
-            response = rdap_pb2.NameServerResponse(error=rdap_pb2.ErrorResponse(
-                error_code=400,
-                title="Not provided",
-                description="Service not provided"
-            ))
-            return response
+        if request.WhichOneof("query") != "name":
+            return rdap_pb2.NameServerSearchResponse(error=self.not_provided_error())
 
         try:
-            with concurrent.futures.ThreadPoolExecutor() as p:
-                resp_data = list(p.map(self.name_server_to_proto, name_server_objs))
+            name_server_objs, next_cursor = self.name_server_search_page(request, context)
+            resp_data = self.name_servers_to_proto(name_server_objs)
+        except InvalidCursor:
+            return rdap_pb2.NameServerSearchResponse(error=self.invalid_cursor_error())
         except grpc.RpcError as e:
-            response = rdap_pb2.NameServerResponse(error=rdap_pb2.ErrorResponse(
-                error_code=500,
-                title="Internal Server Error",
-                description=e.details()
-            ))
-            return response
+            return rdap_pb2.NameServerSearchResponse(error=self.rpc_error(e))
 
+        if next_cursor:
+            add_truncation_remark(resp_data)
         response = rdap_pb2.NameServerSearchResponse(success=rdap_pb2.NameServerSearchResponse.NameServers(
             data=resp_data
         ))
         return response
+
+    def NameServerSearchStream(self, request: rdap_pb2.NameServerSearchRequest, context):
+        if request.WhichOneof("query") != "name":
+            yield rdap_pb2.NameServerResponse(error=self.not_provided_error())
+            return
+
+        try:
+            name_server_objs, _ = self.name_server_search_page(request, context)
+        except InvalidCursor:
+            yield rdap_pb2.NameServerResponse(error=self.invalid_cursor_error())
+            return
+
+        try:
+            for name_server in self.iter_name_servers_to_proto(name_server_objs):
+                yield rdap_pb2.NameServerResponse(success=name_server)
+        except grpc.RpcError as e:
+            yield rdap_pb2.NameServerResponse(error=self.rpc_error(e))
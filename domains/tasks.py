@@ -176,7 +176,7 @@ def process_domain_registration_paid(registration_order_id):
     zone, sld = zone_info.get_domain_info(domain_registration_order.domain)
 
     try:
-        available, _, registry_id = apps.epp_client.check_domain(domain_registration_order.domain)
+        available, _, registry_id = apps.epp_client.check_domain(domain_registration_order.domain, use_cache=False)
     except grpc.RpcError as rpc_error:
         logger.warn(f"Failed to check availability of {domain_registration_order.domain}: {rpc_error.details()}")
         raise rpc_error
@@ -201,44 +201,45 @@ def process_domain_registration_paid(registration_order_id):
                     raise rpc_error
 
         try:
-            contact_objs = []
-            if zone.admin_supported and domain_registration_order.admin_contact:
-                contact_objs.append(apps.epp_api.DomainContact(
-                    contact_type="admin",
-                    contact_id=domain_registration_order.admin_contact.get_registry_id(
+            with models.ContactRegistry.revalidate_on_error():
+                contact_objs = []
+                if zone.admin_supported and domain_registration_order.admin_contact:
+                    contact_objs.append(apps.epp_api.DomainContact(
+                        contact_type="admin",
+                        contact_id=domain_registration_order.admin_contact.get_registry_id(
+                            registry_id).registry_contact_id
+                    ))
+                if zone.billing_supported and domain_registration_order.billing_contact:
+                    contact_objs.append(apps.epp_api.DomainContact(
+                        contact_type="billing",
+                        contact_id=domain_registration_order.billing_contact.get_registry_id(
+                            registry_id).registry_contact_id
+                    ))
+                if zone.tech_supported and domain_registration_order.tech_contact:
+                    contact_objs.append(apps.epp_api.DomainContact(
+                        contact_type="tech",
+                        contact_id=domain_registration_order.tech_contact.get_registry_id(
+                            registry_id).registry_contact_id
+                    ))
+
+                pending, _, _, _ = apps.epp_client.create_domain(
+                    domain=domain_registration_order.domain,
+                    period=period,
+                    registrant=domain_registration_order.registrant_contact.get_registry_id(
                         registry_id).registry_contact_id
-                ))
-            if zone.billing_supported and domain_registration_order.billing_contact:
-                contact_objs.append(apps.epp_api.DomainContact(
-                    contact_type="billing",
-                    contact_id=domain_registration_order.billing_contact.get_registry_id(
-                        registry_id).registry_contact_id
-                ))
-            if zone.tech_supported and domain_registration_order.tech_contact:
-                contact_objs.append(apps.epp_api.DomainContact(
-                    contact_type="tech",
-                    contact_id=domain_registration_order.tech_contact.get_registry_id(
-                        registry_id).registry_contact_id
-                ))
-
-            pending, _, _, _ = apps.epp_client.create_domain(
-                domain=domain_registration_order.domain,
-                period=period,
-                registrant=domain_registration_order.registrant_contact.get_registry_id(
-                    registry_id).registry_contact_id
-                if zone.registrant_supported else 'NONE',
-                contacts=contact_objs,
-                name_servers=[apps.epp_api.DomainNameServer(
-                    host_obj='ns1.as207960.net',
-                    host_name=None,
-                    address=[]
-                ), apps.epp_api.DomainNameServer(
-                    host_obj='ns2.as207960.net',
-                    host_name=None,
-                    address=[]
-                )],
-                auth_info=domain_registration_order.auth_info,
-            )
+                    if zone.registrant_supported else 'NONE',
+                    contacts=contact_objs,
+                    name_servers=[apps.epp_api.DomainNameServer(
+                        host_obj='ns1.as207960.net',
+                        host_name=None,
+                        address=[]
+                    ), apps.epp_api.DomainNameServer(
+                        host_obj='ns2.as207960.net',
+                        host_name=None,
+                        address=[]
+                    )],
+                    auth_info=domain_registration_order.auth_info,
+                )
         except grpc.RpcError as rpc_error:
             domain_registration_order.state = domain_registration_order.STATE_PENDING_APPROVAL
             domain_registration_order.last_error = rpc_error.details()
@@ -317,6 +318,8 @@ def process_domain_registration_complete(registration_order_id):
         billing_contact=domain_registration_order.billing_contact
     )
     domain_obj.save()
+    apps.epp_client.invalidate_domain(domain_obj.domain)
+    sync_domain_registry_data.delay(domain_obj.domain)
 
     domain_registration_order.domain_obj = domain_obj
     domain_registration_order.state = domain_registration_order.STATE_COMPLETED
@@ -357,7 +360,7 @@ def process_domain_renewal_paid(renew_order_id):
         unit=domain_renewal_order.period_unit
     )
     try:
-        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain)
+        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain, use_cache=False)
     except grpc.RpcError as rpc_error:
         logger.warn(f"Failed to load data of {domain_renewal_order.domain}: {rpc_error.details()}")
         raise rpc_error
@@ -437,6 +440,9 @@ def process_domain_renewal_complete(renew_order_id):
         unit=domain_renew_order.period_unit
     )
 
+    apps.epp_client.invalidate_domain(domain_renew_order.domain)
+    sync_domain_registry_data.delay(domain_renew_order.domain)
+
     domain_renew_order.state = domain_renew_order.STATE_COMPLETED
     domain_renew_order.redirect_uri = None
     domain_renew_order.last_error = None
@@ -468,7 +474,7 @@ def process_domain_restore_paid(restore_order_id):
     zone, sld = zone_info.get_domain_info(domain_restore_order.domain)
 
     try:
-        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain)
+        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain, use_cache=False)
     except grpc.RpcError as rpc_error:
         logger.warn(f"Failed to load data of {domain_renewal_order.domain}: {rpc_error.details()}")
         raise rpc_error
@@ -570,6 +576,8 @@ def process_domain_restore_complete(restore_order_id):
     domain_restore_order.domain_obj.deleted = False
     domain_restore_order.domain_obj.pending = False
     domain_restore_order.domain_obj.save()
+    apps.epp_client.invalidate_domain(domain_restore_order.domain)
+    sync_domain_registry_data.delay(domain_restore_order.domain)
 
     domain_restore_order.state = domain_restore_order.STATE_COMPLETED
     domain_restore_order.redirect_uri = None
@@ -685,6 +693,7 @@ def process_domain_transfer(transfer_order_id):
     autoretry_for=(Exception,), retry_backoff=1, retry_backoff_max=60, max_retries=None, default_retry_delay=3,
     ignore_result=True
 )
+@models.ContactRegistry.revalidate_on_error()
 def process_domain_transfer_contacts(transfer_order_id):
     domain_transfer_order = \
         models.DomainTransferOrder.objects.get(id=transfer_order_id)  # type: models.DomainTransferOrder
@@ -694,7 +703,7 @@ def process_domain_transfer_contacts(transfer_order_id):
         logger.error(f"Failed to get zone info for {domain_transfer_order.domain}")
         return
 
-    domain_data = apps.epp_client.get_domain(domain_transfer_order.domain)
+    domain_data = apps.epp_client.get_domain(domain_transfer_order.domain, use_cache=False)
 
     update_req = apps.epp_api.domain_pb2.DomainUpdateRequest(
         name=domain_data.name,
@@ -741,7 +750,7 @@ def process_domain_transfer_contacts(transfer_order_id):
         _update_contact("billing", billing_contact_id.registry_contact_id)
 
     if should_send:
-        apps.epp_client.stub.DomainUpdate(update_req)
+        apps.epp_client.update_domain(update_req)
 
 
 @shared_task(
@@ -763,6 +772,8 @@ def process_domain_transfer_complete(transfer_order_id):
         billing_contact=domain_transfer_order.billing_contact
     )
     domain_obj.save()
+    apps.epp_client.invalidate_domain(domain_obj.domain)
+    sync_domain_registry_data.delay(domain_obj.domain)
     process_domain_transfer_contacts.delay(domain_transfer_order.id)
 
     domain_transfer_order.state = domain_transfer_order.STATE_COMPLETED
@@ -795,7 +806,7 @@ def process_domain_transfer_failed(transfer_order_id):
 )
 def set_dns_to_own(domain_id):
     domain = models.DomainRegistration.objects.get(id=domain_id)  # type: models.DomainRegistration
-    domain_data = apps.epp_client.get_domain(domain.domain)
+    domain_data = apps.epp_client.get_domain(domain.domain, use_cache=False)
 
     domain_info = zone_info.get_domain_info(domain.domain)[0]
 
@@ -816,7 +827,7 @@ def set_dns_to_own(domain_id):
             if host_available:
                 apps.epp_client.create_host(host, [], domain_data.registry_name)
 
-    apps.epp_client.stub.DomainUpdate(apps.epp_api.domain_pb2.DomainUpdateRequest(
+    apps.epp_client.update_domain(apps.epp_api.domain_pb2.DomainUpdateRequest(
         name=domain_data.name,
         remove=list(map(lambda h: apps.epp_api.domain_pb2.DomainUpdateRequest.Param(
             nameserver=apps.epp_api.domain_pb2.NameServer(
@@ -846,7 +857,7 @@ def process_domain_auto_renew_paid(renew_order_id):
     )
 
     try:
-        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain)
+        domain_data = apps.epp_client.get_domain(domain_renewal_order.domain, use_cache=False)
     except grpc.RpcError as rpc_error:
         logger.warn(f"Failed to load data of {domain_renewal_order.domain}: {rpc_error.details()}")
         raise rpc_error
@@ -881,6 +892,7 @@ def process_domain_auto_renew_paid(renew_order_id):
     domain_renewal_order.save()
 
     emails.mail_auto_renew_success.delay(domain_renewal_order.id)
+    sync_domain_registry_data.delay(domain_renewal_order.domain)
     logger.info(f"{domain_renewal_order.domain} successfully renewed")
 
 
@@ -893,6 +905,8 @@ def process_domain_auto_renew_complete(renew_order_id):
         models.DomainAutomaticRenewOrder.objects.get(id=renew_order_id)  # type: models.DomainRenewOrder
 
     emails.mail_auto_renew_success.delay(domain_renew_order.id)
+    apps.epp_client.invalidate_domain(domain_renew_order.domain)
+    sync_domain_registry_data.delay(domain_renew_order.domain)
 
     domain_renew_order.state = domain_renew_order.STATE_COMPLETED
     domain_renew_order.redirect_uri = None
@@ -913,6 +927,16 @@ def process_domain_auto_renew_failed(renew_order_id):
     domain_renew_order.save()
 
 
+@shared_task(
+    autoretry_for=(Exception,), retry_backoff=1, retry_backoff_max=60, max_retries=None, default_retry_delay=3,
+    ignore_result=True
+)
+def sync_domain_registry_data(domain):
+    domain_data = apps.epp_client.get_domain(domain, use_cache=False)
+    models.DomainRegistration.mirror_registry_data(domain_data)
+    models.RegistrySnapshot.record_domain(domain_data)
+
+
 @shared_task(
     autoretry_for=(Exception,), retry_backoff=1, retry_backoff_max=60, max_retries=None, default_retry_delay=3,
     ignore_result=True
@@ -922,6 +946,7 @@ def process_domain_locking_complete(domain_id):
 
     domain_obj.pending_registry_lock_status = None
     domain_obj.save()
+    apps.epp_client.invalidate_domain(domain_obj.domain)
 
     emails.mail_locked.delay(domain_obj.id)
 
@@ -935,5 +960,6 @@ def process_domain_locking_failed(domain_id):
 
     domain_obj.pending_registry_lock_status = None
     domain_obj.save()
+    apps.epp_client.invalidate_domain(domain_obj.domain)
 
     emails.mail_lock_failed.delay(domain_obj.id)
@@ -1,3 +1,98 @@
-from django.test import TestCase
+import multiprocessing
+import threading
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, connections
+from django.test import TransactionTestCase
+
+from . import models
+
+
+def fake_sync_resource_to_keycloak(obj, super_save, args, kwargs, **_):
+    if not obj.resource_id:
+        obj.resource_id = uuid.uuid4()
+    super_save(*args, **kwargs)
+
+
+def get_name_servers(n, hosts, registry_id, calls):
+    results = []
+    try:
+        for i in range(calls):
+            host = hosts[(n + i) % len(hosts)]
+            name_server = models.NameServer.get_name_server(host, registry_id, None)
+            results.append((host.lower(), name_server.id))
+    finally:
+        connection.close()
+    return results
+
+
+def process_worker(n, hosts, registry_id, calls, barrier, queue):
+    try:
+        barrier.wait()
+        queue.put((n, get_name_servers(n, hosts, registry_id, calls), None))
+    except Exception as e:
+        queue.put((n, [], repr(e)))
+
+
+@mock.patch("as207960_utils.models.delete_resource")
+@mock.patch("as207960_utils.models.sync_resource_to_keycloak", side_effect=fake_sync_resource_to_keycloak)
+class NameServerConcurrencyTestCase(TransactionTestCase):
+    THREADS = 16
+    PROCESSES = 4
+    CALLS_PER_THREAD = 50
+    HOSTS = ["ns1.example.com", "NS2.example.com", "ns3.EXAMPLE.com", "ns4.example.com"]
+    REGISTRY_ID = "test-registry"
+
+    def assertOneNameServerPerHost(self, results):
+        for host in self.HOSTS:
+            self.assertEqual(models.NameServer.objects.filter(
+                name_server_lower=host.lower(), registry_id=self.REGISTRY_ID
+            ).count(), 1)
+
+        ids = {}
+        for worker_results in results:
+            for host, name_server_id in worker_results:
+                ids.setdefault(host, set()).add(name_server_id)
+        self.assertEqual({host: len(i) for host, i in ids.items()}, {host.lower(): 1 for host in self.HOSTS})
+
+    def test_get_name_server_concurrent(self, _sync, _delete):
+        barrier = threading.Barrier(self.THREADS)
+        results = [[] for _ in range(self.THREADS)]
+        errors = []
+
+        def worker(n):
+            try:
+                barrier.wait()
+                results[n] = get_name_servers(n, self.HOSTS, self.REGISTRY_ID, self.CALLS_PER_THREAD)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertOneNameServerPerHost(results)
+
+    def test_get_name_server_concurrent_processes(self, _sync, _delete):
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(self.PROCESSES)
+        queue = context.Queue()
+
+        connections.close_all()
+        processes = [context.Process(
+            target=process_worker,
+            args=(n, self.HOSTS, self.REGISTRY_ID, self.CALLS_PER_THREAD, barrier, queue)
+        ) for n in range(self.PROCESSES)]
+        for process in processes:
+            process.start()
+        outputs = [queue.get(timeout=120) for _ in processes]
+        for process in processes:
+            process.join()
+
+        self.assertEqual([error for _, _, error in outputs if error], [])
+        self.assertEqual([process.exitcode for process in processes], [0] * self.PROCESSES)
+        self.assertOneNameServerPerHost([results for _, results, _ in outputs])
@@ -6,13 +6,15 @@ urlpatterns = [
     path('', domain.index, name='index'),
     path('update_billing_country/', billing.update_country, name='update_billing_country'),
     path('prices/', domain.domain_prices, name='domain_prices'),
-    path('prices/query/', domain.domain_price_query, name='domain_price_query'),
+    path('prices/query/', domain.domain_price_query_async if settings.ASYNC_VIEWS else domain.domain_price_query, name='domain_price_query'),
     path('domains/suggest/', suggest.suggest_name, name='suggest_domain'),
     path('domains/suggest/personal/', suggest.suggest_personal_name, name='suggest_personal_domain'),
     path('domains/suggest/online/', suggest.suggest_online, name='suggest_online_domain'),
+    path('domains/suggest/stream/<str:token>/', suggest.suggest_stream, name='suggest_domain_stream'),
     path('domains/check_price/', domain.internal_check_price, name='internal_check_price'),
-    path('domains/', domain.domains, name='domains'),
-    path('domains/new/', domain.domain_search, name='domain_search'),
+    path('domains/', domain.domains_async if settings.ASYNC_VIEWS else domain.domains, name='domains'),
+    path('domains/new/', domain.domain_search_async if settings.ASYNC_VIEWS else domain.domain_search, name='domain_search'),
+    path('domains/new/bulk/', domain.domain_bulk_search, name='domain_bulk_search'),
     path('domains/new_gay/', domain.domain_search_gay, name='domain_search_gay'),
     path('domains/new/<str:domain_name>/success/', domain.domain_search_success, name='domain_search_success'),
     path('domains/register/<str:domain_name>/', domain.domain_register, name='domain_register'),
@@ -58,7 +60,7 @@ urlpatterns = [
         'domains/<str:domain_id>/registry_lock/authenticate/', registry_lock.authenticate,
         name='domain_registry_lock_authenticate'
     ),
-    path('hosts/', hosts.hosts, name='hosts'),
+    path('hosts/', hosts.hosts_async if settings.ASYNC_VIEWS else hosts.hosts, name='hosts'),
     path('hosts/<str:host_id>/', hosts.host, name='host'),
     path('hosts/<str:host_id>/delete/', hosts.host_delete, name='host_delete'),
     path('hosts/create/<str:host_name>/', hosts.host_create, name='host_create'),
@@ -77,6 +79,8 @@ urlpatterns = [
     path('isnic/webhook/', isnic.postal),
     path('gchat_bot/link/<str:state_id>', gchat_bot.link_account, name='gchat_account_link'),
     path('epp_client/', admin.index, name='admin_index'),
+    path('epp_client/expire_currency_rates/', admin.expire_currency_rates, name='admin_expire_currency_rates'),
+    path('epp_client/expire_fee_checks/', admin.expire_fee_checks, name='admin_expire_fee_checks'),
     path('epp_client/domains/', admin.view_domains, name='admin_view_domains'),
     path('epp_client/domains/<str:domain_id>/', admin.view_domain, name='admin_view_domain'),
     path('epp_client/domains/<str:domain_id>/mark_transfer_out/', admin.domain_mark_transfer_out,
@@ -2,20 +2,26 @@ import dataclasses
 import decimal
 import enum
 import random
+import secrets
 import typing
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import grpc
 import requests
 from django.conf import settings
+from django.core.cache import cache
 
-from . import zone_info, apps
+from . import zone_info, apps, http_client
 
 if settings.DEBUG:
     NS_API_BASE = "https://ote-sugapi.verisign-grs.com/ns-api/2.0"
 else:
     NS_API_BASE = "https://sugapi.verisign-grs.com/ns-api/2.0"
 
+SUPPORTED_TLDS_CACHE_KEY = "verisign_supported_tlds"
+SUGGESTIONS_CACHE_PREFIX = "verisign_suggestions"
+SUGGESTION_WORKERS = 8
+
 
 @dataclasses.dataclass
 class SupportedTLD:
@@ -47,8 +53,8 @@ class SuggestedDomain:
     price: decimal.Decimal
     currency: str
 
-    @classmethod
-    def from_result(cls, res, iso_code=None, username=None):
+    @staticmethod
+    def result_availability(res, check: bool = True) -> Availability:
         if res["availability"] == "available":
             availability = Availability.AVAILABLE
         elif res["availability"] == "registered":
@@ -57,7 +63,7 @@ class SuggestedDomain:
             availability = Availability.RESERVED
         elif res["availability"] == "premium":
             availability = Availability.PREMIUM
-        elif res["availability"] == "unknown":
+        elif res["availability"] == "unknown" and check:
             try:
                 available, reason, _ = apps.epp_client.check_domain(res["name"])
             except grpc.RpcError:
@@ -68,20 +74,14 @@ class SuggestedDomain:
             availability = Availability.INVALID
         else:
             availability = Availability.UNKNOWN
+        return availability
 
-        zone, sld = zone_info.get_domain_info(res["name"])
-        if not zone:
-            price_decimal = None
-        else:
-            try:
-                price_decimal = zone.pricing.registration(iso_code, username, sld)
-            except grpc.RpcError:
-                price_decimal = None
-
+    @classmethod
+    def from_result(cls, res, price: typing.Optional[decimal.Decimal], check: bool = True):
         return cls(
             name=res["name"],
-            availability=availability,
-            price=price_decimal,
+            availability=cls.result_availability(res, check),
+            price=price,
             currency="GBP"
         )
 
@@ -93,17 +93,23 @@ class VerisignError(Exception):
 
 
 def make_verisign_request(uri, data=None):
-    r = requests.get(f"{NS_API_BASE}{uri}", headers={
-        "X-NameSuggestion-APIKey": settings.VERISIGN_NS_API_KEY
-    }, params=data)
-    data = r.json()
+    try:
+        r = http_client.client.get(f"{NS_API_BASE}{uri}", endpoint=f"verisign {uri}", headers={
+            "X-NameSuggestion-APIKey": settings.VERISIGN_NS_API_KEY
+        }, params=data)
+        data = r.json()
+    except (requests.RequestException, ValueError) as e:
+        raise VerisignError(None, f"Unable to reach the name suggestion service: {e}")
     if r.status_code != 200:
-        raise VerisignError(data["code"], data["message"])
+        raise VerisignError(data.get("code"), data.get("message"))
     return data
 
 
 def get_supported_tlds() -> typing.List[SupportedTLD]:
-    data = make_verisign_request("/supported-tlds")
+    data = cache.get(SUPPORTED_TLDS_CACHE_KEY)
+    if data is None:
+        data = make_verisign_request("/supported-tlds")
+        cache.set(SUPPORTED_TLDS_CACHE_KEY, data, timeout=settings.VERISIGN_SUPPORTED_TLDS_CACHE_TTL)
     return list(map(lambda i: SupportedTLD(
         tld=i["unicode"],
         checked="@checked" in i["tags"] if "tags" in i else False
@@ -120,11 +126,7 @@ def get_intersecting_tlds() -> typing.List[SupportedTLD]:
     return out
 
 
-def suggests(
-        name: str,
-        ip_address: typing.Optional[str] = None,
-        iso_code=None, username=None
-) -> typing.List[SuggestedDomain]:
+def suggest_results(name: str, ip_address: typing.Optional[str] = None):
     tlds = ",".join(list(map(lambda t: t.tld, get_intersecting_tlds())))
     params = {
         "use-idns": "yes",
@@ -134,17 +136,97 @@ def suggests(
     if ip_address:
         params["ip-address"] = ip_address
 
-    data = make_verisign_request("/suggest", params)
-    with ThreadPoolExecutor() as executor:
-        return list(executor.map(lambda r: SuggestedDomain.from_result(r, iso_code, username), data["results"]))
+    return make_verisign_request("/suggest", params)["results"]
 
 
-def suggest_personal_names(
+def suggests(
+        name: str,
+        ip_address: typing.Optional[str] = None,
+        iso_code=None, username=None
+) -> typing.List[SuggestedDomain]:
+    return suggested_domains(suggest_results(name, ip_address), iso_code, username)
+
+
+def _zone_prices(zone, names, iso_code, username):
+    try:
+        return names, zone.pricing.registration_many(iso_code, username, [sld for _, sld in names])
+    except grpc.RpcError:
+        return names, [None] * len(names)
+
+
+def iter_suggested_domains(
+        results, iso_code=None, username=None
+) -> typing.Iterator[typing.Tuple[int, SuggestedDomain]]:
+    prices = {}
+    availabilities = {}
+    zones = {}
+    for i, res in enumerate(results):
+        zone, sld = zone_info.get_domain_info(res["name"])
+        if zone:
+            zones.setdefault(id(zone), (zone, []))[1].append((i, sld))
+        else:
+            prices[i] = None
+
+    with ThreadPoolExecutor(max_workers=SUGGESTION_WORKERS) as executor:
+        price_futures = [
+            executor.submit(_zone_prices, zone, names, iso_code, username) for zone, names in zones.values()
+        ]
+        availability_futures = {
+            executor.submit(SuggestedDomain.result_availability, res): i for i, res in enumerate(results)
+        }
+
+        for future in as_completed(price_futures + list(availability_futures.keys())):
+            if future in availability_futures:
+                i = availability_futures[future]
+                availabilities[i] = future.result()
+                ready = [i] if i in prices else []
+            else:
+                names, zone_prices = future.result()
+                ready = []
+                for (i, _), price in zip(names, zone_prices):
+                    prices[i] = price
+                    if i in availabilities:
+                        ready.append(i)
+
+            for i in ready:
+                yield i, SuggestedDomain(
+                    name=results[i]["name"],
+                    availability=availabilities[i],
+                    price=prices[i],
+                    currency="GBP"
+                )
+
+
+def suggested_domains(results, iso_code=None, username=None) -> typing.List[SuggestedDomain]:
+    suggestions = [None] * len(results)
+    for i, suggestion in iter_suggested_domains(results, iso_code, username):
+        suggestions[i] = suggestion
+    return suggestions
+
+
+def pending_suggested_domains(results) -> typing.List[SuggestedDomain]:
+    return [SuggestedDomain.from_result(res, None, check=False) for res in results]
+
+
+def save_results(results, iso_code=None, username=None) -> str:
+    token = secrets.token_urlsafe(16)
+    cache.set(f"{SUGGESTIONS_CACHE_PREFIX}:{token}", {
+        "results": results,
+        "iso_code": iso_code,
+        "username": username,
+    }, timeout=settings.VERISIGN_SUGGESTIONS_CACHE_TTL)
+    return token
+
+
+def get_saved_results(token: str) -> typing.Optional[dict]:
+    return cache.get(f"{SUGGESTIONS_CACHE_PREFIX}:{token}")
+
+
+def suggest_personal_name_results(
         first_name: typing.Optional[str] = None,
         last_name: typing.Optional[str] = None,
         middle_names: typing.Optional[typing.List[str]] = None,
-        iso_code=None, username=None
-) -> typing.List[SuggestedDomain]:
+):
     tlds = ",".join(random.choices(list(map(lambda t: t.tld, get_intersecting_tlds())), k=10))
     params = {
         "use-idns": "yes",
@@ -157,12 +239,21 @@ def suggest_personal_names(
     if last_name:
         params["last-name"] = last_name
 
-    data = make_verisign_request("/suggest-personal-names", params)
-    with ThreadPoolExecutor() as executor:
-        return list(executor.map(lambda r: SuggestedDomain.from_result(r, iso_code, username), data["results"]))
+    return make_verisign_request("/suggest-personal-names", params)["results"]
 
 
-def online_presence(
+def suggest_personal_names(
+        first_name: typing.Optional[str] = None,
+        last_name: typing.Optional[str] = None,
+        middle_names: typing.Optional[typing.List[str]] = None,
+        iso_code=None, username=None
+) -> typing.List[SuggestedDomain]:
+    return suggested_domains(
+        suggest_personal_name_results(first_name, last_name, middle_names), iso_code, username
+    )
+
+
+def online_presence_results(
         online_uri: typing.Optional[str] = None,
         online_title: typing.Optional[str] = None,
         related_uris: typing.Optional[typing.List[str]] = None,
@@ -171,8 +262,7 @@ def online_presence(
         preferred_name: typing.Optional[str] = None,
         location: typing.Optional[str] = None,
         email: typing.Optional[str] = None,
-        iso_code=None, username=None
-) -> typing.List[SuggestedDomain]:
+):
     tlds = ",".join(random.choices(list(map(lambda t: t.tld, get_intersecting_tlds())), k=10))
     params = {
         "tlds": tlds
@@ -194,6 +284,8 @@ def online_presence(
     if email:
         params["email"] = email
 
-    data = make_verisign_request("/online-presence", params)
-    with ThreadPoolExecutor() as executor:
-        return list(executor.map(lambda r: SuggestedDomain.from_result(r, iso_code, username), data["results"]))
+    return make_verisign_request("/online-presence", params)["results"]
+
+
+def online_presence(iso_code=None, username=None, **kwargs) -> typing.List[SuggestedDomain]:
+    return suggested_domains(online_presence_results(**kwargs), iso_code, username)
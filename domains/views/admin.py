@@ -1,7 +1,7 @@
 from django.shortcuts import render, reverse, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, permission_required
-from .. import apps, forms, models, zone_info
-from . import emails
+from .. import apps, forms, models, zone_info, middleware, http_client
+from . import emails, billing
 import grpc
 import google.protobuf.text_format
 import google.protobuf.wrappers_pb2
@@ -26,7 +26,40 @@ def catch_epp_error(fun):
 @login_required
 @permission_required('domains.access_eppclient', raise_exception=True)
 def index(request):
-    return render(request, "domains/admin/index.html")
+    return render(request, "domains/admin/index.html", {
+        "domain_cache_stats": apps.epp_client.domain_cache_stats(),
+        "check_cache_stats": apps.epp_client.check_cache_stats(),
+        "country_lookup_stats": middleware.country_lookup_stats.snapshot(),
+        "http_latency_stats": http_client.client.latency_stats(),
+    })
+
+
+@login_required
+@permission_required('domains.access_eppclient', raise_exception=True)
+def expire_currency_rates(request):
+    if request.method == "POST" and request.POST.get("proceed") == "true":
+        billing.expire_currency_rates()
+        return redirect('admin_index')
+
+    return render(request, "domains/admin/confirm.html", {
+        "action": "Expire cached currency rates",
+        "can_execute": True,
+        "back_url": reverse('admin_index')
+    })
+
+
+@login_required
+@permission_required('domains.access_eppclient', raise_exception=True)
+def expire_fee_checks(request):
+    if request.method == "POST" and request.POST.get("proceed") == "true":
+        zone_info.expire_fee_checks()
+        return redirect('admin_index')
+
+    return render(request, "domains/admin/confirm.html", {
+        "action": "Expire cached registry fee checks",
+        "can_execute": True,
+        "back_url": reverse('admin_index')
+    })
 
 
 @login_required
@@ -137,7 +170,7 @@ def domain_info(request):
         form = forms.DomainSearchForm(request.POST)
         form.helper.form_action = request.get_full_path()
         if form.is_valid():
-            domain = apps.epp_client.get_domain(form.cleaned_data["domain"])
+            domain = apps.epp_client.get_domain(form.cleaned_data["domain"], use_cache=False)
     else:
         form = forms.DomainSearchForm()
         form.helper.form_action = request.get_full_path()
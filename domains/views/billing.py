@@ -1,14 +1,14 @@
 from django.conf import settings
+from django.core.cache import cache
 import django_keycloak_auth.clients
 import decimal
-import requests
 import dataclasses
 import typing
 import json
 import uuid
 import retry
 from ..proto import billing_pb2
-from .. import apps
+from .. import apps, http_client
 import google.protobuf.wrappers_pb2
 from django.views.decorators.http import require_POST
 from django.shortcuts import redirect
@@ -34,15 +34,53 @@ class Price:
     currency: str
 
 
-def convert_currency(
-        amount: decimal.Decimal, source_currency: str, username: typing.Optional[str], remote_ip: typing.Optional[str],
-        selected_country: typing.Optional[str], timeout=0,
-) -> Price:
+@dataclasses.dataclass
+class CurrencyRate:
+    rate: decimal.Decimal
+    vat_rate: decimal.Decimal
+    taxable: bool
+    country: str
+
+
+CURRENCY_RATE_REFERENCE_AMOUNT = 1000000
+
+
+def _currency_rate_generation() -> int:
+    cache.add("currency_rate_generation", 0, timeout=None)
+    return cache.get("currency_rate_generation", 0)
+
+
+def _currency_rate_key(
+        source_currency: str, username: typing.Optional[str], remote_ip: typing.Optional[str],
+        selected_country: typing.Optional[str]
+) -> str:
+    location = f"country={selected_country}" if selected_country else f"ip={remote_ip or ''}"
+    return f"currency_rate:{_currency_rate_generation()}:{source_currency}:{username or ''}:{location}"
+
+
+def expire_currency_rates():
+    _currency_rate_generation()
+    try:
+        cache.incr("currency_rate_generation")
+    except ValueError:
+        pass
+
+
+def get_currency_rate(
+        source_currency: str, username: typing.Optional[str], remote_ip: typing.Optional[str],
+        selected_country: typing.Optional[str], timeout=0, refresh=False
+) -> CurrencyRate:
+    key = _currency_rate_key(source_currency, username, remote_ip, selected_country)
+    if not refresh:
+        rate = cache.get(key)
+        if rate is not None:
+            return rate
+
     msg = billing_pb2.BillingRequest(
         convert_currency=billing_pb2.ConvertCurrencyRequest(
             from_currency=source_currency,
             to_currency="GBP",
-            amount=int(round(amount * decimal.Decimal(100))),
+            amount=CURRENCY_RATE_REFERENCE_AMOUNT,
             username=google.protobuf.wrappers_pb2.StringValue(
                 value=username
             ) if username else None,
@@ -57,13 +95,32 @@ def convert_currency(
     msg_response = billing_pb2.ConvertCurrencyResponse()
     msg_response.ParseFromString(apps.rpc_client.call('billing_rpc', msg.SerializeToString(), timeout=timeout))
 
-    amount = (decimal.Decimal(msg_response.amount) / decimal.Decimal(100)).quantize(decimal.Decimal('1.00'))
-    amount_inc_vat = (decimal.Decimal(msg_response.amount_inc_vat) / decimal.Decimal(100)).quantize(decimal.Decimal('1.00'))
-    return Price(
-        amount=amount,
-        amount_inc_vat=amount_inc_vat,
+    rate = CurrencyRate(
+        rate=decimal.Decimal(msg_response.amount) / decimal.Decimal(CURRENCY_RATE_REFERENCE_AMOUNT),
+        vat_rate=(decimal.Decimal(msg_response.amount_inc_vat) / decimal.Decimal(msg_response.amount))
+        if msg_response.amount else decimal.Decimal(1),
         taxable=msg_response.taxable,
         country=msg_response.used_country,
+    )
+    cache.set(key, rate, timeout=settings.CURRENCY_RATE_CACHE_TTL)
+    return rate
+
+
+def convert_currency(
+        amount: decimal.Decimal, source_currency: str, username: typing.Optional[str], remote_ip: typing.Optional[str],
+        selected_country: typing.Optional[str], timeout=0,
+) -> Price:
+    rate = get_currency_rate(source_currency, username, remote_ip, selected_country, timeout=timeout)
+    return apply_currency_rate(amount, rate)
+
+
+def apply_currency_rate(amount: decimal.Decimal, rate: CurrencyRate) -> Price:
+    converted = decimal.Decimal(amount) * rate.rate
+    return Price(
+        amount=converted.quantize(decimal.Decimal('1.00')),
+        amount_inc_vat=(converted * rate.vat_rate).quantize(decimal.Decimal('1.00')),
+        taxable=rate.taxable,
+        country=rate.country,
         currency="GBP"
     )
 
@@ -134,8 +191,8 @@ def charge_account(username: str, amount: decimal.Decimal, descriptor: str, char
 
 def get_charge_state(charge_state_id: str) -> ChargeState:
     client_token = django_keycloak_auth.clients.get_access_token()
-    r = requests.get(
-        f"{settings.BILLING_URL}/get_charge_state/{charge_state_id}/", headers={
+    r = http_client.client.get(
+        f"{settings.BILLING_URL}/get_charge_state/{charge_state_id}/", endpoint="billing get_charge_state", headers={
             "Authorization": f"Bearer {client_token}"
         }
     )
@@ -167,7 +224,7 @@ def reverse_charge(charge_id: str):
     client_token = django_keycloak_auth.clients.get_access_token()
 
     def run_request(*args, **kwargs):
-        r = requests.post(*args, **kwargs)
+        r = http_client.client.post(*args, endpoint="billing reverse_charge", **kwargs)
         r.raise_for_status()
 
     retry.api.retry_call(run_request, fargs=(
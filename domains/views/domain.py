@@ -4,6 +4,7 @@ from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 import django_keycloak_auth.clients
 import ipaddress
 import grpc
@@ -12,9 +13,8 @@ import jwt
 import json
 import urllib.parse
 import datetime
-from concurrent.futures import ThreadPoolExecutor
-from .. import models, apps, forms, zone_info, tasks
-from . import gchat_bot
+from .. import models, apps, forms, zone_info, tasks, availability
+from . import gchat_bot, async_login_required
 
 
 RENEW_INTERVAL = datetime.timedelta(days=30)
@@ -33,21 +33,30 @@ def index(request):
 
 
 def domain_prices(request):
-    zones = list(map(lambda z: {
-        "zone": z[0],
-        "currency": z[1].pricing.currency,
-        "registration": z[1].pricing.representative_registration(),
-        "renewal": z[1].pricing.representative_renewal(),
-        "restore": z[1].pricing.representative_restore(),
-        "transfer": z[1].pricing.representative_transfer(),
-    }, sorted(zone_info.ZONES, key=lambda z: z[0])))
+    price_table = models.PriceTable.latest()
+    if price_table:
+        zones = price_table.public_prices()
+    else:
+        zones = list(map(lambda z: {
+            "zone": z[0],
+            "currency": z[1].pricing.currency,
+            "registration": z[1].pricing.representative_registration(),
+            "renewal": z[1].pricing.representative_renewal(),
+            "restore": z[1].pricing.representative_restore(),
+            "transfer": z[1].pricing.representative_transfer(),
+        }, sorted(zone_info.ZONES, key=lambda z: z[0])))
 
     return render(request, "domains/domain_prices.html", {
-        "domains": zones
+        "domains": zones,
+        "price_table": price_table
     })
 
 
-def domain_price_query(request):
+def _get_username(request):
+    return request.user.username if request.user.is_authenticated else None
+
+
+def _domain_price_query_form(request):
     if request.method == "POST":
         form = forms.DomainSearchForm(request.POST)
         form.helper.form_action = request.get_full_path()
@@ -59,84 +68,127 @@ def domain_price_query(request):
             else:
                 zone, sld = zone_info.get_domain_info(domain_idna)
                 if zone:
-                    try:
-                        data = zone.pricing.fees(
-                            request.country.iso_code, request.user.username if request.user.is_authenticated else None,
-                            sld
-                        )
-                        return render(request, "domains/domain_price_query.html", {
-                            "domain_form": form,
-                            "domain_data": data
-                        })
-                    except grpc.RpcError as rpc_error:
-                        return render(request, "domains/domain_price_query.html", {
-                            "error": rpc_error.details(),
-                            "domain_form": form
-                        })
+                    return form, zone, sld
                 else:
                     form.add_error('domain', "Unsupported or invalid domain")
-
     else:
         form = forms.DomainSearchForm()
         form.helper.form_action = request.get_full_path()
 
-    return render(request, "domains/domain_price_query.html", {
-        "domain_form": form
-    })
+    return form, None, None
 
 
-@login_required
-def domains(request):
+def _domain_price_query_fees(request, username, form, zone, sld):
+    try:
+        data = zone.pricing.fees(request.country.iso_code, username, sld)
+        return {
+            "domain_form": form,
+            "domain_data": data
+        }
+    except grpc.RpcError as rpc_error:
+        return {
+            "error": rpc_error.details(),
+            "domain_form": form
+        }
+
+
+def domain_price_query(request):
+    form, zone, sld = _domain_price_query_form(request)
+    if zone:
+        context = _domain_price_query_fees(request, _get_username(request), form, zone, sld)
+    else:
+        context = {
+            "domain_form": form
+        }
+
+    return render(request, "domains/domain_price_query.html", context)
+
+
+async def domain_price_query_async(request):
+    form, zone, sld = _domain_price_query_form(request)
+    if zone:
+        username = await sync_to_async(_get_username, thread_sensitive=True)(request)
+        context = await sync_to_async(_domain_price_query_fees, thread_sensitive=False)(request, username, form, zone, sld)
+    else:
+        context = {
+            "domain_form": form
+        }
+
+    return await sync_to_async(render, thread_sensitive=True)(request, "domains/domain_price_query.html", context)
+
+
+def _load_domains(request):
     access_token = django_keycloak_auth.clients.get_active_access_token(oidc_profile=request.user.oidc_profile)
     user_domains = models.DomainRegistration.get_object_list(access_token).filter(former_domain=False)
-    registration_orders = models.DomainRegistrationOrder.get_object_list(access_token).exclude(state=models.AbstractOrder.STATE_COMPLETED)
-    transfer_orders = models.DomainTransferOrder.get_object_list(access_token).exclude(state=models.AbstractOrder.STATE_COMPLETED)
-    renew_orders = models.DomainRenewOrder.get_object_list(access_token).exclude(state=models.AbstractOrder.STATE_COMPLETED)
-    restore_orders = models.DomainRestoreOrder.get_object_list(access_token).exclude(state=models.AbstractOrder.STATE_COMPLETED)
-    error = None
+    orders = {
+        "registration_orders": models.DomainRegistrationOrder.get_object_list(access_token)
+            .exclude(state=models.AbstractOrder.STATE_COMPLETED),
+        "transfer_orders": models.DomainTransferOrder.get_object_list(access_token)
+            .exclude(state=models.AbstractOrder.STATE_COMPLETED),
+        "renew_orders": models.DomainRenewOrder.get_object_list(access_token)
+            .exclude(state=models.AbstractOrder.STATE_COMPLETED),
+        "restore_orders": models.DomainRestoreOrder.get_object_list(access_token)
+            .exclude(state=models.AbstractOrder.STATE_COMPLETED),
+    }
 
-    active_domains = []
+    live_domains = []
     deleted_domains = []
-
-    def get_domain(d):
+    for d in user_domains:
         if d.deleted:
             deleted_domains.append(d)
         else:
-            try:
-                domain_data = apps.epp_client.get_domain(d.domain)
-                if apps.epp_api.rgp_pb2.RedemptionPeriod in domain_data.rgp_state:
-                    d.deleted = True
-                    d.deleted_date = timezone.now()
-                    d.save()
-                    deleted_domains.append(d)
-                else:
-                    active_domains.append({
-                        "id": d.id,
-                        "obj": d,
-                        "domain": domain_data
-                    })
-            except grpc.RpcError as rpc_error:
-                active_domains.append({
-                    "id": d.id,
-                    "obj": d,
-                    "error": rpc_error.details()
-                })
+            live_domains.append(d)
+
+    return live_domains, deleted_domains, orders
 
-    with ThreadPoolExecutor() as executor:
-        executor.map(get_domain, user_domains)
+
+def _render_domains(request, live_domains, deleted_domains, orders, domains_data):
+    active_domains = []
+    for d, (domain_data, synced_at) in zip(live_domains, domains_data):
+        if isinstance(domain_data, grpc.RpcError):
+            active_domains.append({
+                "id": d.id,
+                "obj": d,
+                "error": domain_data.details()
+            })
+        elif apps.epp_api.rgp_pb2.RedemptionPeriod in domain_data.rgp_state:
+            d.deleted = True
+            d.deleted_date = timezone.now()
+            d.save()
+            deleted_domains.append(d)
+        else:
+            active_domains.append({
+                "id": d.id,
+                "obj": d,
+                "domain": domain_data,
+                "synced_at": synced_at
+            })
 
     return render(request, "domains/domains.html", {
         "domains": active_domains,
         "deleted_domains": deleted_domains,
-        "registration_orders": registration_orders,
-        "transfer_orders": transfer_orders,
-        "renew_orders": renew_orders,
-        "restore_orders": restore_orders,
-        "error": error,
+        **orders,
+        "error": None,
         "registration_enabled": settings.REGISTRATION_ENABLED
     })
 
 
+@login_required
+def domains(request):
+    live_domains, deleted_domains, orders = _load_domains(request)
+    domains_data = models.RegistrySnapshot.get_domains((d.domain for d in live_domains), mark_viewed=True)
+    return _render_domains(request, live_domains, deleted_domains, orders, domains_data)
+
+
+@async_login_required
+async def domains_async(request):
+    live_domains, deleted_domains, orders = await sync_to_async(_load_domains, thread_sensitive=True)(request)
+    domains_data = await models.RegistrySnapshot.aget_domains((d.domain for d in live_domains), mark_viewed=True)
+    return await sync_to_async(_render_domains, thread_sensitive=True)(
+        request, live_domains, deleted_domains, orders, domains_data
+    )
+
+
 @login_required
 def domain(request, domain_id):
     access_token = django_keycloak_auth.clients.get_active_access_token(oidc_profile=request.user.oidc_profile)
@@ -419,41 +471,42 @@ def update_domain_contact(request, domain_id):
     if form.is_valid():
         contact_type = form.cleaned_data['type']
         try:
-            contact = form.cleaned_data['contact']
-            if contact_type != "registrant":
-                if contact_type == 'admin':
-                    user_domain.admin_contact = contact
-                    if domain_info.admin_supported:
-                        if contact:
-                            contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
-                            domain_data.set_contact(contact_type, contact_id.registry_contact_id)
-                        else:
-                            domain_data.set_contact(contact_type, None)
-                elif contact_type == 'tech':
-                    user_domain.tech_contact = contact
-                    if domain_info.tech_supported:
-                        if contact:
-                            contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
-                            domain_data.set_contact(contact_type, contact_id.registry_contact_id)
-                        else:
-                            domain_data.set_contact(contact_type, None)
-                elif contact_type == 'billing':
-                    user_domain.billing_contact = contact
-                    if domain_info.billing_supported:
-                        if contact:
-                            contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
-                            domain_data.set_contact(contact_type, contact_id.registry_contact_id)
-                        else:
-                            domain_data.set_contact(contact_type, None)
+            with models.ContactRegistry.revalidate_on_error():
+                contact = form.cleaned_data['contact']
+                if contact_type != "registrant":
+                    if contact_type == 'admin':
+                        user_domain.admin_contact = contact
+                        if domain_info.admin_supported:
+                            if contact:
+                                contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
+                                domain_data.set_contact(contact_type, contact_id.registry_contact_id)
+                            else:
+                                domain_data.set_contact(contact_type, None)
+                    elif contact_type == 'tech':
+                        user_domain.tech_contact = contact
+                        if domain_info.tech_supported:
+                            if contact:
+                                contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
+                                domain_data.set_contact(contact_type, contact_id.registry_contact_id)
+                            else:
+                                domain_data.set_contact(contact_type, None)
+                    elif contact_type == 'billing':
+                        user_domain.billing_contact = contact
+                        if domain_info.billing_supported:
+                            if contact:
+                                contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
+                                domain_data.set_contact(contact_type, contact_id.registry_contact_id)
+                            else:
+                                domain_data.set_contact(contact_type, None)
 
-                user_domain.save()
-            elif domain_info.registrant_change_supported:
-                if domain_info.registrant_supported:
-                    contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
-                    domain_data.set_registrant(contact_id.registry_contact_id)
+                    user_domain.save()
+                elif domain_info.registrant_change_supported:
+                    if domain_info.registrant_supported:
+                        contact_id = contact.get_registry_id(domain_data.registry_name, domain_info)
+                        domain_data.set_registrant(contact_id.registry_contact_id)
 
-                user_domain.registrant_contact = contact
-                user_domain.save()
+                    user_domain.registrant_contact = contact
+                    user_domain.save()
         except grpc.RpcError as rpc_error:
             error = rpc_error.details()
             return render(request, "domains/error.html", {
@@ -1057,37 +1110,46 @@ def domain_hexdns(request, domain_id):
     return redirect(f"{settings.HEXDNS_URL}/setup_domains_zone/?domain_token={domain_jwt}")
 
 
-def _domain_search(request, domain_name):
+def _domain_search_precheck(domain_name):
     try:
         domain_idna = domain_name.encode('idna').decode()
     except UnicodeError as e:
-        return "invalid", f"Invalid Unicode: {e}"
-    else:
-        zone, sld = zone_info.get_domain_info(domain_idna)
-        if zone:
-            pending_domain = models.DomainRegistration.objects.filter(
-                domain=domain_name, former_domain=False
-            ).first()
-            if pending_domain:
-                return "invalid", "Domain unavailable"
-            else:
-                try:
-                    available, reason, _ = apps.epp_client.check_domain(domain_idna)
-                except grpc.RpcError as rpc_error:
-                    return "error", rpc_error.details()
-                else:
-                    if not available:
-                        if not reason:
-                            return "invalid", "Domain unavailable"
-                        else:
-                            return "invalid", f"Domain unavailable: {reason}"
-                    else:
-                        if request.user.is_authenticated:
-                            return "resp", redirect('domain_register', domain_idna)
-                        else:
-                            return "resp", redirect('domain_search_success', domain_idna)
+        return ("invalid", f"Invalid Unicode: {e}"), None
+
+    zone, sld = zone_info.get_domain_info(domain_idna)
+    if not zone:
+        return ("invalid", "Unsupported or invalid domain"), None
+
+    if models.DomainRegistration.objects.filter(domain=domain_name, former_domain=False).exists():
+        return ("invalid", "Domain unavailable"), None
+
+    return None, domain_idna
+
+
+def _domain_search_result(is_authenticated, domain_idna, available, reason):
+    if not available:
+        if not reason:
+            return "invalid", "Domain unavailable"
         else:
-            return "invalid", "Unsupported or invalid domain"
+            return "invalid", f"Domain unavailable: {reason}"
+
+    if is_authenticated:
+        return "resp", redirect('domain_register', domain_idna)
+    else:
+        return "resp", redirect('domain_search_success', domain_idna)
+
+
+def _domain_search(request, domain_name):
+    invalid, domain_idna = _domain_search_precheck(domain_name)
+    if invalid:
+        return invalid
+
+    try:
+        available, reason, _ = apps.epp_client.check_domain(domain_idna)
+    except grpc.RpcError as rpc_error:
+        return "error", rpc_error.details()
+
+    return _domain_search_result(request.user.is_authenticated, domain_idna, available, reason)
 
 
 def domain_search(request):
@@ -1119,6 +1181,70 @@ def domain_search(request):
     })
 
 
+async def _adomain_search(request, domain_name):
+    invalid, domain_idna = await sync_to_async(_domain_search_precheck, thread_sensitive=True)(domain_name)
+    if invalid:
+        return invalid
+
+    try:
+        available, reason, _ = await apps.async_epp_client.check_domain(domain_idna)
+    except grpc.RpcError as rpc_error:
+        return "error", rpc_error.details()
+
+    is_authenticated = await sync_to_async(lambda: request.user.is_authenticated, thread_sensitive=True)()
+    return _domain_search_result(is_authenticated, domain_idna, available, reason)
+
+
+async def domain_search_async(request):
+    error = None
+
+    if request.method == "POST" or request.GET.get("domain"):
+        if request.method == "POST":
+            form = forms.DomainSearchForm(request.POST)
+        else:
+            form = forms.DomainSearchForm({
+                "domain": request.GET.get("domain")
+            })
+        if form.is_valid():
+            resp = await _adomain_search(request, form.cleaned_data['domain'])
+            if resp[0] == "error":
+                error = resp[1]
+            elif resp[0] == "invalid":
+                form.add_error('domain', resp[1])
+            elif resp[0] == "resp":
+                return resp[1]
+    else:
+        form = forms.DomainSearchForm()
+
+    return await sync_to_async(render, thread_sensitive=True)(request, "domains/domain_search.html", {
+        "domain_form": form,
+        "error": error
+    })
+
+
+@login_required
+def domain_bulk_search(request):
+    results = None
+
+    if request.method == "POST":
+        form = forms.DomainBulkSearchForm(request.POST)
+        if form.is_valid():
+            if not availability.consume_bulk_check_quota(request.user.username, len(form.cleaned_data['domains'])):
+                form.add_error('domains', "You've searched too many domains recently, please try again later")
+            else:
+                results = sorted(
+                    availability.check_domains(form.cleaned_data['domains']),
+                    key=lambda r: (not r["available"], r["domain"])
+                )
+    else:
+        form = forms.DomainBulkSearchForm()
+
+    return render(request, "domains/domain_bulk_search.html", {
+        "domain_form": form,
+        "results": results
+    })
+
+
 def domain_search_gay(request):
     error = None
 
@@ -1772,15 +1898,26 @@ def internal_check_price(request):
     if not domain_info:
         return HttpResponseBadRequest()
 
-    if search_action == "register":
+    if search_action != "register":
+        return HttpResponseBadRequest()
+
+    price_table = models.PriceTable.latest() if not request.user.is_authenticated else None
+    price_entry = price_table.get_entry(
+        search_domain.rstrip(".").split(".", maxsplit=1)[1], sld, request.country.iso_code
+    ) if price_table else None
+    table_version = None
+    if price_entry and price_entry.registration_inc_vat is not None:
+        price_inc_vat, currency = price_entry.registration_inc_vat, price_entry.currency
+        table_version = price_table.version
+    else:
         price = domain_info.pricing.registration(
             request.country.iso_code, request.user.username if request.user.is_authenticated else None, sld
         )
-    else:
-        return HttpResponseBadRequest()
+        price_inc_vat, currency = price.amount_inc_vat, price.currency
 
     return HttpResponse(json.dumps({
-        "price": float(price.amount_inc_vat),
-        "currency": price.currency,
-        "message": domain_info.notice
+        "price": float(price_inc_vat),
+        "currency": currency,
+        "message": domain_info.notice,
+        "price_table_version": table_version
     }), content_type="application/json")
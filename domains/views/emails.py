@@ -3,8 +3,7 @@ from django.core.mail import EmailMultiAlternatives
 from django.shortcuts import reverse
 from celery import shared_task
 from django.conf import settings
-from .. import models
-import requests
+from .. import models, http_client
 import django_keycloak_auth.clients
 
 
@@ -12,7 +11,7 @@ def get_feedback_url(description: str, reference: str):
     if settings.FEEDBACK_URL == "none":
         return None
     access_token = django_keycloak_auth.clients.get_access_token()
-    r = requests.post(f"{settings.FEEDBACK_URL}/api/feedback_request/", json={
+    r = http_client.client.post(f"{settings.FEEDBACK_URL}/api/feedback_request/", endpoint="feedback request", json={
         "description": description,
         "action_reference": reference
     }, headers={
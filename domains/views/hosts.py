@@ -1,7 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect, reverse
 from django.http.response import Http404
 from django.contrib.auth.decorators import login_required
-from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
 import grpc
 import idna
 import django_keycloak_auth.clients
@@ -9,37 +9,55 @@ import ipaddress
 import urllib.parse
 from django.conf import settings
 from .. import models, apps, forms, zone_info
+from . import async_login_required
 
 
-@login_required
-def hosts(request):
+def _load_hosts(request):
     access_token = django_keycloak_auth.clients.get_active_access_token(oidc_profile=request.user.oidc_profile)
-    user_hosts = models.NameServer.get_object_list(access_token)
-    error = None
+    return list(models.NameServer.get_object_list(access_token))
 
-    def get_host(h):
-        try:
-            return {
+
+def _render_hosts(request, user_hosts, hosts_data):
+    hosts = []
+    for h, (host_data, synced_at) in zip(user_hosts, hosts_data):
+        if isinstance(host_data, grpc.RpcError):
+            hosts.append({
                 "id": h.id,
                 "obj": h,
-                "host": apps.epp_client.get_host(h.name_server, h.registry_id)
-            }
-        except grpc.RpcError as rpc_error:
-            return {
+                "error": host_data.details()
+            })
+        else:
+            hosts.append({
                 "id": h.id,
                 "obj": h,
-                "error": rpc_error.details()
-            }
-
-    with ThreadPoolExecutor() as executor:
-        hosts_data = list(executor.map(get_host, user_hosts))
+                "host": host_data,
+                "synced_at": synced_at
+            })
 
     return render(request, "domains/hosts.html", {
-        "hosts": hosts_data,
-        "error": error
+        "hosts": hosts,
+        "error": None
     })
 
 
+@login_required
+def hosts(request):
+    user_hosts = _load_hosts(request)
+    hosts_data = models.RegistrySnapshot.get_hosts(
+        ((h.name_server, h.registry_id) for h in user_hosts), mark_viewed=True
+    )
+    return _render_hosts(request, user_hosts, hosts_data)
+
+
+@async_login_required
+async def hosts_async(request):
+    user_hosts = await sync_to_async(_load_hosts, thread_sensitive=True)(request)
+    hosts_data = await models.RegistrySnapshot.aget_hosts(
+        ((h.name_server, h.registry_id) for h in user_hosts), mark_viewed=True
+    )
+    return await sync_to_async(_render_hosts, thread_sensitive=True)(request, user_hosts, hosts_data)
+
+
 @login_required
 def host(request, host_id):
     access_token = django_keycloak_auth.clients.get_active_access_token(oidc_profile=request.user.oidc_profile)
@@ -219,12 +237,9 @@ def host_create(request, host_name: str):
                 except grpc.RpcError as rpc_error:
                     error = rpc_error.details()
                 else:
-                    host_obj = models.NameServer(
-                        name_server=host_name,
-                        registry_id=domain_data.registry_name,
-                        user=request.user
+                    host_obj = models.NameServer.replace_name_server(
+                        host_name, domain_data.registry_name, request.user
                     )
-                    host_obj.save()
 
                     return redirect('host', host_obj.id)
         else:
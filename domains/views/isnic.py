@@ -4,7 +4,7 @@ import base64
 import urllib.parse
 from django.http import HttpResponse
 from . import postal
-import requests
+from .. import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +31,7 @@ def postal(_request, req_body):
         for line in msg_lines:
             url = urllib.parse.urlparse(line.strip())
             if url.scheme == "https" and url.netloc.endswith("isnic.is"):
-                requests.get(url.geturl()).raise_for_status()
+                http_client.client.get(url.geturl(), endpoint="isnic contact verification").raise_for_status()
 
         return HttpResponse(status=200)
 
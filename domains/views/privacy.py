@@ -5,8 +5,7 @@ import base64
 import logging
 import email.parser
 import uuid
-import requests
-from .. import models
+from .. import models, http_client
 from . import postal
 
 logger = logging.getLogger(__name__)
@@ -59,8 +58,9 @@ def postal(_request, req_body):
             for line in msg_lines:
                 if line.startswith("trigger = "):
                     trigger = line[len("trigger = "):]
-                    r = requests.get(
+                    r = http_client.client.get(
                         "https://api.rrpproxy.net/api/call",
+                        endpoint="rrpproxy activatecontact",
                         params={
                             "s_login": settings.RRPPROXY_USER,
                             "s_pw": settings.RRPPROXY_PASS,
@@ -1,6 +1,10 @@
 import ipaddress
+import json
+from django.http import Http404
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from .. import verisign, forms
+from . import ndjson_response
 
 
 def get_ip(request):
@@ -14,8 +18,44 @@ def get_ip(request):
     return addr
 
 
+def _get_username(request):
+    return request.user.username if request.user.is_authenticated else None
+
+
+def _suggestions_context(request, results):
+    if results is None:
+        return {
+            "suggestions": None,
+            "suggestions_token": None,
+        }
+    return {
+        "suggestions": verisign.pending_suggested_domains(results),
+        "suggestions_token": verisign.save_results(
+            results, iso_code=request.country.iso_code, username=_get_username(request)
+        ) if results else None,
+    }
+
+
+def suggest_stream(request, token):
+    saved = verisign.get_saved_results(token)
+    if saved is None or saved["username"] != _get_username(request):
+        raise Http404()
+
+    def stream():
+        for i, suggestion in verisign.iter_suggested_domains(saved["results"], saved["iso_code"], saved["username"]):
+            yield json.dumps({
+                "index": i,
+                "html": render_to_string("domains/domain_suggestion_row.html", {
+                    "suggestion": suggestion,
+                    "index": i,
+                }, request=request)
+            }) + "\n"
+
+    return ndjson_response(stream())
+
+
 def suggest_name(request):
-    suggestions = None
+    results = None
     error = None
 
     if request.method == "POST" or "domain" in request.GET:
@@ -26,11 +66,7 @@ def suggest_name(request):
         if form.is_valid():
             ip_addr = get_ip(request)
             try:
-                suggestions = verisign.suggests(
-                    form.cleaned_data["domain"], str(ip_addr),
-                    iso_code=request.country.iso_code,
-                    username=request.user.username if request.user.is_authenticated else None
-                )
+                results = verisign.suggest_results(form.cleaned_data["domain"], str(ip_addr))
             except verisign.VerisignError as e:
                 error = e.message
     else:
@@ -38,13 +74,13 @@ def suggest_name(request):
 
     return render(request, "domains/domain_suggest.html", {
         "name_form": form,
-        "suggestions": suggestions,
-        "error": error
+        "error": error,
+        **_suggestions_context(request, results)
     })
 
 
 def suggest_personal_name(request):
-    suggestions = None
+    results = None
     error = None
 
     if request.method == "POST":
@@ -64,49 +100,41 @@ def suggest_personal_name(request):
                 middle_names = name_parts[1:-1]
                 last_name = name_parts[-1]
             try:
-                suggestions = verisign.suggest_personal_names(
-                    first_name, last_name, middle_names,
-                    iso_code=request.country.iso_code,
-                    username=request.user.username if request.user.is_authenticated else None
-                )
+                results = verisign.suggest_personal_name_results(first_name, last_name, middle_names)
             except verisign.VerisignError as e:
                 error = e.message
     else:
         form = forms.PersonalNameSearchForm()
         if request.user.is_authenticated:
             try:
-                suggestions = verisign.suggest_personal_names(
-                    request.user.first_name, request.user.last_name,
-                    iso_code=request.country.iso_code,
-                    username=request.user.username if request.user.is_authenticated else None
+                results = verisign.suggest_personal_name_results(
+                    request.user.first_name, request.user.last_name
                 )
             except verisign.VerisignError as e:
                 error = e.message
 
     return render(request, "domains/domain_suggest_personal.html", {
         "name_form": form,
-        "suggestions": suggestions,
-        "error": error
+        "error": error,
+        **_suggestions_context(request, results)
     })
 
 
 def suggest_online(request):
-    suggestions = None
+    results = None
     error = None
 
     if request.method == "POST":
         form = forms.OnlineNameSearchForm(request.POST)
         if form.is_valid():
             try:
-                suggestions = verisign.online_presence(
+                results = verisign.online_presence_results(
                     online_uri=form.cleaned_data.get("online_uri"),
                     online_title=form.cleaned_data.get("online_title"),
                     online_description=form.cleaned_data.get("online_description"),
                     preferred_name=form.cleaned_data.get("domain"),
                     location=form.cleaned_data.get("location"),
                     email=form.cleaned_data.get("email"),
-                    iso_code=request.country.iso_code,
-                    username=request.user.username if request.user.is_authenticated else None
                 )
             except verisign.VerisignError as e:
                 error = e.message
@@ -115,6 +143,6 @@ def suggest_online(request):
 
     return render(request, "domains/domain_suggest_online.html", {
         "name_form": form,
-        "suggestions": suggestions,
-        "error": error
+        "error": error,
+        **_suggestions_context(request, results)
     })
@@ -3,10 +3,12 @@ import decimal
 import dataclasses
 import typing
 import datetime
+import grpc
 import google.protobuf.wrappers_pb2
 from .proto import billing_pb2
 from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 import domains.views.billing
 
@@ -20,7 +22,9 @@ def _mul(value, unit):
         return decimal.Decimal(value)
 
 
-class SimplePrice:
+class BasePrice:
+    fee_currency = "GBP"
+
     def __init__(self, price: int, periods=None, restore=0, renewal=None, transfer=0):
         self.price = price
         self._renewal = renewal if renewal else price
@@ -49,6 +53,35 @@ class SimplePrice:
     def representative_transfer(self):
         return decimal.Decimal(self._transfer) / decimal.Decimal(100) if self._transfer is not None else None
 
+    def _valid_period(self, value, unit) -> bool:
+        return apps.epp_api.Period(
+            unit=unit,
+            value=value
+        ) in self.periods
+
+    def _registration_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        if not self._valid_period(value, unit):
+            return None
+        return (decimal.Decimal(self.price) / decimal.Decimal(100)) * _mul(value, unit)
+
+    def _renewal_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        if not self._valid_period(value, unit):
+            return None
+        return (decimal.Decimal(self._renewal) / decimal.Decimal(100)) * _mul(value, unit)
+
+    def _restore_fee(self, sld: str) -> typing.Optional[decimal.Decimal]:
+        return decimal.Decimal(self._restore) / decimal.Decimal(100)
+
+    def _transfer_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        if not self._valid_period(value, unit):
+            return None
+        return (decimal.Decimal(self._transfer) / decimal.Decimal(100)) * _mul(value, unit)
+
+    def _convert(self, fee: typing.Optional[decimal.Decimal], country: str, username):
+        if fee is None:
+            return None
+        return domains.views.billing.convert_currency(fee, self.fee_currency, username, None, country)
+
     def fees(self, country: str, username, sld):
         return {
             "periods": list(map(lambda p: {
@@ -65,228 +98,194 @@ class SimplePrice:
             value = self.default_value
         if unit is None:
             unit = self.default_unit
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self.price) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+        return self._convert(self._registration_fee(sld, value, unit), country, username)
+
+    def registration_many(self, country: str, username, slds: typing.Iterable[str], value=None, unit=None):
+        if value is None:
+            value = self.default_value
+        if unit is None:
+            unit = self.default_unit
+        fees = [self._registration_fee(sld, value, unit) for sld in slds]
+        if all(fee is None for fee in fees):
+            return fees
+        rate = domains.views.billing.get_currency_rate(self.fee_currency, username, None, country)
+        return [domains.views.billing.apply_currency_rate(fee, rate) if fee is not None else None for fee in fees]
 
     def renewal(self, country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self._renewal) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+        return self._convert(self._renewal_fee(sld, value, unit), country, username)
 
     def restore(self, country: str, username, sld: str):
-        fee = decimal.Decimal(self._restore) / decimal.Decimal(100)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+        return self._convert(self._restore_fee(sld), country, username)
 
-    def transfer(self,  country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self._transfer) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+    def transfer(self, country: str, username, sld: str, value=1, unit=0):
+        return self._convert(self._transfer_fee(sld, value, unit), country, username)
 
 
-class Nominet2021PromotionalPrice:
+class SimplePrice(BasePrice):
+    pass
+
+
+class Nominet2021PromotionalPrice(BasePrice):
     def __init__(self, price: int):
-        self.price = price
-        self._renewal = price
-        self.periods = list(map(lambda i: apps.epp_api.Period(
-            unit=0,
-            value=i
-        ), range(1, 11)))
-        self.default_value = self.periods[0].value
-        self.default_unit = self.periods[0].unit
+        super().__init__(price, restore=None, transfer=0)
         self._start = datetime.datetime(2021, 10, 1, 0, 0, 0, tzinfo=pytz.timezone("Europe/London"))
         self._end = datetime.datetime(2021, 11, 30, 23, 59, 59, tzinfo=pytz.timezone("Europe/London"))
 
-    @property
-    def currency(self):
-        return "GBP"
+    def _promotion_active(self) -> bool:
+        now = timezone.now()
+        return self._start <= now <= self._end
 
     def representative_registration(self):
-        now = timezone.now()
-        if now >= self._start and now <= self._end:
+        if self._promotion_active():
             return decimal.Decimal("2.09")
         else:
             return decimal.Decimal(self.price) / decimal.Decimal(100)
 
-    def representative_renewal(self):
-        return decimal.Decimal(self._renewal) / decimal.Decimal(100) if self._renewal is not None else None
-
-    def representative_restore(self):
-        return None
-
-    def representative_transfer(self):
-        return decimal.Decimal(0)
-
-    def fees(self, country: str, username, sld):
-        return {
-            "periods": list(map(lambda p: {
-                "period": p,
-                "create": self.registration(country, username, sld, p.value, p.unit),
-                "renew": self.renewal(country, username, sld, p.value, p.unit),
-            }, self.periods)),
-            "restore": self.restore(country, username, sld),
-            "transfer": self.transfer(country, username, sld),
-        }
-
-    def registration(self, country: str, username, sld: str, value=None, unit=None):
-        if value is None:
-            value = self.default_value
-        if unit is None:
-            unit = self.default_unit
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
+    def _registration_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        if not self._valid_period(value, unit):
             return None
 
-        now = timezone.now()
-        if now >= self._start and now <= self._end and unit == 0:
+        if self._promotion_active() and unit == 0:
             fee = decimal.Decimal("2.09")
             value -= 1
         else:
             fee = decimal.Decimal(0)
 
-        fee += (decimal.Decimal(self.price) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
-
-    def renewal(self, country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self._renewal) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+        return fee + (decimal.Decimal(self.price) / decimal.Decimal(100)) * _mul(value, unit)
 
-    def restore(self, country: str, username, sld: str):
+    def _restore_fee(self, sld: str) -> typing.Optional[decimal.Decimal]:
         return None
 
-    def transfer(self,  country: str, username, sld: str, value=1, unit=0):
-        fee = decimal.Decimal(0)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+    def _transfer_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        return decimal.Decimal(0)
 
 
-class LengthPrice:
+class LengthPrice(BasePrice):
     def __init__(self, standard_price: int, lengths, periods=None, restore=0, renewal=None, transfer=0):
+        super().__init__(standard_price, periods=periods, restore=restore, renewal=renewal, transfer=transfer)
         self.standard_price = standard_price
         self.lengths = lengths
-        self._renewal = renewal if renewal else standard_price
-        self._restore = restore
-        self._transfer = transfer
-        self.periods = periods if periods else list(map(lambda i: apps.epp_api.Period(
-            unit=0,
-            value=i
-        ), range(1, 11)))
 
-    @property
-    def currency(self):
-        return "GBP"
-
-    def representative_registration(self):
-        return decimal.Decimal(self.standard_price) / decimal.Decimal(100)
-
-    def representative_renewal(self):
-        return decimal.Decimal(self._renewal) / decimal.Decimal(100) if self._renewal is not None else None
-
-    def representative_restore(self):
-        return decimal.Decimal(self._restore) / decimal.Decimal(100) if self._restore is not None else None
-
-    def representative_transfer(self):
-        return decimal.Decimal(self._transfer) / decimal.Decimal(100) if self._transfer is not None else None
-
-    def fees(self, country: str, username, sld):
-        return {
-            "periods": list(map(lambda p: {
-                "period": p,
-                "create": self.registration(country, username, sld, p.value, p.unit),
-                "renew": self.renewal(country, username,sld, p.value, p.unit),
-            }, self.periods)),
-            "restore": self.restore(country, username, sld),
-            "transfer": self.transfer(country, username, sld),
-        }
-
-    def registration(self, country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
+    def _registration_fee(self, sld: str, value, unit) -> typing.Optional[decimal.Decimal]:
+        if not self._valid_period(value, unit):
             return None
-        fee = (decimal.Decimal(
+        return (decimal.Decimal(
             self.lengths.get(len(sld), self.standard_price)
         ) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
 
-    def renewal(self, country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self._renewal) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
 
-    def restore(self, country: str, username, sld: str):
-        fee = decimal.Decimal(self._restore) / decimal.Decimal(100)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
+def _fee_check_generation() -> int:
+    cache.add("fee_check_generation", 0, timeout=None)
+    return cache.get("fee_check_generation", 0)
+
+
+def expire_fee_checks():
+    _fee_check_generation()
+    try:
+        cache.incr("fee_check_generation")
+    except ValueError:
+        pass
 
-    def transfer(self, country: str, username, sld: str, value=1, unit=0):
-        if apps.epp_api.Period(
-                unit=unit,
-                value=value
-        ) not in self.periods:
-            return None
-        fee = (decimal.Decimal(self._transfer) / decimal.Decimal(100)) * _mul(value, unit)
-        return domains.views.billing.convert_currency(fee, "GBP", username, None, country)
 
+def _fee_total(command) -> decimal.Decimal:
+    total_fee = decimal.Decimal(0)
+    for fee in command.fees:
+        total_fee += decimal.Decimal(fee.value)
+    for credit in command.credits:
+        total_fee += decimal.Decimal(credit.value)
+    return total_fee
 
-class MarkupPrice:
+
+class MarkupPrice(BasePrice):
     def __init__(
             self, price: int, markup: decimal.Decimal, tld: str, currency: typing.Optional[str], display_currency=None,
             periods=None, restore=0, renewal=None, transfer=0
     ):
-        self.price = price
+        super().__init__(price, periods=periods, restore=restore, renewal=renewal, transfer=transfer)
         self._tld = tld
         self._markup = markup
         self._currency = currency
         self._display_currency = display_currency if display_currency else currency
-        self._renewal = renewal if renewal else price
-        self._restore = restore
-        self._transfer = transfer
-        self.periods = list(periods) if periods else list(map(lambda i: apps.epp_api.Period(
-            unit=0,
-            value=i
-        ), range(1, 11)))
 
     @property
     def currency(self):
         return self._display_currency
 
-    def representative_registration(self):
-        return decimal.Decimal(self.price) / decimal.Decimal(100)
-
-    def representative_renewal(self):
-        return decimal.Decimal(self._renewal) / decimal.Decimal(100) if self._renewal is not None else None
+    def _fee_cache_prefix(self) -> str:
+        return f"fee_check:{_fee_check_generation()}:{self._tld}:{self._currency or ''}"
+
+    @staticmethod
+    def _fee_command_key(command: int, period: typing.Optional[apps.epp_api.Period]) -> str:
+        if command in (apps.epp_api.fee_pb2.Transfer, apps.epp_api.fee_pb2.Restore) or not period:
+            return f"{command}:none"
+        return f"{command}:{period.unit}:{period.value}"
+
+    def _get_cached_fees(self, prefix: str, sld: str, keys: typing.List[str], use_tld_cache: bool):
+        name_prefix = f"{prefix}:{sld.lower()}"
+        name_keys = [f"{name_prefix}:{k}" for k in keys]
+        unavailable_keys = [f"{name_prefix}:{k}:unavailable" for k in keys]
+        tld_keys = [f"{prefix}:{k}" for k in keys]
+        premium_key = f"{name_prefix}:premium"
+        cached = cache.get_many(
+            name_keys + unavailable_keys + [premium_key] + (tld_keys if use_tld_cache else [])
+        )
 
-    def representative_restore(self):
-        return decimal.Decimal(self._restore) / decimal.Decimal(100) if self._restore is not None else None
+        if any(cached.get(k) for k in unavailable_keys):
+            return False, {}
+        use_tld_cache = use_tld_cache and not cached.get(premium_key)
+
+        found = {}
+        for key, name_key, tld_key in zip(keys, name_keys, tld_keys):
+            value = cached.get(name_key)
+            if value is None and use_tld_cache:
+                value = cached.get(tld_key)
+            if value is not None:
+                found[key] = apps.epp_api.fee_pb2.FeeCheckData.FeeCommand.FromString(value)
+        return True, found
+
+    @staticmethod
+    def _is_standard_fee(command) -> typing.Optional[bool]:
+        if command.HasField("standard"):
+            return command.standard.value
+        if command.HasField("class"):
+            return getattr(command, "class").value.lower() in ("", "standard")
+        return None
 
-    def representative_transfer(self):
-        return decimal.Decimal(self._transfer) / decimal.Decimal(100) if self._transfer is not None else None
+    def _cache_fee_check(self, prefix: str, sld: str, keys: typing.List[str], resp):
+        ttl = settings.PRICE_FEE_CACHE_TTL
+        name_prefix = f"{prefix}:{sld.lower()}"
+        if not resp.HasField("fee_check") or not resp.fee_check.available:
+            cache.set_many({f"{name_prefix}:{k}:unavailable": True for k in keys}, timeout=ttl)
+            return
+
+        commands = {
+            self._fee_command_key(
+                c.command, apps.epp_api.Period.from_pb(c.period) if c.HasField("period") else None
+            ): c for c in resp.fee_check.commands
+        }
+        tld_cached = cache.get_many([f"{prefix}:{k}" for k in commands.keys()])
+
+        to_cache = {}
+        premium = False
+        for key, command in commands.items():
+            to_cache[f"{name_prefix}:{key}"] = command.SerializeToString()
+            is_standard = self._is_standard_fee(command)
+            standard = tld_cached.get(f"{prefix}:{key}")
+            if is_standard is False or (standard is not None and _fee_total(
+                    apps.epp_api.fee_pb2.FeeCheckData.FeeCommand.FromString(standard)
+            ) != _fee_total(command)):
+                premium = True
+            elif is_standard and standard is None:
+                to_cache[f"{prefix}:{key}"] = command.SerializeToString()
+
+        if premium:
+            to_cache = {k: v for k, v in to_cache.items() if k.startswith(f"{name_prefix}:")}
+            to_cache[f"{name_prefix}:premium"] = True
+        cache.set_many(to_cache, timeout=ttl)
 
     def fees(self, country: str, username, sld):
         domain = f"{sld}.{self._tld}"
+        prefix = self._fee_cache_prefix()
 
         commands_split = [[apps.epp_api.fee_pb2.FeeCommand(
             command=apps.epp_api.fee_pb2.Transfer,
@@ -305,7 +304,28 @@ class MarkupPrice:
                 period=period.to_pb()
             )])
 
+        def command_key(c):
+            return self._fee_command_key(
+                c.command, apps.epp_api.Period.from_pb(c.period) if c.HasField("period") else None
+            )
+
+        available, cached = self._get_cached_fees(
+            prefix, sld, [command_key(c) for commands in commands_split for c in commands], use_tld_cache=True
+        )
+        if not available:
+            return {
+                "periods": [],
+                "restore": None,
+                "transfer": None
+            }
+
         commands_resp = []
+        to_fetch = []
+        for commands in commands_split:
+            if all(command_key(c) in cached for c in commands):
+                commands_resp.extend(cached[command_key(c)] for c in commands)
+            else:
+                to_fetch.append(commands)
 
         with ThreadPoolExecutor() as e:
             resps = e.map(lambda commands: apps.epp_client.stub.DomainCheck(apps.epp_api.domain_pb2.DomainCheckRequest(
@@ -314,9 +334,10 @@ class MarkupPrice:
                     currency=apps.epp_api.StringValue(value=self._currency) if self._currency else None,
                     commands=commands
                 )
-            )), commands_split)
+            )), to_fetch)
 
-        for resp in resps:
+        for commands, resp in zip(to_fetch, resps):
+            self._cache_fee_check(prefix, sld, [command_key(c) for c in commands], resp)
             if not resp.HasField("fee_check"):
                 return {
                     "periods": [],
@@ -376,16 +397,16 @@ class MarkupPrice:
         }
 
     def _convert_fee(self, command, country, username):
-        total_fee = decimal.Decimal(0)
-        for fee in command.fees:
-            total_fee += decimal.Decimal(fee.value)
-        for credit in command.credits:
-            total_fee += decimal.Decimal(credit.value)
-
-        final_fee = total_fee * self._markup
+        final_fee = _fee_total(command) * self._markup
         return domains.views.billing.convert_currency(final_fee, command.currency, username, None, country)
 
     def _get_fee(self, sld, value, unit, command, country, username):
+        fee_command = self._get_fee_command(sld, value, unit, command, use_cache=False)
+        if fee_command is None:
+            return None
+        return self._convert_fee(fee_command, country, username)
+
+    def _get_fee_command(self, sld, value, unit, command, use_cache=True):
         domain = f"{sld}.{self._tld}"
         if unit is not None:
             period = apps.epp_api.Period(
@@ -395,6 +416,15 @@ class MarkupPrice:
             if period not in self.periods:
                 return None
 
+        prefix = self._fee_cache_prefix()
+        key = self._fee_command_key(command, period if unit is not None else None)
+        if use_cache:
+            available, cached = self._get_cached_fees(prefix, sld, [key], use_tld_cache=False)
+            if not available:
+                return None
+            if key in cached:
+                return cached[key]
+
         resp = apps.epp_client.stub.DomainCheck(apps.epp_api.domain_pb2.DomainCheckRequest(
             name=domain,
             fee_check=apps.epp_api.fee_pb2.FeeCheck(
@@ -405,17 +435,37 @@ class MarkupPrice:
                 )]
             )
         ))
+        self._cache_fee_check(prefix, sld, [key], resp)
         if not resp.HasField("fee_check"):
             return None
         if not resp.fee_check.available:
             return None
-        command = resp.fee_check.commands[0]
-
-        return self._convert_fee(command, country, username)
+        return resp.fee_check.commands[0]
 
     def registration(self, country: str, username, sld: str, value=1, unit=0):
         return self._get_fee(sld, value, unit, apps.epp_api.fee_pb2.Create, country=country, username=username)
 
+    def registration_many(self, country: str, username, slds: typing.Iterable[str], value=1, unit=0):
+        def get_command(sld):
+            try:
+                return self._get_fee_command(sld, value, unit, apps.epp_api.fee_pb2.Create)
+            except grpc.RpcError:
+                return None
+
+        with ThreadPoolExecutor() as e:
+            commands = list(e.map(get_command, slds))
+
+        rates = {}
+        for command in commands:
+            if command is not None and command.currency not in rates:
+                rates[command.currency] = domains.views.billing.get_currency_rate(
+                    command.currency, username, None, country
+                )
+
+        return [domains.views.billing.apply_currency_rate(
+            _fee_total(command) * self._markup, rates[command.currency]
+        ) if command is not None else None for command in commands]
+
     def renewal(self, country: str, username, sld: str, value=None, unit=None):
         return self._get_fee(sld, value, unit, apps.epp_api.fee_pb2.Renew, country=country, username=username)
 
@@ -2860,13 +2910,19 @@ else:
     )
 
 
+def _build_zone_index(zones) -> typing.Dict[str, DomainInfo]:
+    index = {}
+    for zone_name, zone in zones:
+        index.setdefault(zone_name, zone)
+    return index
+
+
+ZONE_INDEX = _build_zone_index(ZONES)
+
+
 def get_domain_info(domain: str) -> (typing.Optional[DomainInfo], str):
     parts = domain.rstrip(".").split(".", maxsplit=1)
     if len(parts) != 2:
         return None, domain
     sld, tld = parts
-    for zone in ZONES:
-        if zone[0] == tld:
-            return zone[1], sld
-
-    return None, sld
+    return ZONE_INDEX.get(tld), sld